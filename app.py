@@ -1,18 +1,86 @@
 import os
+import json
 import base64
 import time
 import uuid
 import datetime
-from flask import Flask, render_template, request, jsonify, session, make_response, current_app
+from flask import Flask, render_template, request, jsonify, session, make_response, current_app, Response, stream_with_context
 from flask_cors import CORS
-from openai_service import analyze_image, describe_surroundings, recognize_text
+from openai_service import analyze_image, analyze_image_batch, analyze_image_pyramid, describe_surroundings, recognize_text, REGION_LAYOUTS
+from openai_service import decode_text_frame, read_text_regions, describe_text_regions
+from openai_service import analyze_scene, decode_scene_frame, SCENE_ANALYSES
+import openai_service
 from voice_service import text_to_speech, recognize_speech
-from chatbot_service import get_chatbot_response
+from chatbot_service import (get_chatbot_response, knowledge_index, load_knowledge_index, ensure_knowledge_index,
+                             migrate_knowledge_search, index_knowledge_item, index_chatbot_response, response_cache)
 from models import db, ChatbotResponse, UserQuery, KnowledgeBase
+from navigation_stream import NavigationStreamRegistry
+from scene_tracker import SceneTrackerRegistry
+from capture_hints import CaptureHints
+from vision_executor import VisionExecutor, VisionQueueFull, VisionTaskTimeout
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24).hex())
 
+# Default /api/analyze-image mode: "full", or "fast" for coarse-to-fine analysis with early exit
+ANALYZE_MODE = os.environ.get('ANALYZE_MODE', 'full').lower()
+
+# Maximum number of frames accepted by /api/analyze-batch in one request
+MAX_BATCH_IMAGES = int(os.environ.get('MAX_BATCH_IMAGES', 16))
+
+# Open continuous-navigation streams
+navigation_streams = NavigationStreamRegistry()
+
+# Per-session scene state for change-only announcements
+scene_trackers = SceneTrackerRegistry(
+    max_sessions=int(os.environ.get('SCENE_TRACKER_SESSIONS', 256)),
+    idle_timeout=float(os.environ.get('SCENE_TRACKER_IDLE_TIMEOUT', 300))
+)
+
+# Capture size, JPEG quality and frame rate suggested to clients per mode,
+# lowered when processing gets slow so uploads and decoding get cheaper
+capture_hints = CaptureHints()
+
+# Optional near-duplicate frame cache for the vision endpoints
+if os.environ.get('VISION_CACHE_ENABLED', 'false').lower() == 'true':
+    openai_service.configure_vision_cache(
+        max_entries=int(os.environ.get('VISION_CACHE_SIZE', 128)),
+        ttl=float(os.environ.get('VISION_CACHE_TTL', 5.0)),
+        max_distance=int(os.environ.get('VISION_CACHE_MAX_DISTANCE', 4)),
+        safety_mode=os.environ.get('VISION_CACHE_SAFETY_MODE', 'true').lower() == 'true'
+    )
+
+# Vision workers; 0 runs the vision endpoints inline in the request thread
+VISION_WORKERS = int(os.environ.get('VISION_WORKERS', 0))
+
+# Object detector backend: "onnx" with a local model file, or the built-in heuristics.
+openai_service.configure_detector(
+    backend=os.environ.get('OBJECT_DETECTOR', 'heuristic').lower(),
+    model_path=os.environ.get('DETECTOR_MODEL_PATH'),
+    intra_op_threads=int(os.environ.get('DETECTOR_INTRA_OP_THREADS', 1)),
+    inter_op_threads=int(os.environ.get('DETECTOR_INTER_OP_THREADS', 1)),
+    score_threshold=float(os.environ.get('DETECTOR_SCORE_THRESHOLD', 0.35)),
+    warm_up=False
+)
+
+# Load labels, lookup tables and the detector at startup instead of on the first request.
+# With worker processes each worker loads and warms up its own copy instead.
+if VISION_WORKERS == 0 and os.environ.get('VISION_WARM_UP', 'true').lower() == 'true':
+    print(f"Vision resources loaded (ms): {openai_service.warm_up()}")
+
+# Optional process pool for the vision endpoints.
+# Created before the database is set up so workers are forked without open connections.
+vision_executor = None
+if VISION_WORKERS > 0:
+    vision_executor = VisionExecutor(
+        workers=VISION_WORKERS,
+        max_pending=int(os.environ.get('VISION_QUEUE_SIZE', 0)) or None,
+        timeout=float(os.environ.get('VISION_TASK_TIMEOUT', 10.0)),
+        retry_after=int(os.environ.get('VISION_RETRY_AFTER', 1)),
+        module=openai_service.__name__
+    )
+    vision_executor.warm_up()
+
 # Configure the database
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -27,6 +95,17 @@ db.init_app(app)
 # Create database tables if they don't exist
 with app.app_context():
     db.create_all()
+    
+    # Build the chatbot's knowledge index now rather than on the first chat message
+    try:
+        print(f"Knowledge index loaded: {load_knowledge_index()}")
+    except Exception as e:
+        print(f"Knowledge index not loaded, will retry on first use: {str(e)}")
+
+@app.cli.command("migrate-knowledge-search")
+def migrate_knowledge_search_command():
+    """Create the knowledge full-text index: flask --app app migrate-knowledge-search"""
+    print(f"Knowledge search migrated: {migrate_knowledge_search()}")
 
 # Enable CORS for all routes
 CORS(app)
@@ -46,6 +125,46 @@ def add_cors_and_cache_headers(response):
     
     return response
 
+def run_vision_task(vision_function, image, *args):
+    """
+    Run a vision function on an uploaded image, in the process pool if one is configured.
+    
+    Args:
+        vision_function (callable): One of the functions named in VISION_TASKS
+        image (FileStorage or bytes): The uploaded image, or its bytes
+        *args: Extra positional arguments for the function
+        
+    Returns:
+        str or dict: The function's result
+    """
+    if vision_executor is None:
+        return vision_function(getattr(image, 'stream', image), *args)
+    image_data = image if isinstance(image, bytes) else image.read()
+    return vision_executor.run(vision_function.__name__, image_data, *args)
+
+def run_vision_batch(vision_function, image_files, *args):
+    """
+    Run a vision function on several uploaded images, as one task in the process pool if one is configured.
+    
+    Args:
+        vision_function (callable): One of the functions named in BATCH_TASKS
+        image_files (list): The uploaded images (FileStorage)
+        *args: Extra positional arguments for the function
+        
+    Returns:
+        list: The function's result
+    """
+    if vision_executor is None:
+        return vision_function([f.stream for f in image_files], *args)
+    return vision_executor.run_batch(vision_function.__name__, [f.read() for f in image_files], *args)
+
+def vision_busy_response(error):
+    """503 response telling the client when to retry a refused vision request."""
+    response = jsonify({"error": str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
 @app.route('/')
 def index():
     """Render the main application page."""
@@ -86,18 +205,125 @@ def process_image():
         # Add a timestamp to ensure uniqueness
         timestamp = str(time.time())
         
-        # Convert image to base64
-        image_data = base64.b64encode(image_file.read()).decode('utf-8')
+        start = time.perf_counter()
         
-        # Analyze the image with timestamp to prevent caching
-        analysis = analyze_image(image_data, timestamp)
+        # Fast mode stops at the coarsest pyramid level that decides the answer
+        if request.form.get('mode', ANALYZE_MODE) == 'fast':
+            result = run_vision_task(analyze_image_pyramid, image_file, timestamp)
+            capture_hints.record('identify', (time.perf_counter() - start) * 1000)
+            return jsonify({"success": True, "description": result["description"], "level": result["level"],
+                            "reason": result["reason"], "capture": capture_hints.hints('identify'),
+                            "timestamp": timestamp})
+        
+        # Analyze the upload directly; no base64 round-trip
+        analysis = run_vision_task(analyze_image, image_file, timestamp)
+        capture_hints.record('identify', (time.perf_counter() - start) * 1000)
         
         # Return the analysis
-        return jsonify({"success": True, "description": analysis, "timestamp": timestamp})
+        return jsonify({"success": True, "description": analysis, "capture": capture_hints.hints('identify'),
+                        "timestamp": timestamp})
     
+    except VisionQueueFull as e:
+        return vision_busy_response(e)
+    except VisionTaskTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/analyze-batch', methods=['POST'])
+def process_image_batch():
+    """Analyze several queued images in one request and return a description for each."""
+    image_files = [f for f in request.files.getlist('images') if f.filename != '']
+    
+    if not image_files:
+        return jsonify({"error": "No images provided"}), 400
+    
+    if len(image_files) > MAX_BATCH_IMAGES:
+        return jsonify({"error": f"Too many images, at most {MAX_BATCH_IMAGES} per request"}), 400
+    
+    try:
+        # Add a timestamp to ensure uniqueness
+        timestamp = str(time.time())
+        
+        # Analyze all frames in one stacked pass, straight from the upload streams
+        descriptions = run_vision_batch(analyze_image_batch, image_files, timestamp)
+        
+        # Return the analyses in upload order
+        return jsonify({
+            "success": True,
+            "descriptions": descriptions,
+            "count": len(descriptions),
+            "timestamp": timestamp
+        })
+    
+    except VisionQueueFull as e:
+        return vision_busy_response(e)
+    except VisionTaskTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def scene_session_id():
+    """Scene-tracking session: an explicit session_id field, else the browser session."""
+    session_id = request.form.get('session_id') or request.args.get('session_id')
+    if session_id:
+        return session_id
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
+    return session['session_id']
+
+@app.route('/api/scene-changes', methods=['POST'])
+def scene_changes_api():
+    """Analyze a frame of a continuous scan and report only what changed since the last one."""
+    if 'image' not in request.files or request.files['image'].filename == '':
+        return jsonify({"error": "No image provided"}), 400
+    
+    try:
+        image_data = request.files['image'].read()
+        state = scene_trackers.get(scene_session_id())
+        timestamp = str(time.time())
+        
+        # The frame is decoded and hashed once, where it is analyzed; a frame
+        # close to the last analyzed one comes back with its hash only
+        start = time.perf_counter()
+        observation = run_vision_task(openai_service.scene_observation, image_data, openai_service.GRID_SIZE,
+                                      state.reference_signature())
+        
+        # A near-identical frame is answered from the stored state without a full analysis
+        if state.is_unchanged(observation["signature"]):
+            return jsonify({"success": True, "changed": False, "announcement": None,
+                            "stats": state.stats(), "capture": capture_hints.hints('identify'),
+                            "timestamp": timestamp})
+        
+        if "description" not in observation:
+            # Another request of the session moved the scene on meanwhile
+            observation = run_vision_task(openai_service.scene_observation, image_data)
+        capture_hints.record('identify', (time.perf_counter() - start) * 1000)
+        
+        announcement = state.update(observation)
+        return jsonify({
+            "success": True,
+            "changed": announcement is not None,
+            "announcement": announcement,
+            "description": observation["description"],
+            "stats": state.stats(),
+            "capture": capture_hints.hints('identify'),
+            "timestamp": timestamp
+        })
+    
+    except VisionQueueFull as e:
+        return vision_busy_response(e)
+    except VisionTaskTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/scene-changes', methods=['DELETE'])
+def reset_scene_changes():
+    """Forget the session's scene so the next frame is described in full."""
+    reset = scene_trackers.reset(scene_session_id())
+    return jsonify({"success": True, "reset": reset, "timestamp": str(time.time())})
+
 @app.route('/api/tts', methods=['POST'])
 def text_to_speech_api():
     """Convert text to speech and return the audio file."""
@@ -129,26 +355,105 @@ def describe_surroundings_api():
         # Get the image and context from the request
         image_file = request.files['image']
         context = request.form.get('context', '')
+        layout = request.form.get('layout') or None
         
         # Make sure we have actual image data
         if image_file.filename == '':
             return jsonify({"error": "Empty image file"}), 400
+        
+        if layout and layout not in REGION_LAYOUTS:
+            return jsonify({"error": f"Unknown layout, expected one of: {', '.join(REGION_LAYOUTS)}"}), 400
             
         # Add a timestamp to ensure uniqueness
         timestamp = str(time.time())
         
-        # Convert image to base64
-        image_data = base64.b64encode(image_file.read()).decode('utf-8')
-        
         # Get the description with timestamp to prevent caching
-        description = describe_surroundings(image_data, context, timestamp)
+        start = time.perf_counter()
+        description = run_vision_task(describe_surroundings, image_file, context, timestamp, layout)
+        capture_hints.record('navigate', (time.perf_counter() - start) * 1000)
         
         # Return the description
-        return jsonify({"success": True, "description": description, "timestamp": timestamp})
+        return jsonify({"success": True, "description": description, "capture": capture_hints.hints('navigate'),
+                        "timestamp": timestamp})
     
+    except VisionQueueFull as e:
+        return vision_busy_response(e)
+    except VisionTaskTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/navigation-stream', methods=['POST'])
+def open_navigation_stream():
+    """Open a continuous-navigation stream and return its id."""
+    data = request.get_json(silent=True) or {}
+    stream = navigation_streams.open(data.get('context', ''))
+    
+    if not stream:
+        return jsonify({"error": "Too many active navigation streams, please try again shortly"}), 503
+    
+    return jsonify({"success": True, "stream_id": stream.stream_id, "timestamp": str(time.time())})
+
+@app.route('/api/navigation-stream/<stream_id>/frame', methods=['POST'])
+def navigation_stream_frame(stream_id):
+    """Queue the newest camera frame of a navigation stream; stale frames are dropped."""
+    stream = navigation_streams.get(stream_id)
+    if not stream:
+        return jsonify({"error": "Unknown or expired navigation stream"}), 404
+    
+    if 'image' not in request.files or request.files['image'].filename == '':
+        return jsonify({"error": "No image provided"}), 400
+    
+    # Raw bytes: the frame is analyzed after this request has finished
+    stream.submit_frame(request.files['image'].read(), request.form.get('context'))
+    
+    # Accepted for processing; guidance arrives on the event stream
+    return jsonify({"success": True, "stats": stream.stats(), "capture": capture_hints.hints('navigate')}), 202
+
+@app.route('/api/navigation-stream/<stream_id>/events', methods=['GET'])
+def navigation_stream_events(stream_id):
+    """Server-sent events carrying navigation guidance whenever it changes."""
+    stream = navigation_streams.get(stream_id)
+    if not stream:
+        return jsonify({"error": "Unknown or expired navigation stream"}), 404
+    
+    def timed_describe(image, context):
+        start = time.perf_counter()
+        guidance = run_vision_task(describe_surroundings, image, context)
+        capture_hints.record('navigate', (time.perf_counter() - start) * 1000)
+        return guidance
+    
+    def events():
+        yield "retry: 2000\n\n"
+        while not stream.closed:
+            try:
+                guidance = stream.next_guidance(timed_describe)
+            except (VisionQueueFull, VisionTaskTimeout) as e:
+                # The frame is dropped; the stream goes on with the next one
+                payload = {"error": str(e), "stats": stream.stats(), "timestamp": str(time.time())}
+                if isinstance(e, VisionQueueFull):
+                    payload["retry_after"] = e.retry_after
+                yield f"data: {json.dumps(payload)}\n\n"
+                continue
+            if guidance is None:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            payload = {"description": guidance, "stats": stream.stats(), "timestamp": str(time.time())}
+            yield f"data: {json.dumps(payload)}\n\n"
+    
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/navigation-stream/<stream_id>', methods=['DELETE'])
+def close_navigation_stream(stream_id):
+    """Close a continuous-navigation stream."""
+    if not navigation_streams.close(stream_id):
+        return jsonify({"error": "Unknown or expired navigation stream"}), 404
+    
+    return jsonify({"success": True, "timestamp": str(time.time())})
+
 @app.route('/api/read-text', methods=['POST'])
 def read_text_api():
     """Extract and read text from an image."""
@@ -166,19 +471,139 @@ def read_text_api():
         # Add a timestamp to ensure uniqueness
         timestamp = str(time.time())
         
-        # Convert image to base64
-        image_data = base64.b64encode(image_file.read()).decode('utf-8')
-        
         # Extract text from the image
         # We don't need to modify recognize_text since it doesn't cache results
-        text = recognize_text(image_data)
+        start = time.perf_counter()
+        text = run_vision_task(recognize_text, image_file)
+        capture_hints.record('read', (time.perf_counter() - start) * 1000)
         
         # Return the extracted text
-        return jsonify({"success": True, "text": text, "timestamp": timestamp})
+        return jsonify({"success": True, "text": text, "capture": capture_hints.hints('read'), "timestamp": timestamp})
     
+    except VisionQueueFull as e:
+        return vision_busy_response(e)
+    except VisionTaskTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/read-text-stream', methods=['POST'])
+def read_text_stream_api():
+    """Server-sent events with each text region as soon as it has been read, in reading order."""
+    if 'image' not in request.files or request.files['image'].filename == '':
+        return jsonify({"error": "No image provided"}), 400
+    
+    start = time.perf_counter()
+    image_data = request.files['image'].read()
+    if vision_executor is None:
+        try:
+            frame = decode_text_frame(image_data)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Regions are read one by one while the events are sent
+        regions = read_text_regions(frame)
+        
+        def describe(read):
+            return describe_text_regions(frame, read)
+    else:
+        # A worker reads every region before the first event is sent, and a
+        # full queue or timeout is an error response rather than an event
+        try:
+            result = vision_executor.run("read_text", image_data)
+        except VisionQueueFull as e:
+            return vision_busy_response(e)
+        except VisionTaskTimeout as e:
+            return jsonify({"error": str(e)}), 504
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+        regions = result["regions"]
+        
+        def describe(read):
+            return result["text"]
+    
+    def events():
+        read = []
+        try:
+            for region in regions:
+                read.append(region)
+                yield f"data: {json.dumps(region)}\n\n"
+            text = describe(read)
+            capture_hints.record('read', (time.perf_counter() - start) * 1000)
+            payload = {"done": True, "text": text, "capture": capture_hints.hints('read'), "timestamp": str(time.time())}
+        except Exception as e:
+            payload = {"done": True, "error": str(e)}
+        yield f"data: {json.dumps(payload)}\n\n"
+    
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/scene', methods=['POST'])
+def scene_api():
+    """
+    Run several analyses on one upload concurrently.
+    
+    Form fields: image, analyses (comma-separated names from SCENE_ANALYSES,
+    default all), context and layout for navigation, and stream. With
+    stream=true (the default) each result is sent as a server-sent event as
+    soon as its analyzer finishes, followed by a final event with all results;
+    otherwise one combined JSON response is returned.
+    """
+    if 'image' not in request.files or request.files['image'].filename == '':
+        return jsonify({"error": "No image provided"}), 400
+    
+    analyses = [name.strip() for value in request.form.getlist('analyses') for name in value.split(',') if name.strip()]
+    analyses = list(dict.fromkeys(analyses)) or list(SCENE_ANALYSES)
+    unknown = [name for name in analyses if name not in SCENE_ANALYSES]
+    if unknown:
+        return jsonify({"error": f"Unknown analyses {', '.join(unknown)}, expected: {', '.join(SCENE_ANALYSES)}"}), 400
+    
+    context = request.form.get('context', '')
+    layout = request.form.get('layout') or None
+    if layout and layout not in REGION_LAYOUTS:
+        return jsonify({"error": f"Unknown layout, expected one of: {', '.join(REGION_LAYOUTS)}"}), 400
+    
+    timestamp = str(time.time())
+    image_data = request.files['image'].read()
+    
+    if vision_executor is None:
+        # Decode once here so a bad upload is a 400 rather than one error per analysis
+        try:
+            image = decode_scene_frame(image_data, analyses)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+        run = None
+    else:
+        # Each analysis goes to its own worker; workers decode their own copy
+        image = image_data
+        
+        def run(analysis):
+            return vision_executor.run("run_scene_analysis", image_data, analysis, context, timestamp, layout)
+    
+    partials = analyze_scene(image, analyses, context, timestamp, layout, run)
+    
+    def combined(finished):
+        return {
+            "results": {p["analysis"]: p["result"] for p in finished if "result" in p},
+            "errors": {p["analysis"]: p["error"] for p in finished if "error" in p},
+            "timestamp": timestamp
+        }
+    
+    if request.form.get('stream', 'true').lower() != 'true':
+        return jsonify({"success": True, **combined(list(partials))})
+    
+    def events():
+        finished = []
+        for partial in partials:
+            finished.append(partial)
+            yield f"data: {json.dumps(partial)}\n\n"
+        yield f"data: {json.dumps({'done': True, **combined(finished)})}\n\n"
+    
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/chatbot', methods=['POST'])
 def chatbot_api():
     """Process a user voice query and return an AI-generated response."""
@@ -299,6 +724,7 @@ def manage_chatbot_responses():
             
             db.session.add(new_response)
             db.session.commit()
+            index_chatbot_response(new_response)
             
             return jsonify({
                 "success": True,
@@ -325,10 +751,9 @@ def add_knowledge_base_item(question, answer, category="general"):
     """
     try:
         # Check if this question already exists to avoid duplicates
-        existing_item = KnowledgeBase.query.filter(
-            KnowledgeBase.question.ilike(f"%{question}%"),
-            KnowledgeBase.active == True
-        ).first()
+        ensure_knowledge_index()
+        existing_id = knowledge_index.find_question(question)
+        existing_item = KnowledgeBase.query.get(existing_id) if existing_id is not None else None
         
         if existing_item:
             print(f"Knowledge base item already exists for question: {question}")
@@ -337,6 +762,7 @@ def add_knowledge_base_item(question, answer, category="general"):
                 existing_item.answer = answer
                 existing_item.updated_at = datetime.datetime.utcnow()
                 db.session.commit()
+                index_knowledge_item(existing_item)
                 print(f"Updated existing knowledge base item: {existing_item.id}")
             return existing_item
             
@@ -349,6 +775,7 @@ def add_knowledge_base_item(question, answer, category="general"):
         
         db.session.add(new_item)
         db.session.commit()
+        index_knowledge_item(new_item)
         
         print(f"Added new knowledge base item: {new_item.id}")
         return new_item
@@ -440,6 +867,35 @@ def add_knowledge_api():
     except Exception as e:
         return jsonify({"error": f"Error: {str(e)}"}), 500
 
+@app.route('/api/capture-hints', methods=['GET'])
+def capture_hints_api():
+    """Suggested capture size, JPEG quality and frame rate for each camera mode."""
+    return jsonify({"success": True, "hints": capture_hints.all_hints(), "timestamp": str(time.time())})
+
+@app.route('/api/vision-cache', methods=['GET'])
+def vision_cache_stats():
+    """Report hit/miss counters of the vision result cache, summed over the vision workers if there are any."""
+    if not openai_service.vision_cache:
+        return jsonify({"success": True, "enabled": False, "timestamp": str(time.time())})
+    
+    # Each worker caches its own results; the app process's cache is unused
+    stats = openai_service.vision_cache.stats() if vision_executor is None else vision_executor.vision_cache_stats()
+    return jsonify({
+        "success": True,
+        "enabled": True,
+        "stats": stats,
+        "timestamp": str(time.time())
+    })
+
+@app.route('/api/chatbot-cache', methods=['GET'])
+def chatbot_cache_stats():
+    """Report hit rate and latency saved by the chatbot response cache."""
+    return jsonify({
+        "success": True,
+        "stats": response_cache.stats(),
+        "timestamp": str(time.time())
+    })
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for Replit."""
@@ -0,0 +1,474 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import subprocess
+import tracemalloc
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Phone camera resolutions the synthetic frames are generated at
+PHONE_RESOLUTIONS = [(1280, 720), (1920, 1080), (4032, 3024)]
+
+# Vision functions benchmarked by default
+BENCHMARK_FUNCTIONS = ["analyze_image", "describe_surroundings", "recognize_text"]
+
+# Relative slowdown of a latency percentile reported as a regression
+REGRESSION_THRESHOLD = 0.10
+
+# Budget for importing openai_services in a fresh interpreter, numpy and Pillow included.
+# Labels, lookup tables and models are loaded lazily, so importing must stay well below this.
+IMPORT_TIME_BUDGET_MS = 500
+
+# Run in a child interpreter to time the import and list resources it loaded eagerly
+IMPORT_PROBE = """
+import json, time
+start = time.perf_counter()
+import openai_services
+elapsed = (time.perf_counter() - start) * 1000
+from vision_resources import resources
+loaded = [name for name, state in resources.stats().items() if state["loaded"]]
+print(json.dumps({"import_ms": elapsed, "loaded": loaded}))
+"""
+
+RECORDED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+SIGN_TEXT = ["EXIT", "Platform 2", "Way out", "Push door", "Pharmacy open 9-5", "Bus stop 14"]
+
+def load_font(size):
+    """Default PIL font at the given size where supported."""
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has a single fixed-size default font
+        return ImageFont.load_default()
+
+def synthetic_frame(width, height, lighting, clutter, text, seed=0):
+    """
+    Draw a deterministic test scene.
+    
+    Args:
+        width (int): Frame width in pixels
+        height (int): Frame height in pixels
+        lighting (str): "dark" or "bright"
+        clutter (str): "cluttered" (many shapes and edges) or "empty" (smooth wall and floor)
+        text (bool): Whether to draw sign text
+        seed (int): Random seed; the same arguments always give the same frame
+    
+    Returns:
+        PIL.Image.Image: RGB frame
+    """
+    rng = np.random.default_rng(seed)
+    
+    # Wall above, floor below, with a soft vertical gradient
+    rows = np.linspace(0, 1, height)[:, None, None]
+    wall = np.array([200, 195, 185])
+    floor = np.array([120, 110, 100])
+    horizon = 0.6
+    pixels = np.where(rows < horizon, wall - 40 * rows, floor + 30 * (rows - horizon))
+    pixels = np.broadcast_to(pixels, (height, width, 3)).astype(np.float32)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(image)
+    
+    if clutter == "cluttered":
+        for _ in range(40):
+            left, top = rng.integers(0, width), rng.integers(0, height)
+            right = left + rng.integers(width // 40, width // 6)
+            bottom = top + rng.integers(height // 40, height // 5)
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            if rng.random() < 0.5:
+                draw.rectangle((left, top, right, bottom), fill=color)
+            else:
+                draw.ellipse((left, top, right, bottom), fill=color, outline=(0, 0, 0))
+        for _ in range(20):
+            points = [tuple(int(v) for v in rng.integers(0, [width, height])) for _ in range(2)]
+            draw.line(points, fill=(30, 30, 30), width=max(1, width // 400))
+    
+    if text:
+        font = load_font(max(12, height // 18))
+        sign_left, sign_top = width // 10, height // 10
+        draw.rectangle((sign_left, sign_top, sign_left + width // 2, sign_top + height // 3), fill=(245, 245, 240))
+        for i, line in enumerate(rng.choice(SIGN_TEXT, size=3, replace=False)):
+            draw.text((sign_left + width // 40, sign_top + height // 60 + i * height // 11), str(line),
+                      fill=(15, 15, 15), font=font)
+    
+    pixels = np.asarray(image).astype(np.float32)
+    if lighting == "dark":
+        pixels = pixels * 0.12
+    pixels += rng.normal(0, 4, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+def synthetic_frames(resolutions=PHONE_RESOLUTIONS, quality=85):
+    """
+    Every combination of lighting, clutter and text at each resolution, as JPEG uploads.
+    
+    Returns:
+        list: (name, encoded bytes) tuples
+    """
+    frames = []
+    seed = 0
+    for width, height in resolutions:
+        for lighting in ("dark", "bright"):
+            for clutter in ("cluttered", "empty"):
+                for text in (True, False):
+                    image = synthetic_frame(width, height, lighting, clutter, text, seed)
+                    buffer = io.BytesIO()
+                    image.save(buffer, 'JPEG', quality=quality)
+                    name = f"{width}x{height}-{lighting}-{clutter}-{'text' if text else 'notext'}"
+                    frames.append((name, buffer.getvalue()))
+                    seed += 1
+    return frames
+
+def recorded_frames(directory):
+    """
+    Returns:
+        list: (file name, bytes) of the image files in a directory, sorted by name
+    """
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(RECORDED_EXTENSIONS):
+            with open(os.path.join(directory, name), 'rb') as f:
+                frames.append((name, f.read()))
+    return frames
+
+def percentile_summary(values):
+    """
+    Returns:
+        dict: p50, p95, p99, mean and max of the values
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(values.mean()), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+def current_rss_mb():
+    """
+    Current resident set size of this process, in MB.
+    
+    Reads /proc/self/statm where available. Elsewhere it falls back to the
+    lifetime peak from getrusage, which never goes down, so growth measured
+    with it is only an upper bound.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def measure_import_time(runs=5, budget_ms=IMPORT_TIME_BUDGET_MS):
+    """
+    Time importing openai_services in fresh interpreters.
+    
+    Args:
+        runs (int): Number of child interpreters started
+        budget_ms (float): Allowed median import time
+    
+    Returns:
+        dict: import_ms percentiles, the budget, the resources that were
+            loaded during import (expected to be none) and whether the
+            import is over budget
+    """
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-c', IMPORT_PROBE],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        )
+        probe = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(probe["import_ms"])
+        loaded.update(probe["loaded"])
+    
+    summary = percentile_summary(timings)
+    return {
+        "import_ms": summary,
+        "budget_ms": budget_ms,
+        "loaded_at_import": sorted(loaded),
+        "over_budget": summary["p50"] > budget_ms or bool(loaded),
+    }
+
+def benchmark_function(function, frames, iterations=5, warmup=1):
+    """
+    Time a vision function and measure its memory use.
+    
+    Latency is measured without tracing. Allocations are then measured in a
+    separate pass with tracemalloc, one call per frame, so tracing does not
+    distort the timings. RSS is read after the warm-up and again after the
+    timed calls, so models loaded on first use are not counted as growth and
+    each function is measured independently of the ones run before it.
+    
+    Args:
+        function (callable): Vision function taking an encoded image
+        frames (list): (name, bytes) tuples
+        iterations (int): Timed calls per frame
+        warmup (int): Untimed calls per frame before timing
+    
+    Returns:
+        dict: latency_ms percentiles, alloc_peak_kb (peak traced allocation)
+            and retained_blocks (allocations still alive after the call)
+            percentiles per call, rss_mb after the timed calls and
+            rss_growth_mb during them
+    """
+    for _, data in frames:
+        for _ in range(warmup):
+            function(data)
+    
+    rss_before = current_rss_mb()
+    latencies = []
+    for _, data in frames:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            function(data)
+            latencies.append((time.perf_counter() - start) * 1000)
+    rss_after = current_rss_mb()
+    
+    peaks = []
+    blocks = []
+    tracemalloc.start()
+    try:
+        for _, data in frames:
+            tracemalloc.clear_traces()
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            function(data)
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            peaks.append((peak - current) / 1024)
+            blocks.append(sum(max(stat.count_diff, 0) for stat in after.compare_to(before, 'filename')))
+    finally:
+        tracemalloc.stop()
+    
+    return {
+        "calls": len(latencies),
+        "latency_ms": percentile_summary(latencies),
+        "alloc_peak_kb": percentile_summary(peaks),
+        "retained_blocks": percentile_summary(blocks),
+        "rss_mb": round(rss_after, 1),
+        "rss_growth_mb": round(rss_after - rss_before, 1),
+    }
+
+def run_benchmarks(frames, functions=BENCHMARK_FUNCTIONS, iterations=5, warmup=1):
+    """
+    Benchmark each vision function on the same frames.
+    
+    Returns:
+        dict: Environment details and per-function results
+    """
+    import openai_services
+    
+    results = {
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "frames": len(frames),
+        "iterations": iterations,
+        "functions": {},
+    }
+    for name in functions:
+        print(f"Benchmarking {name} on {len(frames)} frames...")
+        results["functions"][name] = benchmark_function(getattr(openai_services, name), frames, iterations, warmup)
+    return results
+
+def check_text_regions(name, data):
+    """
+    Text regions are found in frames with a sign and only there: the wall,
+    floor, horizon and clutter of the no-text frames must not look like text.
+    
+    Returns:
+        str: What went wrong, or None
+    """
+    import openai_services
+    from text_regions import find_text_regions
+    
+    regions = find_text_regions(openai_services.decode_text_frame(data).full_gray_image)
+    if name.endswith("-notext") and regions:
+        return f"{len(regions)} text regions in a frame without text, e.g. {regions[0]}"
+    if name.endswith("-text") and not regions:
+        return "no text regions in a frame with a sign"
+    return None
+
+def check_pyramid_early_exit(name, data):
+    """
+    Cluttered frames and frames with a sign, dark ones included, must not
+    take analyze_image_pyramid's early exit for a covered camera or plain
+    surface.
+    
+    Returns:
+        str: What went wrong, or None
+    """
+    import openai_services
+    
+    if "-cluttered-" not in name and not name.endswith("-text"):
+        return None
+    result = openai_services.analyze_image_pyramid(data)
+    if result["reason"] == "uniform":
+        return f"reported as a plain surface at the {result['level']}px level"
+    return None
+
+# Behaviour the synthetic frames must show, checked before timing anything
+FRAME_CHECKS = [check_text_regions, check_pyramid_early_exit]
+
+def check_frames(frames, checks=FRAME_CHECKS):
+    """
+    Run the behaviour checks on synthetic frames.
+    
+    Args:
+        frames (list): (name, bytes) tuples from synthetic_frames
+        checks (list): Functions taking (name, bytes) and returning a failure message or None
+    
+    Returns:
+        list: Dicts with frame, check and failure message, empty if all passed
+    """
+    failures = []
+    for name, data in frames:
+        for check in checks:
+            failure = check(name, data)
+            if failure:
+                failures.append({"frame": name, "check": check.__name__, "failure": failure})
+    return failures
+
+def compare_results(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare latency percentiles with a stored baseline.
+    
+    Args:
+        results (dict): Output of run_benchmarks
+        baseline (dict): Earlier output of run_benchmarks
+        threshold (float): Relative slowdown reported as a regression
+    
+    Returns:
+        list: One dict per function and percentile with baseline, current,
+            relative change and whether it is a regression
+    """
+    comparison = []
+    for name, current in results["functions"].items():
+        previous = baseline.get("functions", {}).get(name)
+        if not previous:
+            continue
+        for key in ("p50", "p95", "p99"):
+            before = previous["latency_ms"][key]
+            after = current["latency_ms"][key]
+            change = (after - before) / before if before else 0.0
+            comparison.append({
+                "function": name,
+                "percentile": key,
+                "baseline_ms": before,
+                "current_ms": after,
+                "change": round(change, 3),
+                "regression": change > threshold,
+            })
+    return comparison
+
+def print_report(results, comparison=None):
+    """Print a table of the results and any baseline comparison."""
+    print(f"{'function':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'alloc KB':>12}{'retained':>10}{'RSS MB':>10}{'RSS +MB':>10}")
+    for name, result in results["functions"].items():
+        latency = result["latency_ms"]
+        print(f"{name:<24}{latency['p50']:>10.1f}{latency['p95']:>10.1f}{latency['p99']:>10.1f}"
+              f"{result['alloc_peak_kb']['p50']:>12.0f}{result['retained_blocks']['p50']:>10.0f}{result['rss_mb']:>10.1f}{result['rss_growth_mb']:>10.1f}")
+    
+    for row in comparison or []:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['function']} {row['percentile']}: {row['baseline_ms']:.1f} -> {row['current_ms']:.1f} ms "
+              f"({row['change']:+.1%}) {flag}")
+    
+    for failure in results.get("check_failures", []):
+        print(f"CHECK FAILED {failure['check']} on {failure['frame']}: {failure['failure']}")
+    
+    import_time = results.get("import")
+    if import_time:
+        flag = "OVER BUDGET" if import_time["over_budget"] else ""
+        print(f"import openai_services: p50 {import_time['import_ms']['p50']:.1f} ms "
+              f"(budget {import_time['budget_ms']:.0f} ms) {flag}")
+        if import_time["loaded_at_import"]:
+            print(f"Resources loaded at import: {', '.join(import_time['loaded_at_import'])}")
+
+def main(argv=None):
+    """
+    Command line entry point, e.g.
+    python benchmark_vision.py --output results.json --baseline baseline.json
+    
+    Returns:
+        int: Exit status, 1 if a regression against the baseline was found,
+            a behaviour check failed or the import-time budget was exceeded
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Smart Sight vision functions.")
+    parser.add_argument('--frames-dir', help="Directory of recorded frames to use instead of synthetic ones")
+    parser.add_argument('--resolution', action='append', metavar='WxH',
+                        help="Synthetic frame resolution (repeatable, default: common phone resolutions)")
+    parser.add_argument('--functions', nargs='+', default=BENCHMARK_FUNCTIONS, help="Vision functions to benchmark")
+    parser.add_argument('--iterations', type=int, default=5, help="Timed calls per frame")
+    parser.add_argument('--warmup', type=int, default=1, help="Untimed calls per frame")
+    parser.add_argument('--output', help="Write the JSON results to this file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown counted as a regression (default 0.10)")
+    parser.add_argument('--import-runs', type=int, default=5,
+                        help="Fresh interpreters used to time the import (0 to skip)")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_TIME_BUDGET_MS,
+                        help="Allowed median import time in ms (default 500)")
+    args = parser.parse_args(argv)
+    
+    if args.frames_dir:
+        frames = recorded_frames(args.frames_dir)
+        if not frames:
+            parser.error(f"No image files found in {args.frames_dir}")
+    else:
+        resolutions = PHONE_RESOLUTIONS
+        if args.resolution:
+            resolutions = [tuple(int(v) for v in size.lower().split('x')) for size in args.resolution]
+        frames = synthetic_frames(resolutions)
+    
+    # Measured before the benchmarks import openai_services into this process
+    import_time = None
+    if args.import_runs > 0:
+        import_time = measure_import_time(args.import_runs, args.import_budget)
+    
+    # Recorded frames have no expected results to check against
+    failures = [] if args.frames_dir else check_frames(frames)
+    
+    results = run_benchmarks(frames, args.functions, args.iterations, args.warmup)
+    results["source"] = args.frames_dir or "synthetic"
+    results["check_failures"] = failures
+    if import_time:
+        results["import"] = import_time
+    
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison = compare_results(results, json.load(f), args.threshold)
+        results["comparison"] = comparison
+    
+    print_report(results, comparison)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    
+    # Non-zero exit status lets CI fail on a regression
+    if comparison and any(row["regression"] for row in comparison):
+        return 1
+    if failures:
+        return 1
+    if import_time and import_time["over_budget"]:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,110 @@
+import threading
+
+# Capture limits per client mode. The hinted longest side, JPEG quality and
+# frame rate move between the min and max values, aiming at target_ms of
+# server processing time. Scene analysis runs at 224x224, so identify and
+# navigate never need much more than twice that; text needs real detail.
+CAPTURE_PROFILES = {
+    "identify": {"min_side": 256, "max_side": 480, "min_quality": 0.5, "max_quality": 0.8,
+                 "min_fps": 0.5, "max_fps": 2.0, "target_ms": 250},
+    "navigate": {"min_side": 256, "max_side": 480, "min_quality": 0.5, "max_quality": 0.8,
+                 "min_fps": 0.5, "max_fps": 2.0, "target_ms": 250},
+    "read": {"min_side": 960, "max_side": 1600, "min_quality": 0.7, "max_quality": 0.9,
+             "min_fps": 0.2, "max_fps": 0.5, "target_ms": 1500},
+}
+
+# Weight of the newest sample in the latency moving average
+LATENCY_SMOOTHING = 0.3
+
+# Samples between adjustments, so the average can catch up with the last change
+ADJUST_EVERY = 3
+
+# Level change per adjustment: back off quickly when slow, recover slowly when fast
+LEVEL_DOWN_STEP = 0.25
+LEVEL_UP_STEP = 0.1
+
+# Latency below this fraction of the target lets the hints grow again
+RECOVER_FRACTION = 0.5
+
+class CaptureHints:
+    """
+    Per-mode capture hints for clients, adapted to measured processing latency.
+    
+    Each mode has a level between 0 (smallest, lowest quality, slowest frame
+    rate) and 1 (largest). It starts at 1; when the moving average of the
+    server's processing time for that mode exceeds the profile's target the
+    level drops, and when it is well under the target the level rises again.
+    Smaller uploads cost less bandwidth and less decode time.
+    """
+    
+    def __init__(self, profiles=CAPTURE_PROFILES, smoothing=LATENCY_SMOOTHING):
+        """
+        Args:
+            profiles (dict): Capture limits per mode, see CAPTURE_PROFILES
+            smoothing (float): Weight of the newest latency sample (0-1)
+        """
+        self.profiles = profiles
+        self.smoothing = smoothing
+        self._level = {mode: 1.0 for mode in profiles}
+        self._latency = {mode: None for mode in profiles}
+        self._samples = {mode: 0 for mode in profiles}
+        self._lock = threading.Lock()
+    
+    def record(self, mode, latency_ms):
+        """
+        Add a processing-time sample and adjust the mode's level.
+        
+        Args:
+            mode (str): Capture mode ("identify", "navigate" or "read")
+            latency_ms (float): Server time spent on one upload, decode included
+        """
+        if mode not in self.profiles:
+            return
+        target = self.profiles[mode]["target_ms"]
+        with self._lock:
+            previous = self._latency[mode]
+            average = latency_ms if previous is None else previous + self.smoothing * (latency_ms - previous)
+            self._latency[mode] = average
+            self._samples[mode] += 1
+            if self._samples[mode] % ADJUST_EVERY:
+                return
+            if average > target:
+                self._level[mode] = max(0.0, self._level[mode] - LEVEL_DOWN_STEP)
+            elif average < target * RECOVER_FRACTION:
+                self._level[mode] = min(1.0, self._level[mode] + LEVEL_UP_STEP)
+    
+    def hints(self, mode):
+        """
+        Args:
+            mode (str): Capture mode
+        
+        Returns:
+            dict: mode, max_side (longest side in pixels), jpeg_quality (0-1),
+                max_fps and the latency_ms average the hints are based on,
+                or None for an unknown mode
+        """
+        profile = self.profiles.get(mode)
+        if profile is None:
+            return None
+        with self._lock:
+            level = self._level[mode]
+            latency = self._latency[mode]
+        
+        def between(key):
+            return profile[f"min_{key}"] + level * (profile[f"max_{key}"] - profile[f"min_{key}"])
+        
+        return {
+            "mode": mode,
+            # Multiples of 16 match JPEG blocks
+            "max_side": int(between("side")) // 16 * 16,
+            "jpeg_quality": round(between("quality"), 2),
+            "max_fps": round(between("fps"), 2),
+            "latency_ms": None if latency is None else round(latency, 1),
+        }
+    
+    def all_hints(self):
+        """
+        Returns:
+            dict: Hints for every mode
+        """
+        return {mode: self.hints(mode) for mode in self.profiles}
\ No newline at end of file
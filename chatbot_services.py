@@ -1,19 +1,162 @@
 import os
 import random
 import datetime
+import time
 from voice_service import text_to_speech
+from sqlalchemy import func
 from models import db, ChatbotResponse, UserQuery, KnowledgeBase
 from web_search import search_web
 from query_classifier import is_web_search_query
+from knowledge_search import create_search_backend
+from fuzzy_index import FuzzyMatcher
+from intent_router import IntentRouter
+from response_cache import ResponseCache, RESPONSE_CLASS_TTLS, VERSION_CHECK_INTERVAL, UNCACHED, normalize_query
 
 # Chatbot name and configuration
 CHATBOT_NAME = "Smart Sight Assistant"
 USE_WEB_SEARCH = True  # Enable or disable web search functionality
 USE_PERPLEXITY = False  # Perplexity API has been disabled
 
+# Keyword rules for canned replies, highest priority first, compiled once
+# into a single automaton. knowledge_question only decides the fallback
+# reply for questions nothing else answered.
+CHATBOT_RULES = [
+    ("time", ["time", "what time", "hour", "clock"]),
+    ("date", ["date", "day", "today", "month", "year"]),
+    ("weather", ["weather", "temperature", "forecast", "rain", "snow"]),
+    ("greeting", ["hello", "hi ", "hey", "greetings", "good morning", "good afternoon", "good evening"]),
+    ("identify", ["identify", "recognize", "what is this", "what do you see", "what's in front of me"]),
+    ("navigate", ["navigate", "direction", "guide me", "where am i", "help me walk"]),
+    ("read_text", ["read text", "read this", "what does it say", "scan text"]),
+    ("name", ["your name", "who are you", "what's your name", "what are you called"]),
+    ("help", ["how to use", "help me", "instructions", "tutorial", "what can you do", "how does this work"]),
+    ("about_app", ["what is smart sight", "about this app", "tell me about this app"]),
+    ("emergency", ["emergency", "help me", "danger", "unsafe", "911", "police", "ambulance"]),
+    ("location", ["where am i", "my location", "lost", "find my way"]),
+    ("directions", ["take me to", "how do i get to", "directions to"]),
+    ("support", ["lonely", "sad", "depressed", "anxious", "scared", "worried"]),
+    ("thanks", ["thank", "thanks", "appreciate", "grateful"]),
+    ("goodbye", ["bye", "goodbye", "see you", "that's all", "exit", "quit", "stop"]),
+    ("joke", ["tell me a joke", "make me laugh", "say something funny"]),
+    ("feedback", ["feedback", "suggestion", "improve", "problem with app"]),
+    ("personal", ["how are you", "how do you feel", "are you real", "are you human"]),
+    ("battery", ["battery", "charge", "power", "device status"]),
+    ("volume", ["volume up", "louder", "volume down", "quieter", "mute"]),
+    ("knowledge_question", ["what is", "who is", "where is", "when", "why", "how does"]),
+]
+
+chatbot_router = IntentRouter(CHATBOT_RULES)
+
+# Rules whose replies change between calls: clock readings and random picks
+DYNAMIC_RULES = {"time", "date", "greeting", "thanks", "goodbye", "joke", "personal"}
+
+def knowledge_version():
+    """
+    Version of the stored answers, read from the database so writes by any
+    server change it. Needs an app context.
+    
+    Returns:
+        tuple: Row count and latest updated_at of the knowledge base and of the chatbot responses
+    """
+    return tuple(tuple(db.session.query(func.count(model.id), func.max(model.updated_at)).one())
+                 for model in (KnowledgeBase, ChatbotResponse))
+
+# Replies cached per normalized query; RESPONSE_CACHE_<CLASS>_TTL sets the
+# seconds each class (static, dynamic, external) stays valid, 0 disables it.
+# Edits made by other servers clear it within RESPONSE_CACHE_VERSION_INTERVAL seconds.
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', '512')),
+    ttls={response_class: float(os.environ.get(f'RESPONSE_CACHE_{response_class.upper()}_TTL', ttl))
+          for response_class, ttl in RESPONSE_CLASS_TTLS.items()},
+    version=knowledge_version,
+    version_interval=float(os.environ.get('RESPONSE_CACHE_VERSION_INTERVAL', VERSION_CHECK_INTERVAL))
+)
+
 # Cache for storing previous conversations to maintain context
 conversation_cache = {}
 
+# Search over knowledge-base questions and response patterns: full-text search
+# in PostgreSQL or SQLite, chosen from DATABASE_URL, else a process-local index.
+# KNOWLEDGE_SEARCH_BACKEND ("memory", "postgres" or "sqlite") overrides the choice.
+knowledge_index = create_search_backend(os.environ.get('DATABASE_URL'),
+                                        os.environ.get('KNOWLEDGE_SEARCH_BACKEND'))
+
+def load_knowledge_index():
+    """
+    Set up the knowledge search: check that the database's full-text index
+    has been migrated or load the in-memory one from the active rows, which
+    also stands in for a database index not migrated yet. Needs an app context.
+    
+    Returns:
+        dict: Search backend statistics
+    """
+    knowledge_index.setup()
+    load_fuzzy_matcher()
+    return {**knowledge_index.stats(), "fuzzy": fuzzy_matcher.stats()}
+
+def migrate_knowledge_search():
+    """
+    Add the database's full-text index to the schema, a one-off step run
+    from the command line rather than on a live app. Needs an app context.
+    
+    Returns:
+        dict: Search backend statistics after the migration
+    """
+    knowledge_index.migrate()
+    return load_knowledge_index()
+
+def ensure_knowledge_index():
+    """Build the knowledge index on first use if it was not built at startup."""
+    if not knowledge_index.loaded:
+        load_knowledge_index()
+
+# Typo-tolerant trigram matching for queries the knowledge search missed
+fuzzy_matcher = FuzzyMatcher()
+
+def load_fuzzy_matcher():
+    """Rebuild the fuzzy matcher from the active database rows. Needs an app context."""
+    fuzzy_matcher.load(
+        KnowledgeBase.query.filter_by(active=True).all(),
+        ChatbotResponse.query.filter_by(active=True).all()
+    )
+
+def index_knowledge_item(item):
+    """Make a KnowledgeBase row written by this process searchable."""
+    knowledge_index.add_knowledge(item)
+    fuzzy_matcher.invalidate()
+    response_cache.invalidate()
+
+def index_chatbot_response(response):
+    """Make a ChatbotResponse row written by this process searchable."""
+    knowledge_index.add_response(response)
+    fuzzy_matcher.invalidate()
+    response_cache.invalidate()
+
+def fuzzy_match(query):
+    """
+    Find the stored answer closest to a query the exact search missed,
+    e.g. one with words misheard by speech recognition.
+    
+    Args:
+        query (str): Lowercased user query
+    
+    Returns:
+        dict: Best match (source, id, answer, similarity), or None
+    """
+    try:
+        if fuzzy_matcher.needs_load():
+            load_fuzzy_matcher()
+        matches = fuzzy_matcher.search(query)
+    except Exception as e:
+        print(f"Error in fuzzy knowledge matching: {str(e)}")
+        return None
+    
+    if not matches:
+        return None
+    print(f"Found fuzzy {matches[0]['source']} match ({matches[0]['similarity']}) for query: {query}, "
+          f"candidates: {[(match['id'], match['similarity']) for match in matches]}")
+    return matches[0]
+
 def get_chatbot_response(user_query, session_id="default", use_memory=True):
     """
     Get a response from the AI chatbot based on the user's query.
@@ -66,6 +209,7 @@ def generate_simple_response(query):
     """
     Generate a simple response when no API key is available.
     This is an enhanced local chatbot that provides responses to common queries.
+    Replies are cached per normalized query, see response_cache.
     
     Args:
         query (str): The user's question
@@ -73,69 +217,97 @@ def generate_simple_response(query):
     Returns:
         str: A contextually appropriate response based on pattern matching
     """
-    import datetime
+    # The normalized query is both the cache key and what is looked up
+    query = normalize_query(query)
+    
+    cached = response_cache.get(query)
+    if cached is not None:
+        return cached
     
-    query = query.lower().strip()
+    start = time.perf_counter()
+    response, response_class = answer_query(query)
+    if response_class != UNCACHED:
+        response_cache.put(query, response, response_class, (time.perf_counter() - start) * 1000)
+    return response
+
+def answer_query(query):
+    """
+    Work out the reply to a query, uncached.
     
+    Args:
+        query (str): The user's question, normalized by normalize_query
+        
+    Returns:
+        tuple: (reply, cache class): "static" for stored and fixed replies,
+            "dynamic" for clock readings and random picks, "external" for
+            replies that depend on a web search, UNCACHED for fallbacks
+            given because a lookup failed
+    """
     # First, check if we have a matching response in the knowledge base or db
     try:
-        # 1. First, check the knowledge base with exact word match
-        knowledge_item_exact = KnowledgeBase.query.filter(
-            KnowledgeBase.question.ilike(f"%{query}%"),
-            KnowledgeBase.active == True
-        ).first()
+        # One index lookup covers, in order: a knowledge base question containing
+        # the query, one containing a significant word of it, then a predefined
+        # chatbot response pattern containing the query
+        ensure_knowledge_index()
+        match = knowledge_index.match(query)
         
-        if knowledge_item_exact:
+        if match and match["source"] == "knowledge":
             print(f"Found exact matching knowledge base item for query: {query}")
-            return knowledge_item_exact.answer
-        
-        # 2. Then look for partial word matches in the knowledge base
-        query_words = query.split()
-        if len(query_words) > 1:
-            for word in query_words:
-                if len(word) > 3:  # Only use significant words (longer than 3 chars)
-                    knowledge_item_partial = KnowledgeBase.query.filter(
-                        KnowledgeBase.question.ilike(f"%{word}%"),
-                        KnowledgeBase.active == True
-                    ).first()
-                    
-                    if knowledge_item_partial:
-                        print(f"Found partial matching knowledge base item for word '{word}' in query: {query}")
-                        return knowledge_item_partial.answer
+        elif match and match["source"] == "knowledge_word":
+            print(f"Found partial matching knowledge base item for word '{match['word']}' in query: {query}")
         
-        # 3. Fall back to predefined chatbot responses
-        db_response = ChatbotResponse.query.filter(
-            ChatbotResponse.pattern.ilike(f"%{query}%"), 
-            ChatbotResponse.active == True
-        ).first()
-        
-        if db_response:
-            return db_response.response
+        if match:
+            return match["answer"], "static"
             
     except Exception as e:
         print(f"Error querying database for response: {str(e)}")
-        # Continue with fallback responses if database query fails
+        # Continue with fallback responses if database query fails; the
+        # knowledge base may have had the answer, so the reply is not cached
+        return fallback_response(query)[0], UNCACHED
+    
+    return fallback_response(query)
+
+def fallback_response(query):
+    """
+    Reply to a query the knowledge search did not answer: keyword rules,
+    then fuzzy matching, then a web search or a general reply.
+    
+    Args:
+        query (str): The user's question, normalized by normalize_query
+        
+    Returns:
+        tuple: (reply, cache class), see answer_query
+    """
+    import datetime
     
     # Initial welcome message that's triggered by a special key
     if query == "__welcome_message__":
-        return f"Hello, I'm {CHATBOT_NAME}, your Smart Sight assistant. How can I help you today?"
+        return f"Hello, I'm {CHATBOT_NAME}, your Smart Sight assistant. How can I help you today?", "static"
+    
+    # One pass over the query finds every keyword rule that fires; the
+    # first in CHATBOT_RULES picks the reply, as the if/elif order did
+    route = chatbot_router.route(query)
+    rule = route["rule"]
+    if rule:
+        print(f"Chatbot rule '{rule}' matched '{route['phrase']}' in query: {query}")
+    response_class = "dynamic" if rule in DYNAMIC_RULES else "static"
     
     # Time-related questions
-    if any(word in query for word in ["time", "what time", "hour", "clock"]):
+    if rule == "time":
         now = datetime.datetime.now()
-        return f"The current time is {now.strftime('%I:%M %p')}."
+        return f"The current time is {now.strftime('%I:%M %p')}.", response_class
     
     # Date-related questions
-    elif any(word in query for word in ["date", "day", "today", "month", "year"]):
+    elif rule == "date":
         now = datetime.datetime.now()
-        return f"Today is {now.strftime('%A, %B %d, %Y')}."
+        return f"Today is {now.strftime('%A, %B %d, %Y')}.", response_class
     
     # Weather-related questions
-    elif any(word in query for word in ["weather", "temperature", "forecast", "rain", "snow"]):
-        return f"I don't have access to real-time weather data, but I can help you access a weather service through your device's browser if needed."
+    elif rule == "weather":
+        return f"I don't have access to real-time weather data, but I can help you access a weather service through your device's browser if needed.", response_class
     
     # Greeting patterns
-    elif any(word in query for word in ["hello", "hi ", "hey", "greetings", "good morning", "good afternoon", "good evening"]):
+    elif rule == "greeting":
         now = datetime.datetime.now()
         hour = now.hour
         
@@ -151,69 +323,69 @@ def generate_simple_response(query):
             f"Hi there! {CHATBOT_NAME} here. What can I help you with?",
             f"Greetings! This is {CHATBOT_NAME}. How may I assist you with Smart Sight today?"
         ]
-        return random.choice(greetings)
+        return random.choice(greetings), response_class
     
     # Camera and vision-related commands
-    elif any(word in query for word in ["identify", "recognize", "what is this", "what do you see", "what's in front of me"]):
-        return f"To identify objects around you, I'll need to use your camera. Would you like me to take a picture now and describe what I see?"
+    elif rule == "identify":
+        return f"To identify objects around you, I'll need to use your camera. Would you like me to take a picture now and describe what I see?", response_class
     
     # Navigation-related commands
-    elif any(word in query for word in ["navigate", "direction", "guide me", "where am i", "help me walk"]):
-        return f"I can help guide you based on what I see through your camera. Would you like me to analyze your surroundings and provide navigation guidance?"
+    elif rule == "navigate":
+        return f"I can help guide you based on what I see through your camera. Would you like me to analyze your surroundings and provide navigation guidance?", response_class
     
     # Text reading commands
-    elif any(phrase in query for phrase in ["read text", "read this", "what does it say", "scan text"]):
-        return f"I can read text from images. Would you like me to take a picture now and read any text I can find?"
+    elif rule == "read_text":
+        return f"I can read text from images. Would you like me to take a picture now and read any text I can find?", response_class
     
     # About the chatbot name
-    elif any(phrase in query for phrase in ["your name", "who are you", "what's your name", "what are you called"]):
-        return f"I'm the {CHATBOT_NAME}. I'm designed to help you navigate and understand your surroundings using voice commands and image recognition."
+    elif rule == "name":
+        return f"I'm the {CHATBOT_NAME}. I'm designed to help you navigate and understand your surroundings using voice commands and image recognition.", response_class
     
     # Help with app commands
-    elif any(phrase in query for phrase in ["how to use", "help me", "instructions", "tutorial", "what can you do", "how does this work"]):
-        return f"I'm {CHATBOT_NAME}, your Smart Sight assistant. I can help you in several ways:\n1. Say 'identify objects' to recognize what's around you\n2. Say 'navigate' for guidance in your surroundings\n3. Say 'read text' to extract and read text from images\n4. You can also just ask me questions naturally. How can I help you today?"
+    elif rule == "help":
+        return f"I'm {CHATBOT_NAME}, your Smart Sight assistant. I can help you in several ways:\n1. Say 'identify objects' to recognize what's around you\n2. Say 'navigate' for guidance in your surroundings\n3. Say 'read text' to extract and read text from images\n4. You can also just ask me questions naturally. How can I help you today?", response_class
     
     # Questions about the app
-    elif "what is smart sight" in query or "about this app" in query or "tell me about this app" in query:
-        return f"Smart Sight is a voice-controlled navigation app with the tagline 'Eyes that Listen. Hands that Guide.' I'm {CHATBOT_NAME}, your assistant in this app. Smart Sight is designed specifically for blind and visually impaired users, using advanced technology to identify objects, navigate surroundings, and read text, all through a voice-first interface."
+    elif rule == "about_app":
+        return f"Smart Sight is a voice-controlled navigation app with the tagline 'Eyes that Listen. Hands that Guide.' I'm {CHATBOT_NAME}, your assistant in this app. Smart Sight is designed specifically for blind and visually impaired users, using advanced technology to identify objects, navigate surroundings, and read text, all through a voice-first interface.", response_class
     
     # Emergency help
-    elif any(word in query for word in ["emergency", "help me", "danger", "unsafe", "911", "police", "ambulance"]):
-        return f"If you're in an emergency situation, please say 'Call emergency services' or try to reach out to someone nearby for immediate assistance. Your safety is the priority."
+    elif rule == "emergency":
+        return f"If you're in an emergency situation, please say 'Call emergency services' or try to reach out to someone nearby for immediate assistance. Your safety is the priority.", response_class
     
     # Location-specific help
-    elif any(phrase in query for phrase in ["where am i", "my location", "lost", "find my way"]):
-        return f"To help you determine your location, I can describe what I see around you through the camera. Would you like me to do that now?"
+    elif rule == "location":
+        return f"To help you determine your location, I can describe what I see around you through the camera. Would you like me to do that now?", response_class
     
     # Specific location guidance
-    elif "take me to" in query or "how do i get to" in query or "directions to" in query:
+    elif rule == "directions":
         destination = query.split("to")[-1].strip()
-        return f"To help guide you to {destination}, I'll need to analyze your surroundings using the camera. Would you like me to start navigation guidance?"
+        return f"To help guide you to {destination}, I'll need to analyze your surroundings using the camera. Would you like me to start navigation guidance?", response_class
     
     # Mental health support
-    elif any(word in query for word in ["lonely", "sad", "depressed", "anxious", "scared", "worried"]):
-        return f"I understand that navigating the world can sometimes be challenging and overwhelming. Remember that you're not alone. Would you like me to connect you with support resources or would you prefer some encouraging words?"
+    elif rule == "support":
+        return f"I understand that navigating the world can sometimes be challenging and overwhelming. Remember that you're not alone. Would you like me to connect you with support resources or would you prefer some encouraging words?", response_class
     
     # Thank you responses
-    elif any(phrase in query for phrase in ["thank", "thanks", "appreciate", "grateful"]):
+    elif rule == "thanks":
         gratitude_responses = [
             f"You're welcome! I'm here to help make your day a little easier.",
             f"It's my pleasure to assist you. What else can I help with?",
             f"I'm glad I could help! Is there anything else you need assistance with?"
         ]
-        return random.choice(gratitude_responses)
+        return random.choice(gratitude_responses), response_class
     
     # Goodbye responses
-    elif any(phrase in query for phrase in ["bye", "goodbye", "see you", "that's all", "exit", "quit", "stop"]):
+    elif rule == "goodbye":
         farewell_responses = [
             f"Goodbye! I'm here whenever you need assistance. Just open the app and speak.",
             f"Take care! Remember that {CHATBOT_NAME} is always ready to help when you need me.",
             f"Until next time! Feel free to call on me whenever you need help navigating your world."
         ]
-        return random.choice(farewell_responses)
+        return random.choice(farewell_responses), response_class
     
     # Jokes or entertainment
-    elif "tell me a joke" in query or "make me laugh" in query or "say something funny" in query:
+    elif rule == "joke":
         jokes = [
             "Why don't scientists trust atoms? Because they make up everything!",
             "What do you call a fake noodle? An impasta!",
@@ -221,55 +393,61 @@ def generate_simple_response(query):
             "Why did the blind man fall into the well? Because he couldn't see that well.",
             "What's the best thing about Switzerland? I don't know, but the flag is a big plus."
         ]
-        return random.choice(jokes)
+        return random.choice(jokes), response_class
     
     # Feedback about the app
-    elif any(phrase in query for phrase in ["feedback", "suggestion", "improve", "problem with app"]):
-        return f"Thank you for wanting to provide feedback. Your input helps make Smart Sight better for all users. What specific suggestion or feedback do you have about the app?"
+    elif rule == "feedback":
+        return f"Thank you for wanting to provide feedback. Your input helps make Smart Sight better for all users. What specific suggestion or feedback do you have about the app?", response_class
     
     # Personal questions
-    elif any(phrase in query for phrase in ["how are you", "how do you feel", "are you real", "are you human"]):
+    elif rule == "personal":
         personal_responses = [
             f"I'm {CHATBOT_NAME}, an AI assistant designed to help you navigate your surroundings. I'm functioning well and ready to assist you!",
             f"I'm not human, but I am here specifically to help you interact with your world more easily. How can I help you today?",
             f"I'm doing well, thank you for asking! My purpose is to be your helpful companion in navigating the world around you."
         ]
-        return random.choice(personal_responses)
+        return random.choice(personal_responses), response_class
     
     # Battery or device status
-    elif any(phrase in query for phrase in ["battery", "charge", "power", "device status"]):
-        return f"I don't have direct access to your device's battery information. If you're concerned about battery life, I recommend keeping your device charged regularly since using the camera can use significant power."
+    elif rule == "battery":
+        return f"I don't have direct access to your device's battery information. If you're concerned about battery life, I recommend keeping your device charged regularly since using the camera can use significant power.", response_class
     
     # Volume adjustment
-    elif any(phrase in query for phrase in ["volume up", "louder", "volume down", "quieter", "mute"]):
+    elif rule == "volume":
         if "up" in query or "louder" in query:
-            return f"I've noted your request to increase the volume. Please use your device's volume buttons to adjust to a comfortable level."
+            return f"I've noted your request to increase the volume. Please use your device's volume buttons to adjust to a comfortable level.", response_class
         elif "down" in query or "quieter" in query or "mute" in query:
-            return f"I've noted your request to decrease the volume. Please use your device's volume buttons to adjust to a comfortable level."
+            return f"I've noted your request to decrease the volume. Please use your device's volume buttons to adjust to a comfortable level.", response_class
         else:
-            return f"To adjust the volume, please use your device's volume buttons."
+            return f"To adjust the volume, please use your device's volume buttons.", response_class
     
     # Perplexity API has been completely removed
     # Moving directly to web search functionality
     
+    # A close stored answer to a misheard question beats a slow web search
+    match = fuzzy_match(query)
+    if match:
+        return match["answer"], "static"
+    
     # Check if we should handle this with web search
     if USE_WEB_SEARCH and is_web_search_query(query):
         print(f"Performing web search for: {query}")
         web_response = search_web(query)
         if web_response:
-            return web_response
+            return web_response, "external"
         else:
-            return f"I tried searching the web for information about '{query}', but couldn't find a good answer. Is there something else you'd like to know, or would you like me to help with navigation, object identification, or text reading?"
+            return f"I tried searching the web for information about '{query}', but couldn't find a good answer. Is there something else you'd like to know, or would you like me to help with navigation, object identification, or text reading?", UNCACHED
     
     # General knowledge fallback
-    elif any(word in query for word in ["what is", "who is", "where is", "when", "why", "how does"]):
+    elif "knowledge_question" in route["rules"]:
         if USE_WEB_SEARCH:
             print(f"Performing web search for knowledge question: {query}")
             web_response = search_web(query)
             if web_response:
-                return web_response
+                return web_response, "external"
         
-        return f"That's an interesting question about '{query}'. While I don't have access to a knowledge database right now, I can focus on helping you navigate your surroundings, identify objects, or read text. Would you like help with any of those?"
+        # After a failed web search the question may be answered on a retry
+        return f"That's an interesting question about '{query}'. While I don't have access to a knowledge database right now, I can focus on helping you navigate your surroundings, identify objects, or read text. Would you like help with any of those?", UNCACHED if USE_WEB_SEARCH else "static"
     
     # Default helpful response for queries we can't specifically handle
     else:
@@ -281,7 +459,7 @@ def generate_simple_response(query):
             print(f"Trying web search for unhandled query: {query}")
             web_response = search_web(query)
             if web_response:
-                return web_response
+                return web_response, "external"
         
         responses = [
             f"I heard you asking about '{query_preview}'. I can help you navigate your surroundings, identify objects, or read text. What would you like me to do?",
@@ -289,4 +467,4 @@ def generate_simple_response(query):
             f"Thanks for your question about '{query_preview}'. I'm here to assist with navigating your environment. Would you like me to take a picture and describe what I see?"
         ]
         
-        return random.choice(responses)
\ No newline at end of file
+        return random.choice(responses), "dynamic"
\ No newline at end of file
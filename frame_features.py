@@ -0,0 +1,521 @@
+import base64
+import io
+from functools import cached_property
+import numpy as np
+from PIL import Image
+from gradients import gradient_field
+from vision_resources import resources
+
+# Resolution every analyzer works at
+ANALYSIS_SIZE = (224, 224)
+
+# Bits kept per channel when building the colour histogram (4 -> 4096 bins)
+PALETTE_BITS = 4
+
+# Default pixel budget for a decoded upload; larger non-JPEG images are rejected
+MAX_IMAGE_PIXELS = 16_000_000
+
+# Sides of the grayscale pyramid levels used for coarse-to-fine analysis
+PYRAMID_LEVELS = (28, 56, 224)
+
+# Bits per channel of the skin-tone lookup table (5 -> 32x32x32 entries)
+SKIN_LUT_BITS = 5
+
+# Only every n-th row and column is classified when measuring skin coverage
+SKIN_SAMPLE_STEP = 2
+
+# Default grid used by the scene classifier (3x3); 8x8 gives finer spatial hints
+GRID_SIZE = 3
+
+class FrameFeatures:
+    """
+    Decoded camera frame shared by the vision analyzers.
+    
+    The upload is decoded once; grayscale, RGB, the edge map and the
+    summed-area tables are computed on first access and memoized, so every
+    analyzer reading the same frame pays for each conversion only once.
+    """
+    
+    def __init__(self, image, size=ANALYSIS_SIZE, decode_size=None, max_pixels=MAX_IMAGE_PIXELS):
+        """
+        Args:
+            image (bytes, memoryview, file-like or str): Encoded image upload;
+                a str is treated as base64 for older callers
+            size (tuple): (width, height) the analysis image is resized to
+            decode_size (tuple, optional): Size JPEGs are draft-decoded to;
+                defaults to the analysis size
+            max_pixels (int): Pixel budget for the decoded upload
+        """
+        self.original = open_image(image, decode_size or size, max_pixels)
+        self.size = size
+        self._grid_cache = {}
+        self._palette_cache = {}
+        self._pyramid_cache = {}
+        # Object detections keyed by detector backend name
+        self.detections = {}
+    
+    @cached_property
+    def image(self):
+        """PIL image resized to the analysis resolution."""
+        return self.original.resize(self.size)
+    
+    @cached_property
+    def gray(self):
+        """Grayscale uint8 array of the analysis image."""
+        return np.asarray(self.image.convert('L'))
+    
+    @cached_property
+    def rgb(self):
+        """RGB uint8 array of the analysis image, shape (height, width, 3)."""
+        return np.asarray(self.image.convert('RGB'))
+    
+    @cached_property
+    def gradients(self):
+        """Sobel gradient field of the grayscale analysis image (see gradients.gradient_field)."""
+        return gradient_field(self.gray)
+    
+    @cached_property
+    def edges(self):
+        """Undirected edge map (scaled Sobel magnitude) of the analysis image."""
+        return self.gradients["edges"]
+    
+    @cached_property
+    def skin_fraction(self):
+        """Fraction of (subsampled) pixels the skin lookup table classifies as skin."""
+        step = SKIN_SAMPLE_STEP
+        return float(np.mean(skin_lookup(self.rgb[::step, ::step])))
+    
+    @cached_property
+    def dhash(self):
+        """64-bit difference hash of a 9x8 grayscale thumbnail, for near-duplicate checks."""
+        thumb = np.asarray(Image.fromarray(self.gray).resize((9, 8), Image.BILINEAR), dtype=np.int16)
+        bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+        return int(np.packbits(bits).view('>u8')[0])
+    
+    @cached_property
+    def full_gray_image(self):
+        """Grayscale PIL image at the uploaded resolution (used for text)."""
+        return self.original.convert('L')
+    
+    @cached_property
+    def brightness(self):
+        """Mean brightness of the frame in [0, 1]."""
+        return float(np.mean(self.gray)) / 255
+    
+    @cached_property
+    def edge_strength(self):
+        """Mean edge response over the whole frame."""
+        return float(np.mean(self.edges))
+    
+    @cached_property
+    def integral(self):
+        """
+        Summed-area tables of the analysis image, shape (height + 1, width + 1, 8).
+        
+        Planes are grayscale, grayscale squared, edge response, horizontal and
+        vertical edge response and the R, G and B channels. Entry [y, x] holds the sum over all pixels above and
+        to the left of (x, y), so the sum over any rectangle takes four lookups.
+        """
+        planes = np.dstack([
+            self.gray, self.gray.astype(np.int64) ** 2, self.edges,
+            self.gradients["horizontal"], self.gradients["vertical"], self.rgb
+        ]).astype(np.int64)
+        height, width = self.gray.shape
+        table = np.zeros((height + 1, width + 1, planes.shape[-1]), dtype=np.int64)
+        np.cumsum(np.cumsum(planes, axis=0), axis=1, out=table[1:, 1:])
+        return table
+    
+    def region_stats(self, box):
+        """
+        Grayscale and edge statistics for a rectangle of the analysis image.
+        
+        Read from the summed-area tables, so each call costs the same O(1)
+        whatever the size of the rectangle.
+        
+        Args:
+            box (tuple): (left, top, right, bottom) in pixels, like PIL's crop
+        
+        Returns:
+            dict: mean, std and var of the grayscale pixels, mean edge
+                response overall (edge_mean), across horizontal structure
+                (horizontal_edge_mean) and across vertical structure
+                (vertical_edge_mean) and mean RGB colour; None if the box is empty
+        """
+        height, width = self.gray.shape
+        left, top, right, bottom = box
+        left, right = max(0, min(left, width)), max(0, min(right, width))
+        top, bottom = max(0, min(top, height)), max(0, min(bottom, height))
+        if right <= left or bottom <= top:
+            return None
+        
+        count = (right - left) * (bottom - top)
+        table = self.integral
+        sums = table[bottom, right] - table[top, right] - table[bottom, left] + table[top, left]
+        mean = sums[0] / count
+        var = max(sums[1] / count - mean * mean, 0.0)
+        return {
+            "mean": float(mean),
+            "std": float(np.sqrt(var)),
+            "var": float(var),
+            "edge_mean": float(sums[2] / count),
+            "horizontal_edge_mean": float(sums[3] / count),
+            "vertical_edge_mean": float(sums[4] / count),
+            "rgb_mean": sums[5:] / count,
+        }
+    
+    def pyramid_level(self, side):
+        """
+        Grayscale level of the image pyramid.
+        
+        Box-filtered straight from the decoded upload, so the coarse levels
+        are available without building the full analysis image. The level
+        at the analysis size is the analysis grayscale itself.
+        
+        Args:
+            side (int): Width and height of the level, e.g. one of PYRAMID_LEVELS
+        
+        Returns:
+            numpy.ndarray: uint8 array of shape (side, side)
+        """
+        if (side, side) == tuple(self.size):
+            return self.gray
+        if side not in self._pyramid_cache:
+            self._pyramid_cache[side] = np.asarray(self.full_gray_image.resize((side, side), Image.BOX))
+        return self._pyramid_cache[side]
+    
+    def palette(self, top_k=3, bits=PALETTE_BITS):
+        """
+        Most common colours of the frame from a quantized colour histogram.
+        
+        Pixels are quantized to `bits` per channel, packed into one integer
+        key and counted with np.bincount, so the cost is a fixed few passes
+        over the 224x224 frame however many distinct colours it has.
+        
+        Args:
+            top_k (int): Number of colours to return
+            bits (int): Bits kept per channel
+        
+        Returns:
+            list: Up to top_k (rgb, share) tuples, most common first; rgb is
+                the mean colour of the pixels in that bin and share is the
+                fraction of the frame they cover
+        """
+        key = (top_k, bits)
+        if key in self._palette_cache:
+            return self._palette_cache[key]
+        
+        pixels = self.rgb.reshape(-1, 3)
+        shift = 8 - bits
+        quantized = (pixels >> shift).astype(np.int32)
+        keys = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+        
+        bins = 1 << (3 * bits)
+        counts = np.bincount(keys, minlength=bins)
+        top = np.argpartition(counts, -top_k)[-top_k:] if top_k < bins else np.arange(bins)
+        top = top[np.argsort(counts[top])[::-1]]
+        top = top[counts[top] > 0]
+        
+        # Mean colour per selected bin rather than the bin's corner value
+        sums = [np.bincount(keys, weights=pixels[:, c], minlength=bins)[top] for c in range(3)]
+        total = float(len(keys))
+        colors = [
+            (tuple(int(round(sums[c][i] / counts[b])) for c in range(3)), counts[b] / total)
+            for i, b in enumerate(top)
+        ]
+        self._palette_cache[key] = colors
+        return colors
+    
+    def grid_stats(self, grid_size=GRID_SIZE):
+        """
+        Per-cell statistics for a grid_size x grid_size grid over the frame.
+        
+        The frame is viewed as a (grid, grid, cell_h, cell_w, 3) array so every
+        cell mean, std and edge strength comes out of a single NumPy reduction;
+        the cost depends on the frame size, not on the number of cells.
+        Leftover rows/columns that do not fill a whole cell are ignored.
+        
+        Args:
+            grid_size (int): Number of rows and columns in the grid
+        
+        Returns:
+            dict: grid_size, cell_height, cell_width and per-cell arrays
+                mean (g, g, 3), std (g, g, 3), std_mean (g, g), edge (g, g)
+                and row (g, g); None if the frame is too small for the grid
+        """
+        if grid_size in self._grid_cache:
+            return self._grid_cache[grid_size]
+        
+        stats = grid_reduce(self.rgb, self.edges, grid_size)
+        self._grid_cache[grid_size] = stats
+        return stats
+
+class BufferReader(io.RawIOBase):
+    """
+    Seekable read-only stream over a memoryview or bytearray.
+    
+    io.BytesIO copies such a buffer whole, while PIL reads the encoded image
+    a chunk at a time, so reads are served from slices of the buffer itself,
+    e.g. a vision worker's shared-memory block.
+    """
+    
+    def __init__(self, buffer):
+        """
+        Args:
+            buffer (memoryview or bytearray): Encoded image; must stay valid while it is read
+        """
+        self._buffer = buffer
+        self._position = 0
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def read(self, size=-1):
+        end = len(self._buffer) if size is None or size < 0 else self._position + size
+        chunk = bytes(self._buffer[self._position:end])
+        self._position += len(chunk)
+        return chunk
+    
+    def readinto(self, target):
+        chunk = self._buffer[self._position:self._position + len(target)]
+        target[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._buffer)}[whence]
+        self._position = max(base + offset, 0)
+        return self._position
+    
+    def tell(self):
+        return self._position
+
+def open_image(image, decode_size=None, max_pixels=MAX_IMAGE_PIXELS):
+    """
+    Open an encoded image without copying it more than necessary.
+    
+    Raw bytes are wrapped in a BytesIO, which shares their memory,
+    memoryviews and bytearrays in a BufferReader, and file-like objects
+    (such as an upload stream) are handed to PIL directly. Base64 strings are
+    still accepted for compatibility and are decoded first.
+    
+    Only the header is read here. JPEGs are switched to draft mode so the
+    codec decodes them at the smallest 1/2, 1/4 or 1/8 scale that still
+    covers decode_size, and the size is checked against the pixel budget
+    before any pixel buffer is allocated.
+    
+    Args:
+        image (bytes, bytearray, memoryview, file-like or str): Encoded image
+        decode_size (tuple, optional): (width, height) the image will be used at
+        max_pixels (int, optional): Largest decoded width * height accepted
+        
+    Returns:
+        PIL.Image.Image: The lazily decoded image
+        
+    Raises:
+        ValueError: If the image exceeds the pixel budget
+    """
+    if isinstance(image, str):
+        image = base64.b64decode(image)
+    if isinstance(image, bytes):
+        image = io.BytesIO(image)
+    elif isinstance(image, (bytearray, memoryview)):
+        image = BufferReader(image)
+    opened = Image.open(image)
+    
+    if decode_size and opened.format == 'JPEG':
+        opened.draft(opened.mode, decode_size)
+    
+    width, height = opened.size
+    if max_pixels and width * height > max_pixels:
+        raise ValueError(f"Image too large ({width}x{height} pixels, limit is {max_pixels})")
+    
+    return opened
+
+def rgb_to_gray(rgb):
+    """
+    Convert RGB pixels to grayscale exactly like PIL's convert('L').
+    
+    Args:
+        rgb (numpy.ndarray): uint8 array of shape (..., height, width, 3)
+        
+    Returns:
+        numpy.ndarray: uint8 array of shape (..., height, width)
+    """
+    rgb = rgb.astype(np.uint32)
+    gray = (rgb[..., 0] * 19595 + rgb[..., 1] * 38470 + rgb[..., 2] * 7471 + 0x8000) >> 16
+    return gray.astype(np.uint8)
+
+def skin_rules(rgb):
+    """
+    Boolean mask of pixels matching any of the three skin-tone rules.
+    
+    This is the skin model the lookup table is compiled from; the hot path
+    uses skin_lookup instead of evaluating the rules per pixel.
+    
+    Args:
+        rgb (numpy.ndarray): uint8 array of shape (..., height, width, 3)
+        
+    Returns:
+        numpy.ndarray: Boolean array of shape (..., height, width)
+    """
+    r = rgb[..., 0]
+    g = rgb[..., 1]
+    b = rgb[..., 2]
+    
+    # Create skin masks for different skin tones
+    skin_mask1 = ((r > 95) & (g > 40) & (b > 20) & (r > g) & (r > b))
+    skin_mask2 = ((r > 190) & (g > 110) & (b > 70) & (r > g) & (r > b))
+    skin_mask3 = ((r > 80) & (r < 200) & (g > 30) & (g < 170) & (b > 15) & (b < 140))
+    
+    return skin_mask1 | skin_mask2 | skin_mask3
+
+def build_skin_lut(rule=skin_rules, bits=SKIN_LUT_BITS):
+    """
+    Compile a per-pixel skin rule into a quantized RGB lookup table.
+    
+    Each cell covers a cube of 2**(8 - bits) values per channel. The rule is
+    evaluated on a 2x2x2 set of colours inside every cube and the cell is
+    marked as skin when at least half of them match, so thresholds that fall
+    inside a cube are split close to where the rule puts them.
+    
+    Args:
+        rule (callable): Function mapping a uint8 (..., 3) array to a boolean mask
+        bits (int): Bits kept per channel
+        
+    Returns:
+        numpy.ndarray: Boolean table of shape (2**bits, 2**bits, 2**bits)
+    """
+    cells = 1 << bits
+    step = 1 << (8 - bits)
+    offsets = [step // 4, step - 1 - step // 4] if step > 1 else [0]
+    values = (np.arange(cells)[:, None] * step + np.array(offsets)[None, :]).ravel()
+    
+    grid = np.stack(np.meshgrid(values, values, values, indexing='ij'), axis=-1).astype(np.uint8)
+    votes = rule(grid).reshape(cells, len(offsets), cells, len(offsets), cells, len(offsets))
+    return votes.mean(axis=(1, 3, 5)) >= 0.5
+
+# Built on first use; register a different factory, e.g.
+# resources.register("skin_lut", lambda: build_skin_lut(new_rule)), to swap in another skin model
+resources.register("skin_lut", build_skin_lut)
+
+def skin_lookup(rgb, lut=None):
+    """
+    Classify pixels as skin with a single gather from the lookup table.
+    
+    Args:
+        rgb (numpy.ndarray): uint8 array of shape (..., height, width, 3)
+        lut (numpy.ndarray, optional): Table from build_skin_lut (default: the registered "skin_lut")
+        
+    Returns:
+        numpy.ndarray: Boolean array of shape (..., height, width)
+    """
+    if lut is None:
+        lut = resources.get("skin_lut")
+    shift = 8 - (lut.shape[0].bit_length() - 1)
+    return lut[rgb[..., 0] >> shift, rgb[..., 1] >> shift, rgb[..., 2] >> shift]
+
+def grid_reduce(rgb, edges, grid_size=GRID_SIZE):
+    """
+    Per-cell grid statistics for one frame or a stack of equally sized frames.
+    
+    Args:
+        rgb (numpy.ndarray): uint8 array of shape (..., height, width, 3)
+        edges (numpy.ndarray): Edge map of shape (..., height, width)
+        grid_size (int): Number of rows and columns in the grid
+        
+    Returns:
+        dict: See FrameFeatures.grid_stats; per-cell arrays carry the leading
+            batch dimensions of the input. None if the frame is too small.
+    """
+    height, width = rgb.shape[-3], rgb.shape[-2]
+    if height <= grid_size or width <= grid_size:
+        return None
+    
+    batch_shape = rgb.shape[:-3]
+    cell_height = height // grid_size
+    cell_width = width // grid_size
+    grid_h, grid_w = cell_height * grid_size, cell_width * grid_size
+    
+    # (..., grid, grid, cell_h, cell_w, 3) view; no pixel data is copied
+    cells = np.swapaxes(rgb[..., :grid_h, :grid_w, :]
+                        .reshape(batch_shape + (grid_size, cell_height, grid_size, cell_width, 3)), -4, -3)
+    edge_cells = np.swapaxes(edges[..., :grid_h, :grid_w]
+                             .reshape(batch_shape + (grid_size, cell_height, grid_size, cell_width)), -3, -2)
+    
+    std = np.std(cells, axis=(-3, -2))
+    return {
+        "grid_size": grid_size,
+        "cell_height": cell_height,
+        "cell_width": cell_width,
+        "mean": np.mean(cells, axis=(-3, -2)),
+        "std": std,
+        "std_mean": std.mean(axis=-1),
+        "edge": np.mean(edge_cells, axis=(-2, -1)),
+        "row": np.repeat(np.arange(grid_size)[:, None], grid_size, axis=1),
+    }
+
+def precompute_batch(frames, grid_size=GRID_SIZE):
+    """
+    Fill the feature caches of several frames from one stacked NumPy pass.
+    
+    The frames are stacked into an (N, height, width, 3) array and
+    brightness, skin fraction, edges and grid statistics are computed for
+    all of them at once. Analyzers called on the frames afterwards find
+    these values already memoized.
+    
+    Args:
+        frames (list): FrameFeatures decoded at the same analysis size
+        grid_size (int): Grid to precompute statistics for
+        
+    Returns:
+        list: The same frames
+    """
+    if not frames:
+        return frames
+    
+    stack = np.stack([frame.rgb for frame in frames])
+    gray = rgb_to_gray(stack)
+    gradients = gradient_field(gray)
+    edges = gradients["edges"]
+    brightness = gray.mean(axis=(1, 2)) / 255
+    edge_strength = edges.mean(axis=(1, 2))
+    skin_fraction = skin_lookup(stack[:, ::SKIN_SAMPLE_STEP, ::SKIN_SAMPLE_STEP]).mean(axis=(1, 2))
+    grid = grid_reduce(stack, edges, grid_size)
+    
+    for i, frame in enumerate(frames):
+        # cached_property reads the instance dict first, so seeding it is enough
+        frame.__dict__.update({
+            "gray": gray[i],
+            "gradients": {key: value[i] for key, value in gradients.items()},
+            "edges": edges[i],
+            "brightness": float(brightness[i]),
+            "edge_strength": float(edge_strength[i]),
+            "skin_fraction": float(skin_fraction[i]),
+        })
+        if grid is None:
+            frame._grid_cache[grid_size] = None
+        else:
+            frame._grid_cache[grid_size] = dict(grid, **{
+                key: grid[key][i] for key in ("mean", "std", "std_mean", "edge")
+            })
+    
+    return frames
+
+def as_frame(image, **options):
+    """
+    Return a FrameFeatures for an encoded image or an existing frame.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image or decoded frame
+        **options: FrameFeatures arguments (size, decode_size, max_pixels) used
+            when a new frame has to be decoded
+    
+    Returns:
+        FrameFeatures: The shared frame
+    """
+    if isinstance(image, FrameFeatures):
+        return image
+    return FrameFeatures(image, **options)
\ No newline at end of file
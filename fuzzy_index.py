@@ -0,0 +1,208 @@
+import os
+import time
+import threading
+import numpy as np
+from knowledge_index import tokenize
+
+# Lowest trigram similarity (0-1) accepted as a match for a misheard query
+FUZZY_THRESHOLD = float(os.environ.get('FUZZY_THRESHOLD', '0.45'))
+
+# Number of candidates returned by a search
+FUZZY_TOP_K = int(os.environ.get('FUZZY_TOP_K', '3'))
+
+# Seconds before the index is rebuilt to pick up rows written by other servers
+FUZZY_MAX_AGE = float(os.environ.get('FUZZY_MAX_AGE', '300'))
+
+# Entry kinds, stored as one byte per entry
+KIND_KNOWLEDGE = 0
+KIND_RESPONSE = 1
+KIND_NAMES = ("knowledge", "response")
+
+def word_trigrams(text):
+    """
+    Trigrams of each word padded with spaces, as PostgreSQL's pg_trgm makes
+    them, so a misrecognized letter only breaks the three trigrams around it.
+    
+    Returns:
+        set: Trigrams of the text
+    """
+    grams = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i+3] for i in range(len(padded) - 2))
+    return grams
+
+class TrigramIndex:
+    """
+    Read-only trigram index over knowledge-base questions and response patterns.
+    
+    Postings are held in compressed sparse rows: one int32 array of entry
+    numbers for all trigrams, sliced by an offsets array, so a search is a
+    few array slices and one bincount rather than a loop over the entries.
+    Similarity is the pg_trgm one: shared trigrams over all distinct
+    trigrams of the query and the entry.
+    """
+    
+    def __init__(self, entries):
+        """
+        Args:
+            entries (list): (kind, row id, text, answer) tuples
+        """
+        grams_per_entry = [word_trigrams(text) for _, _, text, _ in entries]
+        
+        gram_ids = {}
+        entry_numbers = []
+        entry_grams = []
+        for number, grams in enumerate(grams_per_entry):
+            entry_numbers.extend([number] * len(grams))
+            entry_grams.extend(gram_ids.setdefault(gram, len(gram_ids)) for gram in grams)
+        entry_numbers = np.array(entry_numbers, dtype=np.int32)
+        entry_grams = np.array(entry_grams, dtype=np.int32)
+        
+        # Group the (trigram, entry) pairs by trigram; a stable sort keeps
+        # each posting list in entry order
+        order = np.argsort(entry_grams, kind="stable")
+        self.gram_ids = gram_ids
+        self.postings = entry_numbers[order]
+        self.offsets = np.zeros(len(gram_ids) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(np.bincount(entry_grams, minlength=len(gram_ids)))
+        self.sizes = np.array([len(grams) for grams in grams_per_entry], dtype=np.int32)
+        self.kinds = np.array([kind for kind, _, _, _ in entries], dtype=np.int8)
+        self.row_ids = np.array([row_id for _, row_id, _, _ in entries], dtype=np.int64)
+        self.answers = [answer for _, _, _, answer in entries]
+    
+    def __len__(self):
+        return len(self.answers)
+    
+    def search(self, query, threshold=FUZZY_THRESHOLD, top_k=FUZZY_TOP_K):
+        """
+        Args:
+            query (str): User query
+            threshold (float): Lowest similarity returned
+            top_k (int): Most results returned
+        
+        Returns:
+            list: Dicts with source, id, answer and similarity, best first;
+                ties go to knowledge-base entries, then to the lowest id
+        """
+        grams = word_trigrams(query)
+        known = [self.gram_ids[gram] for gram in grams if gram in self.gram_ids]
+        if not known or not len(self):
+            return []
+        
+        matched = np.concatenate([self.postings[self.offsets[gram_id]:self.offsets[gram_id + 1]]
+                                  for gram_id in known])
+        shared = np.bincount(matched, minlength=len(self))
+        similarity = shared / (len(grams) + self.sizes - shared)
+        
+        candidates = np.flatnonzero(similarity >= threshold)
+        if not len(candidates):
+            return []
+        order = np.lexsort((self.row_ids[candidates], self.kinds[candidates], -similarity[candidates]))
+        return [{
+            "source": KIND_NAMES[self.kinds[number]],
+            "id": int(self.row_ids[number]),
+            "answer": self.answers[number],
+            "similarity": round(float(similarity[number]), 3),
+        } for number in candidates[order[:top_k]]]
+
+class FuzzyMatcher:
+    """
+    Typo-tolerant lookup for queries the exact search missed, mostly speech
+    recognition errors ("wear is the front dor"), answered locally instead
+    of by a multi-second web search.
+    
+    The index is rebuilt from the database when rows are written through
+    this process and after FUZZY_MAX_AGE seconds. A rebuild takes a few
+    milliseconds per thousand rows and keeps the index itself immutable, so
+    searches need no lock.
+    """
+    
+    def __init__(self, threshold=FUZZY_THRESHOLD, top_k=FUZZY_TOP_K, max_age=FUZZY_MAX_AGE):
+        """
+        Args:
+            threshold (float): Lowest similarity accepted (0-1)
+            top_k (int): Candidates returned by search()
+            max_age (float): Seconds before the index is rebuilt
+        """
+        self.threshold = threshold
+        self.top_k = top_k
+        self.max_age = max_age
+        self.index = None
+        self.built_at = 0.0
+        self.build_ms = None
+        self.searches = 0
+        self.hits = 0
+        self._stale = True
+        self._lock = threading.Lock()
+    
+    def load(self, knowledge_items, responses):
+        """
+        Replace the index.
+        
+        Args:
+            knowledge_items (list): KnowledgeBase rows
+            responses (list): ChatbotResponse rows
+        """
+        start = time.perf_counter()
+        entries = [(KIND_KNOWLEDGE, item.id, item.question, item.answer)
+                   for item in knowledge_items if item.active]
+        entries += [(KIND_RESPONSE, response.id, response.pattern, response.response)
+                    for response in responses if response.active]
+        index = TrigramIndex(entries)
+        
+        with self._lock:
+            self.index = index
+            self.built_at = time.time()
+            self.build_ms = round((time.perf_counter() - start) * 1000, 1)
+            self._stale = False
+    
+    def invalidate(self):
+        """Rebuild the index before the next search, after a row was written."""
+        self._stale = True
+    
+    def needs_load(self):
+        """
+        Returns:
+            bool: Whether the index is missing, invalidated or older than max_age
+        """
+        return self._stale or time.time() - self.built_at > self.max_age
+    
+    def search(self, query, threshold=None, top_k=None):
+        """
+        Args:
+            query (str): User query
+            threshold (float, optional): Overrides the matcher's threshold
+            top_k (int, optional): Overrides the matcher's top_k
+        
+        Returns:
+            list: Best matches first, see TrigramIndex.search
+        """
+        index = self.index
+        if index is None:
+            return []
+        results = index.search(query,
+                               self.threshold if threshold is None else threshold,
+                               self.top_k if top_k is None else top_k)
+        with self._lock:
+            self.searches += 1
+            self.hits += bool(results)
+        return results
+    
+    def stats(self):
+        """
+        Returns:
+            dict: Index size, build time, settings and hit counts
+        """
+        index = self.index
+        with self._lock:
+            return {
+                "entries": len(index) if index is not None else 0,
+                "trigrams": len(index.gram_ids) if index is not None else 0,
+                "postings_bytes": int(index.postings.nbytes + index.offsets.nbytes) if index is not None else 0,
+                "build_ms": self.build_ms,
+                "threshold": self.threshold,
+                "top_k": self.top_k,
+                "searches": self.searches,
+                "hits": self.hits,
+            }
\ No newline at end of file
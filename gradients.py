@@ -0,0 +1,98 @@
+import numpy as np
+
+# Scales Sobel responses to the range of the FIND_EDGES filter the edge
+# thresholds were tuned on: a step of height d gives 3d once with FIND_EDGES
+# and 4d on each of two pixels with Sobel
+EDGE_SCALE = 3 / 8
+
+def sobel(gray):
+    """
+    Sobel gradients of a grayscale image or a stack of images in one pass.
+    
+    The 3x3 kernels are applied as separable differences and smoothing on an
+    int16 copy with replicated borders, so every pixel, including the border,
+    gets a gradient.
+    
+    Args:
+        gray (numpy.ndarray): uint8 array of shape (..., height, width)
+    
+    Returns:
+        tuple: (gx, gy) int16 arrays of the same shape; gx responds to
+            vertical structure and gy to horizontal structure
+    """
+    pad = [(0, 0)] * (gray.ndim - 2) + [(1, 1), (1, 1)]
+    pixels = np.pad(gray, pad, mode='edge').astype(np.int16)
+    
+    dx = pixels[..., :, 2:] - pixels[..., :, :-2]
+    dy = pixels[..., 2:, :] - pixels[..., :-2, :]
+    gx = dx[..., :-2, :] + 2 * dx[..., 1:-1, :] + dx[..., 2:, :]
+    gy = dy[..., :, :-2] + 2 * dy[..., :, 1:-1] + dy[..., :, 2:]
+    return gx, gy
+
+def gradient_field(gray):
+    """
+    Gradients, magnitude and orientation of a grayscale image or stack.
+    
+    Args:
+        gray (numpy.ndarray): uint8 array of shape (..., height, width)
+    
+    Returns:
+        dict: gx and gy (int16); magnitude (float32); orientation (float32,
+            radians in [-pi, pi]); horizontal and vertical (uint8 |gy| and
+            |gx| scaled by EDGE_SCALE) and edges (uint8 scaled magnitude)
+    """
+    gx, gy = sobel(gray)
+    gx_float = gx.astype(np.float32)
+    gy_float = gy.astype(np.float32)
+    magnitude = np.hypot(gx_float, gy_float)
+    
+    return {
+        "gx": gx,
+        "gy": gy,
+        "magnitude": magnitude,
+        "orientation": np.arctan2(gy_float, gx_float),
+        "horizontal": scale_edges(np.abs(gy_float)),
+        "vertical": scale_edges(np.abs(gx_float)),
+        "edges": scale_edges(magnitude),
+    }
+
+def scale_edges(response):
+    """
+    Args:
+        response (numpy.ndarray): Non-negative gradient response
+    
+    Returns:
+        numpy.ndarray: uint8 edge map on the FIND_EDGES scale
+    """
+    return np.clip(response * EDGE_SCALE, 0, 255).astype(np.uint8)
+
+def detail_ratio(fine, coarse, percentile=99):
+    """
+    How much of the coarse level's edge strength survives at the finer level.
+    
+    A sharp edge keeps its peak gradient when the resolution doubles, while
+    a blurred one is spread over more pixels and its peak drops, so a low
+    ratio between two pyramid levels indicates a blurry frame.
+    
+    Args:
+        fine (numpy.ndarray): uint8 grayscale level
+        coarse (numpy.ndarray): uint8 grayscale level at lower resolution
+        percentile (float): Percentile of the gradient magnitude compared
+    
+    Returns:
+        float: Ratio of the peak gradient magnitudes
+    """
+    fine_peak = np.percentile(gradient_magnitude(fine), percentile)
+    coarse_peak = np.percentile(gradient_magnitude(coarse), percentile)
+    return float(fine_peak / (coarse_peak + 1))
+
+def gradient_magnitude(gray):
+    """
+    Args:
+        gray (numpy.ndarray): uint8 array of shape (..., height, width)
+    
+    Returns:
+        numpy.ndarray: float32 Sobel magnitude
+    """
+    gx, gy = sobel(gray)
+    return np.hypot(gx.astype(np.float32), gy.astype(np.float32))
\ No newline at end of file
@@ -0,0 +1,108 @@
+from collections import deque
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of phrases.
+    
+    One pass over a text finds every phrase it contains, the same phrases
+    `phrase in text` would find one scan at a time.
+    """
+    
+    def __init__(self, phrases):
+        """
+        Args:
+            phrases (list): Phrases to look for; matching is case-sensitive
+        """
+        self.phrases = list(dict.fromkeys(phrases))
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        
+        for number, phrase in enumerate(self.phrases):
+            state = 0
+            for char in phrase:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = next_state
+            self.output[state] += (number,)
+        
+        # Breadth-first, so each state's fallback is final before its children
+        # need it. Folding the fallback's transitions into every state leaves
+        # one dictionary lookup per character when scanning.
+        self.next = [dict(self.goto[0])] + [None] * (len(self.goto) - 1)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self.next[state] = {**self.next[self.fail[state]], **self.goto[state]}
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                self.fail[child] = self.next[self.fail[state]].get(char, 0) if state else 0
+                self.output[child] += self.output[self.fail[child]]
+    
+    def find(self, text):
+        """
+        Args:
+            text (str): Text to scan
+        
+        Returns:
+            set: Numbers of the phrases found in the text
+        """
+        transitions, output = self.next, self.output
+        found = set()
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+class IntentRouter:
+    """
+    Ordered keyword rules compiled into one PhraseMatcher.
+    
+    A rule fires when the text contains any of its phrases; when several
+    fire, the one listed first wins, like the if/elif chain the table
+    replaces.
+    """
+    
+    def __init__(self, rules):
+        """
+        Args:
+            rules (list): (rule name, phrases) pairs, highest priority first
+        """
+        self.rule_names = [name for name, _ in rules]
+        self.matcher = PhraseMatcher([phrase for _, phrases in rules for phrase in phrases])
+        position = {phrase: number for number, phrase in enumerate(self.matcher.phrases)}
+        
+        # Rules each phrase belongs to, as positions in the table
+        self.phrase_rules = [[] for _ in self.matcher.phrases]
+        for rule, (_, phrases) in enumerate(rules):
+            for phrase in dict.fromkeys(phrases):
+                self.phrase_rules[position[phrase]].append(rule)
+    
+    def route(self, text):
+        """
+        Args:
+            text (str): Lowercased query or command
+        
+        Returns:
+            dict: rule (the winning rule name or None), phrase (a phrase of
+                that rule found in the text) and rules (every rule that
+                fired, in priority order)
+        """
+        phrases = {}
+        for number in sorted(self.matcher.find(text)):
+            for rule in self.phrase_rules[number]:
+                phrases.setdefault(rule, self.matcher.phrases[number])
+        
+        fired = sorted(phrases)
+        return {
+            "rule": self.rule_names[fired[0]] if fired else None,
+            "phrase": phrases[fired[0]] if fired else None,
+            "rules": [self.rule_names[rule] for rule in fired],
+        }
\ No newline at end of file
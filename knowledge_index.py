@@ -0,0 +1,230 @@
+import re
+import math
+import threading
+
+# Words used to score matches against the whole query
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Only query words longer than this are looked up on their own, as before
+MIN_WORD_LENGTH = 4
+
+def tokenize(text):
+    """
+    Returns:
+        list: Lowercase words of the text
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+def trigrams(text):
+    """
+    Returns:
+        set: Every three-character substring of the text
+    """
+    return {text[i:i+3] for i in range(len(text) - 2)}
+
+class TextIndex:
+    """
+    Inverted index over one text column, e.g. knowledge-base questions.
+    
+    Character-trigram postings find the entries containing a substring, the
+    same rows SQL ILIKE '%substring%' matches, by intersecting the postings
+    of the substring's trigrams and confirming the few candidates left.
+    Word postings then score those candidates against the whole query.
+    """
+    
+    def __init__(self):
+        self.texts = {}
+        self.values = {}
+        self.trigrams = {}
+        self.tokens = {}
+    
+    def __len__(self):
+        return len(self.texts)
+    
+    def add(self, entry_id, text, value):
+        """
+        Add or replace an entry.
+        
+        Args:
+            entry_id (int): Row id
+            text (str): Text matched against queries
+            value (str): Text returned when the entry matches
+        """
+        self.remove(entry_id)
+        text = text.lower()
+        self.texts[entry_id] = text
+        self.values[entry_id] = value
+        for gram in trigrams(text):
+            self.trigrams.setdefault(gram, set()).add(entry_id)
+        for token in set(tokenize(text)):
+            self.tokens.setdefault(token, set()).add(entry_id)
+    
+    def remove(self, entry_id):
+        """Drop an entry if it is indexed."""
+        text = self.texts.pop(entry_id, None)
+        if text is None:
+            return
+        del self.values[entry_id]
+        for postings, keys in ((self.trigrams, trigrams(text)), (self.tokens, set(tokenize(text)))):
+            for key in keys:
+                postings[key].discard(entry_id)
+                if not postings[key]:
+                    del postings[key]
+    
+    def containing(self, substring):
+        """
+        Args:
+            substring (str): Text to look for, case-insensitively
+        
+        Returns:
+            list: Ids of the entries whose text contains the substring
+        """
+        substring = substring.lower()
+        grams = trigrams(substring)
+        if not grams:
+            # Too short for trigrams; rare for real queries
+            return [entry_id for entry_id, text in self.texts.items() if substring in text]
+        
+        postings = sorted((self.trigrams.get(gram, set()) for gram in grams), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        return [entry_id for entry_id in candidates if substring in self.texts[entry_id]]
+    
+    def best(self, substring, query_words):
+        """
+        Best entry containing a substring.
+        
+        Entries score the inverse document frequency of each query word they
+        contain; ties go to the lowest id, the row .first() used to return.
+        
+        Args:
+            substring (str): Text the entry must contain
+            query_words (set): Words of the whole query
+        
+        Returns:
+            int: Id of the best entry, or None if no entry contains the substring
+        """
+        entry_ids = self.containing(substring)
+        if not entry_ids:
+            return None
+        
+        weights = {word: math.log(1 + len(self.texts) / len(self.tokens[word]))
+                   for word in query_words if word in self.tokens}
+        
+        def score(entry_id):
+            return sum(weight for word, weight in weights.items() if entry_id in self.tokens[word])
+        
+        return min(entry_ids, key=lambda entry_id: (-score(entry_id), entry_id))
+
+class KnowledgeIndex:
+    """
+    Process-local search index over the active knowledge-base questions and
+    chatbot-response patterns.
+    
+    It answers generate_simple_response without scanning the tables, so chat
+    latency no longer grows with their size. It is built from the database
+    once and kept current by the write paths of this process; rows written
+    by other processes appear after the next load().
+    """
+    
+    def __init__(self):
+        self.knowledge = TextIndex()
+        self.responses = TextIndex()
+        self.loaded = False
+        self._lock = threading.Lock()
+    
+    def load(self, knowledge_items, responses):
+        """
+        Replace the index contents.
+        
+        Args:
+            knowledge_items (list): KnowledgeBase rows
+            responses (list): ChatbotResponse rows
+        """
+        knowledge = TextIndex()
+        for item in knowledge_items:
+            if item.active:
+                knowledge.add(item.id, item.question, item.answer)
+        patterns = TextIndex()
+        for response in responses:
+            if response.active:
+                patterns.add(response.id, response.pattern, response.response)
+        
+        with self._lock:
+            self.knowledge = knowledge
+            self.responses = patterns
+            self.loaded = True
+    
+    def add_knowledge(self, item):
+        """Index a new or updated KnowledgeBase row (inactive rows are removed)."""
+        with self._lock:
+            if item.active is False:
+                self.knowledge.remove(item.id)
+            else:
+                self.knowledge.add(item.id, item.question, item.answer)
+    
+    def add_response(self, response):
+        """Index a new or updated ChatbotResponse row (inactive rows are removed)."""
+        with self._lock:
+            if response.active is False:
+                self.responses.remove(response.id)
+            else:
+                self.responses.add(response.id, response.pattern, response.response)
+    
+    def find_question(self, question):
+        """
+        Returns:
+            int: Id of the first knowledge-base question containing the text, or None
+        """
+        with self._lock:
+            entry_ids = self.knowledge.containing(question)
+        return min(entry_ids) if entry_ids else None
+    
+    def match(self, query):
+        """
+        Find the stored answer for a query, in the order generate_simple_response
+        has always used: a knowledge-base question containing the whole query,
+        then one containing a significant word of it (words in query order),
+        then a response pattern containing the whole query.
+        
+        Args:
+            query (str): Lowercased user query
+        
+        Returns:
+            dict: source ("knowledge", "knowledge_word" or "response"), id,
+                the word matched (for "knowledge_word") and answer, or None
+        """
+        query_words = set(tokenize(query))
+        with self._lock:
+            entry_id = self.knowledge.best(query, query_words)
+            if entry_id is not None:
+                return {"source": "knowledge", "id": entry_id, "word": None,
+                        "answer": self.knowledge.values[entry_id]}
+            
+            words = query.split()
+            if len(words) > 1:
+                for word in words:
+                    if len(word) >= MIN_WORD_LENGTH:
+                        entry_id = self.knowledge.best(word, query_words)
+                        if entry_id is not None:
+                            return {"source": "knowledge_word", "id": entry_id, "word": word,
+                                    "answer": self.knowledge.values[entry_id]}
+            
+            entry_id = self.responses.best(query, query_words)
+            if entry_id is not None:
+                return {"source": "response", "id": entry_id, "word": None,
+                        "answer": self.responses.values[entry_id]}
+        return None
+    
+    def stats(self):
+        """
+        Returns:
+            dict: Whether the index is loaded and how many entries and postings it holds
+        """
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "knowledge_items": len(self.knowledge),
+                "responses": len(self.responses),
+                "trigram_postings": len(self.knowledge.trigrams) + len(self.responses.trigrams),
+                "word_postings": len(self.knowledge.tokens) + len(self.responses.tokens),
+            }
\ No newline at end of file
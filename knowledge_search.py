@@ -0,0 +1,348 @@
+import string
+from sqlalchemy import text
+from models import db, KnowledgeBase, ChatbotResponse
+from knowledge_index import KnowledgeIndex, tokenize, MIN_WORD_LENGTH
+
+class SearchBackend:
+    """
+    Interface of the knowledge-base search used by the chatbot.
+    
+    match() returns the answer for a query with the priority
+    generate_simple_response has always used: a knowledge-base question
+    containing the whole query, then one matching a significant word of it,
+    then a response pattern containing the whole query.
+    """
+    
+    name = "base"
+    loaded = False
+    
+    def setup(self):
+        """Load the search index or check that it exists. Needs an app context."""
+        raise NotImplementedError
+    
+    def migrate(self):
+        """Create the search index in the database schema; a one-off step run before deploying."""
+    
+    def match(self, query):
+        """
+        Args:
+            query (str): Lowercased user query
+        
+        Returns:
+            dict: source ("knowledge", "knowledge_word" or "response"), id,
+                the word matched (for "knowledge_word") and answer, or None
+        """
+        raise NotImplementedError
+    
+    def find_question(self, question):
+        """
+        Returns:
+            int: Id of the first active knowledge-base question containing the text, or None
+        """
+        raise NotImplementedError
+    
+    def add_knowledge(self, item):
+        """Index a KnowledgeBase row written by this process."""
+    
+    def add_response(self, response):
+        """Index a ChatbotResponse row written by this process."""
+    
+    def stats(self):
+        """
+        Returns:
+            dict: Backend name and whether it is set up
+        """
+        return {"backend": self.name, "loaded": self.loaded}
+
+class MemorySearch(KnowledgeIndex, SearchBackend):
+    """The process-local KnowledgeIndex, loaded from the table rows."""
+    
+    name = "memory"
+    
+    def setup(self):
+        self.load(
+            KnowledgeBase.query.filter_by(active=True).all(),
+            ChatbotResponse.query.filter_by(active=True).all()
+        )
+    
+    def stats(self):
+        return {"backend": self.name, **KnowledgeIndex.stats(self)}
+
+def query_terms(query):
+    """
+    Split a query into the words searched for: its whitespace-separated
+    words with surrounding punctuation stripped, so "what's" stays one word
+    as it does in the in-memory index.
+    
+    Words shorter than MIN_WORD_LENGTH are dropped, since a prefix like
+    "a" matches nearly every row, unless the query has no longer word; the
+    LIKE on the whole query still decides the whole-query matches.
+    
+    Returns:
+        tuple: (words all required, significant words); significant words
+            are only looked up on their own when the query has more than one word
+    """
+    words = [word.strip(string.punctuation) for word in query.split()]
+    words = [word for word in words if tokenize(word)]
+    long_words = [word for word in words if len(word) >= MIN_WORD_LENGTH]
+    significant = long_words if len(query.split()) > 1 else []
+    return long_words or words, significant
+
+def matched_word(question, significant):
+    """The first significant query word the question contains, as the old word-by-word lookup reported it."""
+    question = question.lower()
+    return next((word for word in significant if word in question), None)
+
+class DatabaseSearch(SearchBackend):
+    """
+    Full-text search run by the database, for app servers sharing one database.
+    
+    The index lives in the database and is kept in sync with the tables by
+    the database itself, so rows written by any server are found at once,
+    and a lookup is a single ranked query instead of a scan per word.
+    Words are matched as word prefixes ("door" finds "doors"); a word with
+    punctuation inside, like "what's", as the phrase of its parts.
+    
+    The index is part of the schema: migrate() creates it once, and setup()
+    at startup only checks that it is there. Until it has been migrated the
+    process answers from a MemorySearch loaded from the tables instead.
+    """
+    
+    # In-memory search used while the database index is missing
+    fallback = None
+    
+    # Statements adding the index to the schema; run by migrate() only
+    MIGRATION_STATEMENTS = ()
+    
+    # Cheap statements that fail when the index has not been migrated
+    CHECK_STATEMENTS = ()
+    
+    # One ranked query over both tables, returning source, id, answer and question
+    MATCH_QUERY = ""
+    
+    # Lowest-id active question matching the words and containing the text
+    FIND_QUESTION_QUERY = ""
+    
+    def setup(self):
+        try:
+            for statement in self.CHECK_STATEMENTS:
+                db.session.execute(text(statement))
+            self.fallback = None
+        except Exception as e:
+            db.session.rollback()
+            print(f"{self.name} knowledge search index missing, using the in-memory index until "
+                  f"'flask --app app migrate-knowledge-search' is run: {str(e)}")
+            fallback = MemorySearch()
+            fallback.setup()
+            self.fallback = fallback
+        self.loaded = True
+    
+    def migrate(self):
+        try:
+            for statement in self.MIGRATION_STATEMENTS:
+                db.session.execute(text(statement))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    
+    def search_expressions(self, words, significant):
+        """
+        Args:
+            words (list): Words all required, see query_terms
+            significant (list): Words of which any is enough
+        
+        Returns:
+            tuple: (expression matching all words, expression matching any
+                significant word or None) in the backend's query syntax
+        """
+        raise NotImplementedError
+    
+    def add_knowledge(self, item):
+        if self.fallback is not None:
+            self.fallback.add_knowledge(item)
+    
+    def add_response(self, response):
+        if self.fallback is not None:
+            self.fallback.add_response(response)
+    
+    def stats(self):
+        if self.fallback is not None:
+            return {**self.fallback.stats(), "backend": self.name, "fallback": self.fallback.name}
+        return SearchBackend.stats(self)
+    
+    def match(self, query):
+        if self.fallback is not None:
+            return self.fallback.match(query)
+        words, significant = query_terms(query)
+        if not words:
+            return None
+        all_words, any_word = self.search_expressions(words, significant)
+        
+        row = db.session.execute(text(self.MATCH_QUERY), {
+            "all_words": all_words,
+            "any_word": any_word or all_words,
+            "word_tier": any_word is not None,
+            "pattern": f"%{query}%",
+        }).first()
+        if row is None:
+            return None
+        
+        source, entry_id, answer, question = row
+        return {
+            "source": source,
+            "id": entry_id,
+            "word": matched_word(question, significant) if source == "knowledge_word" else None,
+            "answer": answer,
+        }
+    
+    def find_question(self, question):
+        if self.fallback is not None:
+            return self.fallback.find_question(question)
+        words, _ = query_terms(question)
+        if not words:
+            return None
+        all_words, _ = self.search_expressions(words, [])
+        return db.session.execute(text(self.FIND_QUESTION_QUERY),
+                                  {"all_words": all_words, "pattern": f"%{question}%"}).scalar()
+
+class PostgresSearch(DatabaseSearch):
+    """tsvector columns generated from the question and pattern, with GIN indexes."""
+    
+    name = "postgres"
+    
+    MIGRATION_STATEMENTS = (
+        "ALTER TABLE knowledge_base ADD COLUMN IF NOT EXISTS question_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(question, ''))) STORED",
+        "CREATE INDEX IF NOT EXISTS knowledge_base_question_tsv_idx ON knowledge_base USING GIN (question_tsv)",
+        "ALTER TABLE chatbot_responses ADD COLUMN IF NOT EXISTS pattern_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(pattern, ''))) STORED",
+        "CREATE INDEX IF NOT EXISTS chatbot_responses_pattern_tsv_idx ON chatbot_responses USING GIN (pattern_tsv)",
+    )
+    
+    CHECK_STATEMENTS = (
+        "SELECT question_tsv FROM knowledge_base LIMIT 0",
+        "SELECT pattern_tsv FROM chatbot_responses LIMIT 0",
+    )
+    
+    MATCH_QUERY = """
+        SELECT source, id, answer, question FROM (
+            SELECT CASE WHEN question ILIKE :pattern THEN 'knowledge' ELSE 'knowledge_word' END AS source,
+                   id, answer, question,
+                   CASE WHEN question ILIKE :pattern THEN 0
+                        WHEN :word_tier AND question_tsv @@ to_tsquery('simple', :any_word) THEN 1 END AS tier,
+                   ts_rank(question_tsv, to_tsquery('simple', :any_word)) AS rank
+            FROM knowledge_base
+            WHERE active AND question_tsv @@ (to_tsquery('simple', :all_words) || to_tsquery('simple', :any_word))
+            UNION ALL
+            SELECT 'response', id, response, pattern, 2, ts_rank(pattern_tsv, to_tsquery('simple', :all_words))
+            FROM chatbot_responses
+            WHERE active AND pattern_tsv @@ to_tsquery('simple', :all_words) AND pattern ILIKE :pattern
+        ) matches
+        WHERE tier IS NOT NULL
+        ORDER BY tier, rank DESC, id
+        LIMIT 1
+    """
+    
+    FIND_QUESTION_QUERY = """
+        SELECT id FROM knowledge_base
+        WHERE active AND question_tsv @@ to_tsquery('simple', :all_words) AND question ILIKE :pattern
+        ORDER BY id
+        LIMIT 1
+    """
+    
+    def search_expressions(self, words, significant):
+        # Each word becomes its \w+ tokens, which need no quoting in tsquery
+        # syntax, in sequence, with the last one matched as a prefix
+        terms = {word: " <-> ".join(tokenize(word)) + ":*" for word in words + significant}
+        all_words = " & ".join(terms[word] for word in words)
+        any_word = " | ".join(terms[word] for word in significant) or None
+        return all_words, any_word
+
+def fts5_statements(table, column):
+    """
+    Returns:
+        tuple: Statements creating an external-content FTS5 table over one
+            column, the triggers keeping it in sync with the table and a
+            rebuild indexing the rows already there
+    """
+    fts = f"{table}_fts"
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column}, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        # Picks up rows written before the triggers existed
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    )
+
+class SqliteSearch(DatabaseSearch):
+    """FTS5 tables over the question and pattern columns, synced by triggers."""
+    
+    name = "sqlite"
+    
+    MIGRATION_STATEMENTS = fts5_statements("knowledge_base", "question") + fts5_statements("chatbot_responses", "pattern")
+    
+    CHECK_STATEMENTS = (
+        "SELECT rowid FROM knowledge_base_fts LIMIT 0",
+        "SELECT rowid FROM chatbot_responses_fts LIMIT 0",
+    )
+    
+    MATCH_QUERY = """
+        SELECT source, id, answer, question FROM (
+            SELECT CASE WHEN k.question LIKE :pattern THEN 'knowledge' ELSE 'knowledge_word' END AS source,
+                   k.id AS id, k.answer AS answer, k.question AS question,
+                   CASE WHEN k.question LIKE :pattern THEN 0 WHEN :word_tier THEN 1 END AS tier,
+                   bm25(knowledge_base_fts) AS rank
+            FROM knowledge_base_fts JOIN knowledge_base k ON k.id = knowledge_base_fts.rowid
+            WHERE knowledge_base_fts MATCH '(' || :all_words || ') OR (' || :any_word || ')' AND k.active
+            UNION ALL
+            SELECT 'response', r.id, r.response, r.pattern, 2, bm25(chatbot_responses_fts)
+            FROM chatbot_responses_fts JOIN chatbot_responses r ON r.id = chatbot_responses_fts.rowid
+            WHERE chatbot_responses_fts MATCH :all_words AND r.active AND r.pattern LIKE :pattern
+        )
+        WHERE tier IS NOT NULL
+        ORDER BY tier, rank, id
+        LIMIT 1
+    """
+    
+    FIND_QUESTION_QUERY = """
+        SELECT k.id FROM knowledge_base_fts JOIN knowledge_base k ON k.id = knowledge_base_fts.rowid
+        WHERE knowledge_base_fts MATCH :all_words AND k.active AND k.question LIKE :pattern
+        ORDER BY k.id
+        LIMIT 1
+    """
+    
+    def search_expressions(self, words, significant):
+        # Quoted prefix phrases of each word's \w+ tokens, which cannot contain a double quote
+        terms = {word: '"' + " ".join(tokenize(word)) + '"*' for word in words + significant}
+        all_words = " AND ".join(terms[word] for word in words)
+        any_word = " OR ".join(terms[word] for word in significant) or None
+        return all_words, any_word
+
+# Search backend per DATABASE_URL scheme; other databases use the in-memory index
+SEARCH_BACKENDS = {
+    "postgres": PostgresSearch,
+    "postgresql": PostgresSearch,
+    "sqlite": SqliteSearch,
+}
+
+def create_search_backend(database_url, backend=None):
+    """
+    Pick the knowledge search backend for a database.
+    
+    Args:
+        database_url (str): SQLAlchemy database URL, e.g. postgresql+psycopg2://...
+        backend (str, optional): "memory", "postgres" or "sqlite" to override the choice
+    
+    Returns:
+        SearchBackend: A backend that still has to be set up
+    """
+    if backend == "memory":
+        return MemorySearch()
+    dialect = backend or (database_url or "").split(":", 1)[0].split("+", 1)[0].lower()
+    return SEARCH_BACKENDS.get(dialect, MemorySearch)()
\ No newline at end of file
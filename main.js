@@ -14,6 +14,9 @@ function initApp() {
     // Set up touch interface
     setupTouchInterface();
     
+    // Get the server's capture size and quality hints
+    loadCaptureHints();
+    
     // Set up feather icons and other UI elements
     document.addEventListener('DOMContentLoaded', () => {
         if (window.feather) {
@@ -152,6 +155,9 @@ function captureImageAndProcess(mode) {
                 case 'read':
                     readText(imageData);
                     break;
+                case 'scene':
+                    analyzeScene(imageData);
+                    break;
                 default:
                     document.querySelector('.eye-loading').classList.remove('visible');
                     announce("Invalid mode selected");
@@ -164,26 +170,78 @@ function captureImageAndProcess(mode) {
         });
 }
 
+// Capture size, JPEG quality and frame rate per mode, as suggested by the server.
+// The server lowers them when processing gets slow; these are the starting values.
+const captureHints = {
+    identify: { max_side: 480, jpeg_quality: 0.8, max_fps: 2 },
+    navigate: { max_side: 480, jpeg_quality: 0.8, max_fps: 2 },
+    read: { max_side: 1600, jpeg_quality: 0.9, max_fps: 0.5 }
+};
+
+// Canvas reused to scale frames before upload
+let captureCanvas = null;
+
+// Fetch the current capture hints for every mode
+function loadCaptureHints() {
+    fetch('/api/capture-hints')
+        .then(response => response.json())
+        .then(data => {
+            if (data && data.hints) {
+                Object.assign(captureHints, data.hints);
+            }
+        })
+        .catch(error => console.error('Error loading capture hints:', error));
+}
+
+// Keep the updated hints a vision response carries for its mode
+function updateCaptureHints(data) {
+    if (data && data.capture && data.capture.mode) {
+        captureHints[data.capture.mode] = data.capture;
+    }
+}
+
+// Scale a captured frame to the mode's hinted size and encode it as JPEG at the hinted quality
+function encodeFrame(imageData, mode) {
+    const hints = captureHints[mode];
+    return new Promise(resolve => {
+        const image = new Image();
+        image.onload = () => {
+            const scale = Math.min(1, hints.max_side / Math.max(image.width, image.height));
+            captureCanvas = captureCanvas || document.createElement('canvas');
+            captureCanvas.width = Math.round(image.width * scale);
+            captureCanvas.height = Math.round(image.height * scale);
+            captureCanvas.getContext('2d').drawImage(image, 0, 0, captureCanvas.width, captureCanvas.height);
+            // Fall back to the original frame if the browser cannot encode the canvas
+            captureCanvas.toBlob(blob => resolve(blob || dataURItoBlob(imageData)), 'image/jpeg', hints.jpeg_quality);
+        };
+        image.onerror = () => resolve(dataURItoBlob(imageData));
+        image.src = imageData;
+    });
+}
+
 // Identify objects in image
 function identifyObjects(imageData) {
     const feedbackArea = document.getElementById('feedback-area');
     feedbackArea.textContent = "Analyzing image...";
     
-    // Convert base64 image to blob for multipart/form-data
-    const blob = dataURItoBlob(imageData);
-    const formData = new FormData();
-    formData.append('image', blob, 'image.jpg');
-    
     // Add timestamp to prevent caching
     const timestamp = new Date().getTime();
     
-    fetch(`/api/analyze-image?t=${timestamp}`, {
-        method: 'POST',
-        body: formData
+    // Scale and encode the frame as the server suggests, then upload it as multipart/form-data
+    encodeFrame(imageData, 'identify')
+    .then(blob => {
+        const formData = new FormData();
+        formData.append('image', blob, 'image.jpg');
+        
+        return fetch(`/api/analyze-image?t=${timestamp}`, {
+            method: 'POST',
+            body: formData
+        });
     })
     .then(response => response.json())
     .then(data => {
         document.querySelector('.eye-loading').classList.remove('visible');
+        updateCaptureHints(data);
         
         if (data && data.description) {
             feedbackArea.textContent = data.description;
@@ -206,25 +264,28 @@ function provideNavigation(imageData) {
     const feedbackArea = document.getElementById('feedback-area');
     feedbackArea.textContent = "Analyzing surroundings for navigation...";
     
-    // Convert base64 image to blob for multipart/form-data
-    const blob = dataURItoBlob(imageData);
-    const formData = new FormData();
-    formData.append('image', blob, 'image.jpg');
-    
     // Get any additional context from user (can be empty for basic navigation)
     const context = ''; // This could be set by a previous voice command
-    formData.append('context', context);
     
     // Add timestamp to prevent caching
     const timestamp = new Date().getTime();
     
-    fetch(`/api/describe-surroundings?t=${timestamp}`, {
-        method: 'POST',
-        body: formData
+    // Scale and encode the frame as the server suggests, then upload it as multipart/form-data
+    encodeFrame(imageData, 'navigate')
+    .then(blob => {
+        const formData = new FormData();
+        formData.append('image', blob, 'image.jpg');
+        formData.append('context', context);
+        
+        return fetch(`/api/describe-surroundings?t=${timestamp}`, {
+            method: 'POST',
+            body: formData
+        });
     })
     .then(response => response.json())
     .then(data => {
         document.querySelector('.eye-loading').classList.remove('visible');
+        updateCaptureHints(data);
         
         if (data && data.description) {
             feedbackArea.textContent = data.description;
@@ -243,31 +304,165 @@ function provideNavigation(imageData) {
     });
 }
 
-// Extract and read text from an image
-function readText(imageData) {
-    const feedbackArea = document.getElementById('feedback-area');
-    feedbackArea.textContent = "Reading text from image...";
-    
-    // Convert base64 image to blob for multipart/form-data
-    const blob = dataURItoBlob(imageData);
-    const formData = new FormData();
-    formData.append('image', blob, 'image.jpg');
+// Continuous navigation state
+const continuousNavigation = {
+    streamId: null,
+    events: null,
+    timer: null,
+    uploading: false,
+    lastSent: 0,
+    // How often the timer checks whether a frame is due; the hinted max_fps sets the actual rate
+    intervalMs: 250
+};
+
+// Start continuous walking guidance: frames are pushed to the server and
+// guidance arrives over server-sent events only when it changes
+function startContinuousNavigation(context = '') {
+    if (continuousNavigation.streamId) {
+        announce("Continuous navigation is already active.");
+        return;
+    }
     
-    fetch('/api/read-text', {
+    fetch('/api/navigation-stream', {
         method: 'POST',
-        body: formData
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            context: context
+        })
     })
     .then(response => response.json())
     .then(data => {
-        document.querySelector('.eye-loading').classList.remove('visible');
+        if (!data || !data.stream_id) {
+            announce("Could not start continuous navigation. Please try again.");
+            return;
+        }
         
-        if (data && data.text && data.text.trim() !== '') {
-            feedbackArea.textContent = data.text;
-            speakText(data.text);
-        } else {
-            feedbackArea.textContent = "No text detected in image. Please try again.";
-            speakText("No text detected in image. Please try again.");
+        continuousNavigation.streamId = data.stream_id;
+        continuousNavigation.events = new EventSource(`/api/navigation-stream/${data.stream_id}/events`);
+        continuousNavigation.events.onmessage = event => {
+            const update = JSON.parse(event.data);
+            if (update && update.description) {
+                document.getElementById('feedback-area').textContent = update.description;
+                speakText(update.description);
+                vibrate([100, 50, 100]);
+            }
+        };
+        continuousNavigation.events.onerror = error => {
+            console.error('Navigation stream error:', error);
+        };
+        
+        continuousNavigation.timer = setInterval(sendNavigationFrame, continuousNavigation.intervalMs);
+        announce("Continuous navigation started. Say stop navigation to end it.");
+    })
+    .catch(error => {
+        console.error('Error starting continuous navigation:', error);
+        announce("Could not start continuous navigation. Please try again.");
+    });
+}
+
+// Push the current camera frame; skipped while the previous upload is still in flight
+// or when it would exceed the frame rate the server currently suggests
+function sendNavigationFrame() {
+    if (!continuousNavigation.streamId || continuousNavigation.uploading) return;
+    if (Date.now() - continuousNavigation.lastSent < 1000 / captureHints.navigate.max_fps) return;
+    
+    continuousNavigation.uploading = true;
+    continuousNavigation.lastSent = Date.now();
+    takePicture()
+        .then(imageData => {
+            if (!imageData) return;
+            
+            return encodeFrame(imageData, 'navigate').then(blob => {
+                const formData = new FormData();
+                formData.append('image', blob, 'image.jpg');
+                
+                return fetch(`/api/navigation-stream/${continuousNavigation.streamId}/frame`, {
+                    method: 'POST',
+                    body: formData
+                });
+            })
+            .then(response => {
+                if (response.status === 404) {
+                    // Stream expired on the server
+                    stopContinuousNavigation(false);
+                    return;
+                }
+                return response.json().then(updateCaptureHints);
+            });
+        })
+        .catch(error => console.error('Error sending navigation frame:', error))
+        .finally(() => {
+            continuousNavigation.uploading = false;
+        });
+}
+
+// Stop continuous walking guidance
+function stopContinuousNavigation(notifyServer = true) {
+    if (!continuousNavigation.streamId) return;
+    
+    const streamId = continuousNavigation.streamId;
+    clearInterval(continuousNavigation.timer);
+    if (continuousNavigation.events) {
+        continuousNavigation.events.close();
+    }
+    continuousNavigation.streamId = null;
+    continuousNavigation.events = null;
+    continuousNavigation.timer = null;
+    
+    if (notifyServer) {
+        fetch(`/api/navigation-stream/${streamId}`, { method: 'DELETE' })
+            .catch(error => console.error('Error closing navigation stream:', error));
+    }
+    announce("Continuous navigation stopped.");
+}
+
+// Extract and read text from an image
+function readText(imageData) {
+    const feedbackArea = document.getElementById('feedback-area');
+    feedbackArea.textContent = "Reading text from image...";
+    
+    // Regions arrive one by one as server-sent events, in reading order
+    encodeFrame(imageData, 'read')
+    .then(blob => {
+        const formData = new FormData();
+        formData.append('image', blob, 'image.jpg');
+        
+        return fetch('/api/read-text-stream', {
+            method: 'POST',
+            body: formData
+        });
+    })
+    .then(response => {
+        if (!response.ok || !response.body) {
+            throw new Error('Text stream unavailable');
         }
+        
+        const lines = [];
+        
+        return readEventStream(response, data => {
+            if (data.done) {
+                document.querySelector('.eye-loading').classList.remove('visible');
+                updateCaptureHints(data);
+                const text = data.error ? "Error reading text. Please try again." : data.text;
+                if (text && text.trim() !== '') {
+                    feedbackArea.textContent = text;
+                    speakText(text);
+                } else {
+                    feedbackArea.textContent = "No text detected in image. Please try again.";
+                    speakText("No text detected in image. Please try again.");
+                }
+                return;
+            }
+            
+            if (data.text) {
+                lines.push(data.text);
+                feedbackArea.textContent = lines.join('\n');
+            } else {
+                feedbackArea.textContent = `Found text region ${data.index + 1} of ${data.total}...`;
+            }
+        });
     })
     .catch(error => {
         document.querySelector('.eye-loading').classList.remove('visible');
@@ -277,6 +472,83 @@ function readText(imageData) {
     });
 }
 
+// Describe objects, surroundings and text from one upload; each answer is
+// shown and spoken as soon as the server has it, fastest first
+function analyzeScene(imageData, analyses = ['identify', 'navigate', 'read']) {
+    const feedbackArea = document.getElementById('feedback-area');
+    feedbackArea.textContent = "Analyzing the scene...";
+    
+    // Text reading needs the most detail, so the frame is sized for it when requested
+    const mode = analyses.includes('read') ? 'read' : 'identify';
+    const answers = [];
+    let speech = Promise.resolve();
+    
+    encodeFrame(imageData, mode)
+    .then(blob => {
+        const formData = new FormData();
+        formData.append('image', blob, 'image.jpg');
+        formData.append('analyses', analyses.join(','));
+        
+        return fetch('/api/scene', {
+            method: 'POST',
+            body: formData
+        });
+    })
+    .then(response => {
+        if (!response.ok || !response.body) {
+            throw new Error('Scene stream unavailable');
+        }
+        
+        return readEventStream(response, data => {
+            if (data.done) {
+                document.querySelector('.eye-loading').classList.remove('visible');
+                if (answers.length === 0) {
+                    feedbackArea.textContent = "Could not analyze the scene. Please try again.";
+                    speakText("Could not analyze the scene. Please try again.");
+                }
+                return;
+            }
+            
+            if (data.result && data.result.trim() !== '') {
+                answers.push(data.result);
+                feedbackArea.textContent = answers.join('\n\n');
+                // Queue the answers so they are spoken one after another
+                speech = speech.then(() => speakText(data.result));
+            }
+        });
+    })
+    .catch(error => {
+        document.querySelector('.eye-loading').classList.remove('visible');
+        console.error('Error analyzing scene:', error);
+        feedbackArea.textContent = "Error analyzing the scene. Please try again.";
+        speakText("Error analyzing the scene. Please try again.");
+    });
+}
+
+// Read a server-sent event response from fetch, passing each event's JSON data to a handler
+function readEventStream(response, handleEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    function pump() {
+        return reader.read().then(({ done, value }) => {
+            if (done) return;
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            events.forEach(event => {
+                if (event.startsWith('data: ')) {
+                    handleEvent(JSON.parse(event.slice(6)));
+                }
+            });
+            return pump();
+        });
+    }
+    
+    return pump();
+}
+
 // Process query with chatbot
 function processChatbotQuery(query) {
     const feedbackArea = document.getElementById('feedback-area');
@@ -332,12 +604,13 @@ function dataURItoBlob(dataURI) {
     return new Blob([ab], {type: mimeString});
 }
 
-// Speak text using Web Speech API or server fallback
+// Speak text using Web Speech API or server fallback.
+// Returns a Promise that resolves when the speech has finished.
 function speakText(text) {
-    if (!text) return;
+    if (!text) return Promise.resolve();
     
     // Try using server-side TTS
-    fetch('/api/tts', {
+    return fetch('/api/tts', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
@@ -353,7 +626,11 @@ function speakText(text) {
             const audioBlob = base64ToBlob(data.audio, 'audio/mp3');
             const audioUrl = URL.createObjectURL(audioBlob);
             const audio = new Audio(audioUrl);
-            audio.play();
+            return new Promise(resolve => {
+                audio.onended = resolve;
+                audio.onerror = resolve;
+                audio.play().catch(resolve);
+            });
         } else {
             throw new Error('Invalid audio data');
         }
@@ -366,7 +643,11 @@ function speakText(text) {
         utterance.rate = 1.0;
         utterance.pitch = 1.0;
         utterance.volume = 1.0;
-        window.speechSynthesis.speak(utterance);
+        return new Promise(resolve => {
+            utterance.onend = resolve;
+            utterance.onerror = resolve;
+            window.speechSynthesis.speak(utterance);
+        });
     });
 }
 
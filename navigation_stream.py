@@ -0,0 +1,162 @@
+import time
+import uuid
+import threading
+
+# Streams that receive no frames for this many seconds are evicted
+STREAM_IDLE_TIMEOUT = 120
+
+# Upper bound on concurrently open navigation streams
+MAX_STREAMS = 64
+
+class NavigationStream:
+    """
+    One continuous-navigation session.
+    
+    Frames arrive faster than they can be analyzed while the user walks, so
+    the stream keeps a single pending-frame slot: a new frame replaces any
+    frame that has not been picked up yet, and the analyzer always works on
+    the newest one. Guidance is only emitted when it differs from what the
+    user last heard.
+    """
+    
+    def __init__(self, stream_id, context=""):
+        """
+        Args:
+            stream_id (str): Unique identifier of the stream
+            context (str): Navigation context such as the user's goal
+        """
+        self.stream_id = stream_id
+        self.context = context
+        self.last_guidance = None
+        self.last_active = time.time()
+        self.closed = False
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self._pending = None
+        self._condition = threading.Condition()
+    
+    def submit_frame(self, image, context=None):
+        """
+        Offer a new frame, replacing any frame not yet analyzed.
+        
+        Args:
+            image (bytes): Encoded image
+            context (str, optional): Updated navigation context
+        """
+        with self._condition:
+            if self._pending is not None:
+                self.frames_dropped += 1
+            self._pending = image
+            if context is not None:
+                self.context = context
+            self.frames_received += 1
+            self.last_active = time.time()
+            self._condition.notify_all()
+    
+    def next_guidance(self, analyze, timeout=15):
+        """
+        Wait for the newest frame, analyze it and return guidance if it changed.
+        
+        Args:
+            analyze (callable): Function (image, context) -> guidance text
+            timeout (float): Seconds to wait for a frame
+        
+        Returns:
+            str: New guidance, or None if nothing new was produced
+        """
+        with self._condition:
+            if self._pending is None and not self.closed:
+                self._condition.wait(timeout)
+            if self.closed or self._pending is None:
+                return None
+            image, context = self._pending, self.context
+            self._pending = None
+            self.last_active = time.time()
+        
+        guidance = analyze(image, context)
+        self.frames_processed += 1
+        
+        if guidance == self.last_guidance:
+            return None
+        self.last_guidance = guidance
+        return guidance
+    
+    def close(self):
+        """Stop the stream and wake any waiting listener."""
+        with self._condition:
+            self.closed = True
+            self._pending = None
+            self._condition.notify_all()
+    
+    def stats(self):
+        """
+        Returns:
+            dict: Frame counters of this stream
+        """
+        return {
+            "frames_received": self.frames_received,
+            "frames_dropped": self.frames_dropped,
+            "frames_processed": self.frames_processed,
+        }
+
+class NavigationStreamRegistry:
+    """Bounded registry of open navigation streams with idle eviction."""
+    
+    def __init__(self, max_streams=MAX_STREAMS, idle_timeout=STREAM_IDLE_TIMEOUT):
+        """
+        Args:
+            max_streams (int): Maximum number of open streams
+            idle_timeout (float): Seconds of inactivity before a stream is evicted
+        """
+        self.max_streams = max_streams
+        self.idle_timeout = idle_timeout
+        self._streams = {}
+        self._lock = threading.Lock()
+    
+    def _evict_idle(self):
+        now = time.time()
+        for stream_id, stream in list(self._streams.items()):
+            if stream.closed or now - stream.last_active > self.idle_timeout:
+                stream.close()
+                del self._streams[stream_id]
+    
+    def open(self, context=""):
+        """
+        Open a new stream.
+        
+        Args:
+            context (str): Navigation context such as the user's goal
+        
+        Returns:
+            NavigationStream: The new stream, or None if the registry is full
+        """
+        with self._lock:
+            self._evict_idle()
+            if len(self._streams) >= self.max_streams:
+                return None
+            stream = NavigationStream(str(uuid.uuid4()), context)
+            self._streams[stream.stream_id] = stream
+            return stream
+    
+    def get(self, stream_id):
+        """
+        Returns:
+            NavigationStream: The open stream with this id, or None
+        """
+        with self._lock:
+            self._evict_idle()
+            return self._streams.get(stream_id)
+    
+    def close(self, stream_id):
+        """
+        Close and forget a stream.
+        
+        Returns:
+            bool: True if the stream existed
+        """
+        with self._lock:
+            stream = self._streams.pop(stream_id, None)
+        if stream:
+            stream.close()
+        return stream is not None
\ No newline at end of file
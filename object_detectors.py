@@ -0,0 +1,407 @@
+import os
+import threading
+import numpy as np
+from PIL import Image
+from frame_features import GRID_SIZE
+
+# Input side used when the model does not declare a fixed input size
+DETECTOR_INPUT_SIZE = 640
+
+# Post-processing defaults for the ONNX backend
+SCORE_THRESHOLD = 0.35
+IOU_THRESHOLD = 0.45
+MAX_DETECTIONS = 20
+
+# Grey used to pad letterboxed inputs, as in YOLO training
+LETTERBOX_FILL = (114, 114, 114)
+
+# One inference session per (process, model, thread settings)
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+class DetectorBackend:
+    """
+    Interface of the object detectors used by analyze_image.
+    
+    detect() takes a list of decoded frames and returns, for each frame, a
+    list of detections: dicts with a label, a score (None if the backend has
+    no confidence) and a box (left, top, right, bottom) as fractions of the
+    image size, or None if the backend does not localize objects.
+    """
+    
+    name = "base"
+    
+    def warm_up(self):
+        """Load models and run a first inference so requests do not pay for it."""
+    
+    def input_size(self):
+        """
+        Returns:
+            tuple: (width, height) uploads should be decoded to at least for
+                this detector, or None if the analysis size is enough
+        """
+        return None
+    
+    def detect(self, frames, grid_size=GRID_SIZE):
+        """
+        Args:
+            frames (list): FrameFeatures to run detection on
+            grid_size (int): Scene grid used by the heuristic backend
+        
+        Returns:
+            list: One list of detection dicts per frame
+        """
+        raise NotImplementedError
+
+class HeuristicDetector(DetectorBackend):
+    """Colour, skin-tone and edge rules over the frame's grid statistics."""
+    
+    name = "heuristic"
+    
+    def detect(self, frames, grid_size=GRID_SIZE):
+        return [
+            [{"label": label, "score": None, "box": None} for label in self.detect_labels(frame, grid_size)]
+            for frame in frames
+        ]
+    
+    def detect_labels(self, frame, grid_size=GRID_SIZE):
+        """
+        Args:
+            frame (FrameFeatures): Decoded frame
+            grid_size (int): Rows/columns of the scene classification grid
+        
+        Returns:
+            list: Labels of the detected objects
+        """
+        detected_objects = []
+        rgb_image = frame.rgb
+        
+        # PERSON DETECTION
+        # Only run if image is large enough
+        if rgb_image.shape[0] > 10 and rgb_image.shape[1] > 10:
+            # Fraction of pixels matching the skin-tone rules (memoized on the frame)
+            skin_percentage = frame.skin_fraction
+            
+            # Check for person
+            if skin_percentage > 0.05:
+                detected_objects.append("person")
+                
+                # Basic face detection
+                if rgb_image.shape[0] >= 3:  # Make sure image has enough rows
+                    top_edges = frame.edges[:rgb_image.shape[0]//3, :]
+                    
+                    if top_edges.size > 0:  # Make sure we have data
+                        face_edge_strength = np.mean(top_edges)
+                        
+                        if face_edge_strength > 20:
+                            detected_objects.append("face")
+        
+        # OBJECT DETECTION
+        # All grid cells are measured in one vectorized pass over the frame
+        detected_objects.extend(detect_grid_objects(frame.grid_stats(grid_size)))
+        return detected_objects
+
+def with_scene_labels(detections, frame, grid_size=GRID_SIZE):
+    """
+    Add the heuristic scene labels (sky, water, plants, wall, path...) to a
+    model's detections; object models are not trained on scenery.
+    
+    Args:
+        detections (list): Detection dicts of a model-based detector
+        frame (FrameFeatures): The frame they were found in
+        grid_size (int): Rows/columns of the scene classification grid
+    
+    Returns:
+        list: The detections followed by the scene labels they lack, without boxes
+    """
+    found = {detection["label"] for detection in detections}
+    return detections + [{"label": label, "score": None, "box": None}
+                         for label in detect_grid_objects(frame.grid_stats(grid_size)) if label not in found]
+
+def detect_grid_objects(grid):
+    """
+    Apply the scene rules (sky, water, plants, furniture, wall, path) to grid statistics.
+    
+    Args:
+        grid (dict): Per-cell statistics from FrameFeatures.grid_stats, or None
+    
+    Returns:
+        list: Labels of the detected objects
+    """
+    detected_objects = []
+    if grid is None:
+        return detected_objects
+    
+    grid_size = grid["grid_size"]
+    row = grid["row"]
+    std_mean = grid["std_mean"]
+    edge = grid["edge"]
+    r_mean, g_mean, b_mean = grid["mean"][:, :, 0], grid["mean"][:, :, 1], grid["mean"][:, :, 2]
+    
+    # Blue (sky, water)
+    blue = (b_mean > r_mean + 20) & (b_mean > g_mean + 20) & (b_mean > 150)
+    sky_cells = blue & (row == 0)
+    water_cells = blue & (std_mean < 30)
+    if sky_cells.any():
+        detected_objects.append("sky")
+        # The first top-row blue cell is taken as sky; later ones may still be water
+        water_cells = water_cells.copy()
+        water_cells.flat[np.argmax(sky_cells)] = False
+    if water_cells.any():
+        detected_objects.append("water")
+    
+    # Green (plants, grass, trees)
+    green = (g_mean > r_mean + 10) & (g_mean > b_mean + 10) & (g_mean > 100)
+    if (green & (row < grid_size//2)).any():
+        detected_objects.append("tree")
+    if (green & (row >= grid_size//2)).any():
+        detected_objects.append("plants")
+    
+    # Furniture detection (middle row)
+    if ((edge > 30) & (std_mean < 40) & (row == grid_size//2)).any():
+        detected_objects.append("furniture")
+    
+    # Wall detection
+    if ((edge < 20) & (std_mean < 30) & (row < grid_size-1)).any():
+        detected_objects.append("wall")
+    
+    # Path/Road detection
+    gray_cells = (np.abs(r_mean - g_mean) < 20) & (np.abs(g_mean - b_mean) < 20) & (r_mean < 150)
+    if (gray_cells & (row >= grid_size-1)).any():
+        detected_objects.append("path")
+    
+    return detected_objects
+
+def load_onnxruntime():
+    """
+    Import the optional CPU inference runtime. It is imported on first use
+    rather than with this module because loading it is slow and only the
+    ONNX backend needs it.
+    
+    Returns:
+        module: onnxruntime, or None if it is not installed
+    """
+    try:
+        import onnxruntime
+        return onnxruntime
+    except ImportError:
+        return None
+
+def shared_session(model_path, intra_op_threads=1, inter_op_threads=1):
+    """
+    Return the process-wide ONNX Runtime session for a model, creating it once.
+    
+    The process id is part of the key so forked vision workers build their
+    own session instead of using the parent's threads.
+    
+    Args:
+        model_path (str): Path of the .onnx file
+        intra_op_threads (int): Threads used inside one operator
+        inter_op_threads (int): Threads used to run independent operators
+    
+    Returns:
+        onnxruntime.InferenceSession: The shared CPU session
+    """
+    key = (os.getpid(), model_path, intra_op_threads, inter_op_threads)
+    with _sessions_lock:
+        if key not in _sessions:
+            onnxruntime = load_onnxruntime()
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = intra_op_threads
+            options.inter_op_num_threads = inter_op_threads
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            _sessions[key] = onnxruntime.InferenceSession(
+                model_path,
+                sess_options=options,
+                providers=['CPUExecutionProvider']
+            )
+        return _sessions[key]
+
+class OnnxDetector(DetectorBackend):
+    """
+    Object detector running a small YOLO-class ONNX model on the CPU.
+    
+    The model takes a float32 (batch, 3, height, width) RGB tensor scaled to
+    [0, 1] and returns YOLOv8-style predictions of shape (batch, 4 + classes,
+    anchors) (or its transpose) with centre-x, centre-y, width and height in
+    input pixels followed by one score per class. Class i is reported as
+    labels[i], so a COCO model maps onto the first 80 COMMON_OBJECTS.
+    """
+    
+    name = "onnx"
+    
+    def __init__(self, model_path, labels, intra_op_threads=1, inter_op_threads=1,
+                 score_threshold=SCORE_THRESHOLD, iou_threshold=IOU_THRESHOLD, max_detections=MAX_DETECTIONS):
+        """
+        Args:
+            model_path (str): Path of the .onnx file
+            labels (list): Class names, indexed by the model's class ids
+            intra_op_threads (int): Threads used inside one operator
+            inter_op_threads (int): Threads used to run independent operators
+            score_threshold (float): Minimum class score kept
+            iou_threshold (float): Overlap above which weaker boxes of the same class are dropped
+            max_detections (int): Maximum detections returned per frame
+        
+        Raises:
+            RuntimeError: If onnxruntime is not installed or the model file is missing
+        """
+        if load_onnxruntime() is None:
+            raise RuntimeError("onnxruntime is not installed")
+        if not model_path or not os.path.exists(model_path):
+            raise RuntimeError(f"Detector model not found: {model_path}")
+        
+        self.model_path = model_path
+        self.labels = labels
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.score_threshold = score_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+    
+    @property
+    def session(self):
+        return shared_session(self.model_path, self.intra_op_threads, self.inter_op_threads)
+    
+    def input_spec(self):
+        """
+        Returns:
+            tuple: (input name, fixed batch size or None, (width, height))
+        """
+        model_input = self.session.get_inputs()[0]
+        batch, _, height, width = model_input.shape
+        height = height if isinstance(height, int) else DETECTOR_INPUT_SIZE
+        width = width if isinstance(width, int) else DETECTOR_INPUT_SIZE
+        return model_input.name, batch if isinstance(batch, int) else None, (width, height)
+    
+    def input_size(self):
+        try:
+            return self.input_spec()[2]
+        except Exception:
+            # The model failed to load; detect() reports it and falls back
+            return None
+    
+    def warm_up(self):
+        name, batch, (width, height) = self.input_spec()
+        self.session.run(None, {name: np.zeros((batch or 1, 3, height, width), dtype=np.float32)})
+    
+    def detect(self, frames, grid_size=GRID_SIZE):
+        if not frames:
+            return []
+        
+        name, batch, size = self.input_spec()
+        inputs = [letterbox(frame.original.convert('RGB'), size) for frame in frames]
+        tensor = np.stack([tensor for tensor, _, _ in inputs])
+        
+        # Models exported with a fixed batch size are fed in chunks of that size
+        step = batch or len(frames)
+        outputs = []
+        for start in range(0, len(frames), step):
+            chunk = tensor[start:start + step]
+            if len(chunk) < step:
+                chunk = np.concatenate([chunk, np.zeros((step - len(chunk),) + chunk.shape[1:], dtype=chunk.dtype)])
+            outputs.extend(self.session.run(None, {name: chunk})[0])
+        
+        return [
+            self.decode(outputs[i], scale, padding, frame.original.size)
+            for i, (frame, (_, scale, padding)) in enumerate(zip(frames, inputs))
+        ]
+    
+    def decode(self, prediction, scale, padding, image_size):
+        """
+        Turn one frame's raw predictions into labelled boxes.
+        
+        Args:
+            prediction (numpy.ndarray): (4 + classes, anchors) or (anchors, 4 + classes)
+            scale (float): Resize factor applied by letterbox
+            padding (tuple): (left, top) padding added by letterbox
+            image_size (tuple): (width, height) of the original image
+        
+        Returns:
+            list: Detection dicts, highest score first
+        """
+        if prediction.shape[0] < prediction.shape[1]:
+            prediction = prediction.T
+        
+        class_scores = prediction[:, 4:]
+        class_ids = np.argmax(class_scores, axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = scores >= self.score_threshold
+        if not keep.any():
+            return []
+        
+        centre_x, centre_y, box_w, box_h = prediction[keep, :4].T
+        boxes = np.stack([centre_x - box_w / 2, centre_y - box_h / 2, centre_x + box_w / 2, centre_y + box_h / 2], axis=1)
+        class_ids, scores = class_ids[keep], scores[keep]
+        
+        selected = non_max_suppression(boxes, scores, class_ids, self.iou_threshold)[:self.max_detections]
+        
+        # Undo the letterbox and express boxes as fractions of the original image
+        width, height = image_size
+        boxes = (boxes[selected] - np.array([padding[0], padding[1], padding[0], padding[1]])) / scale
+        boxes = np.clip(boxes / np.array([width, height, width, height]), 0, 1)
+        
+        return [
+            {
+                "label": self.labels[class_id] if class_id < len(self.labels) else f"object {class_id}",
+                "score": float(score),
+                "box": [round(float(value), 4) for value in box],
+            }
+            for class_id, score, box in zip(class_ids[selected].tolist(), scores[selected], boxes)
+        ]
+
+def letterbox(image, size):
+    """
+    Resize an image into size keeping its aspect ratio and pad the rest.
+    
+    Args:
+        image (PIL.Image.Image): RGB image
+        size (tuple): (width, height) of the model input
+    
+    Returns:
+        tuple: (float32 CHW tensor in [0, 1], scale, (left, top) padding)
+    """
+    width, height = size
+    scale = min(width / image.width, height / image.height)
+    resized = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BILINEAR)
+    
+    canvas = Image.new('RGB', size, LETTERBOX_FILL)
+    left, top = (width - resized.width) // 2, (height - resized.height) // 2
+    canvas.paste(resized, (left, top))
+    
+    tensor = np.asarray(canvas, dtype=np.float32).transpose(2, 0, 1) / 255
+    return tensor, scale, (left, top)
+
+def non_max_suppression(boxes, scores, class_ids, iou_threshold=IOU_THRESHOLD):
+    """
+    Greedy per-class non-maximum suppression.
+    
+    Boxes of different classes are shifted apart so one pass suppresses
+    overlaps within each class only.
+    
+    Args:
+        boxes (numpy.ndarray): (n, 4) left, top, right, bottom
+        scores (numpy.ndarray): (n,) scores
+        class_ids (numpy.ndarray): (n,) class ids
+        iou_threshold (float): Overlap above which the weaker box is dropped
+    
+    Returns:
+        list: Indices of the kept boxes, highest score first
+    """
+    offset = class_ids[:, None] * (boxes.max() - boxes.min() + 1)
+    shifted = boxes + offset
+    areas = (shifted[:, 2] - shifted[:, 0]) * (shifted[:, 3] - shifted[:, 1])
+    order = np.argsort(scores)[::-1]
+    
+    kept = []
+    while len(order):
+        best = order[0]
+        kept.append(int(best))
+        rest = order[1:]
+        left = np.maximum(shifted[best, 0], shifted[rest, 0])
+        top = np.maximum(shifted[best, 1], shifted[rest, 1])
+        right = np.minimum(shifted[best, 2], shifted[rest, 2])
+        bottom = np.minimum(shifted[best, 3], shifted[rest, 3])
+        overlap = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+        iou = overlap / (areas[best] + areas[rest] - overlap + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return kept
\ No newline at end of file
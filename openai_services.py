@@ -1,10 +1,14 @@
 import os
-import base64
-import io
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
-from PIL import Image, ImageFilter
-
-print("Initializing with advanced image processing for object recognition")
+from frame_features import FrameFeatures, GRID_SIZE, PYRAMID_LEVELS, as_frame, precompute_batch
+from gradients import detail_ratio, gradient_magnitude
+from vision_cache import VisionResultCache, HAZARD_LABELS
+from text_regions import find_text_regions
+from object_detectors import HeuristicDetector, OnnxDetector, detect_grid_objects, with_scene_labels
+from vision_resources import resources
+from scene_tracker import SIGNATURE_DISTANCE
 
 # Load common object labels
 def load_or_create_labels():
@@ -46,228 +50,339 @@ def load_or_create_labels():
     except:
         return common_labels
 
-# Load labels
-COMMON_OBJECTS = load_or_create_labels()
-print(f"Loaded {len(COMMON_OBJECTS)} object categories")
+def load_common_objects():
+    """
+    Returns:
+        list: Object category names, read (and written on first run) by load_or_create_labels
+    """
+    labels = load_or_create_labels()
+    print(f"Loaded {len(labels)} object categories")
+    return labels
 
-def preprocess_image(base64_image):
+def load_ocr_engine():
     """
-    Preprocesses a base64 image for analysis.
+    Returns:
+        module: pytesseract if it and the tesseract binary can be used, otherwise None
     """
     try:
-        # Decode base64 image
-        image_data = base64.b64decode(base64_image)
-        image = Image.open(io.BytesIO(image_data))
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return pytesseract
+    except Exception as e:
+        print(f"OCR engine unavailable: {e}")
+        return None
+
+# Labels and the optional local OCR engine are loaded on first use, not on import.
+# Without an OCR engine text is located but not read.
+resources.register("labels", load_common_objects)
+resources.register("ocr", load_ocr_engine)
+resources.register("scene_threads", lambda: ThreadPoolExecutor(max_workers=SCENE_THREADS, thread_name_prefix="scene"))
+
+def __getattr__(name):
+    # Module attributes of earlier versions, now resolved through the lazy registry
+    if name == "COMMON_OBJECTS":
+        return resources.get("labels")
+    if name == "detector":
+        return get_detector()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Pixel budget per analyzer: the largest decoded upload each one accepts.
+# JPEGs are draft-decoded close to the size they are analyzed at first, so
+# in practice only oversized non-JPEG uploads are rejected.
+PIXEL_BUDGETS = {
+    "analyze_image": int(os.environ.get('ANALYZE_MAX_PIXELS', 16_000_000)),
+    "describe_surroundings": int(os.environ.get('DESCRIBE_MAX_PIXELS', 16_000_000)),
+    "recognize_text": int(os.environ.get('READ_TEXT_MAX_PIXELS', 16_000_000)),
+}
+
+# Text needs more detail than the 224x224 scene analysis, so JPEGs for
+# recognize_text are draft-decoded no smaller than this
+TEXT_DECODE_SIZE = (1600, 1600)
+
+# Zones describe_surroundings reports on, as (name, (left, top, right, bottom))
+# with coordinates given as fractions of the frame's width and height
+REGION_LAYOUTS = {
+    "5-zone": [
+        ("top-left", (0, 0, 1/2, 1/2)),
+        ("top-right", (1/2, 0, 1, 1/2)),
+        ("center", (1/4, 1/4, 3/4, 3/4)),
+        ("bottom-left", (0, 1/2, 1/2, 1)),
+        ("bottom-right", (1/2, 1/2, 1, 1)),
+    ],
+    "9-zone": [
+        ("top-left", (0, 0, 1/3, 1/3)),
+        ("top-center", (1/3, 0, 2/3, 1/3)),
+        ("top-right", (2/3, 0, 1, 1/3)),
+        ("middle-left", (0, 1/3, 1/3, 2/3)),
+        ("center", (1/3, 1/3, 2/3, 2/3)),
+        ("middle-right", (2/3, 1/3, 1, 2/3)),
+        ("bottom-left", (0, 2/3, 1/3, 1)),
+        ("bottom-center", (1/3, 2/3, 2/3, 1)),
+        ("bottom-right", (2/3, 2/3, 1, 1)),
+    ],
+    "corridor": [
+        ("area ahead at head height", (1/4, 0, 3/4, 1/3)),
+        ("left side", (0, 1/3, 1/3, 1)),
+        ("path ahead", (1/3, 1/3, 2/3, 1)),
+        ("right side", (2/3, 1/3, 1, 1)),
+        ("area at your feet", (1/4, 3/4, 3/4, 1)),
+    ],
+}
+
+DEFAULT_REGION_LAYOUT = os.environ.get('DESCRIBE_REGION_LAYOUT', '5-zone')
+
+# Early-exit thresholds of analyze_image_pyramid
+DARK_FRAME_BRIGHTNESS = 0.06
+BLURRY_COARSE_RATIO = 0.62
+BLURRY_FINE_RATIO = 0.35
+
+# A frame is uniform when the smallest level's standard deviation is below
+# this fraction of its mean brightness, so dim scenes are judged by their
+# own contrast, and the middle level's mean gradient magnitude is below
+# UNIFORM_FRAME_GRADIENT, which texture and noise averaged out at 28px
+# still exceed
+UNIFORM_FRAME_CONTRAST = 0.05
+UNIFORM_FRAME_GRADIENT = 6
+
+# Tesseract page segmentation mode for a single line of text
+OCR_CONFIG = os.environ.get('OCR_CONFIG', '--psm 7')
+
+# Analyses analyze_scene can run on one upload, named after the client's camera modes
+SCENE_ANALYSES = ("identify", "navigate", "read")
+
+# Threads running the analyses of scene requests side by side
+SCENE_THREADS = int(os.environ.get('SCENE_THREADS', 4))
+
+# Optional perceptual-hash result cache, enabled with configure_vision_cache()
+vision_cache = None
+
+# Object detector used by analyze_image, created on first use; configure_detector() can switch to ONNX
+heuristic_detector = HeuristicDetector()
+resources.register("detector", lambda: heuristic_detector)
+
+def configure_detector(backend="heuristic", model_path=None, intra_op_threads=1, inter_op_threads=1,
+                       score_threshold=0.35, warm_up=True):
+    """
+    Select the object detector backend.
+    
+    The detector is created on first use (or now, with warm_up). The ONNX
+    backend needs onnxruntime and a local model file; if either is missing
+    or the model fails to load, the heuristic detector is used instead.
+    
+    Args:
+        backend (str): "onnx" or "heuristic"
+        model_path (str, optional): Path of the .onnx model for the ONNX backend
+        intra_op_threads (int): ONNX Runtime threads inside one operator
+        inter_op_threads (int): ONNX Runtime threads across operators
+        score_threshold (float): Minimum detection score
+        warm_up (bool): Load the model and run one inference now
         
-        # Resize and normalize image for consistent processing
-        image = image.resize((224, 224))
-        image_array = np.array(image) / 255.0
+    Returns:
+        DetectorBackend: The active detector, or None if it is created on first use
+    """
+    def create_detector():
+        if backend == "onnx":
+            try:
+                onnx_detector = OnnxDetector(
+                    model_path,
+                    resources.get("labels"),
+                    intra_op_threads=intra_op_threads,
+                    inter_op_threads=inter_op_threads,
+                    score_threshold=score_threshold
+                )
+                print(f"Using ONNX object detector {model_path}")
+                return onnx_detector
+            except Exception as e:
+                print(f"ONNX detector unavailable, using heuristic detection: {str(e)}")
+        return heuristic_detector
+    
+    resources.register("detector", create_detector)
+    if not warm_up:
+        return None
+    detector = get_detector()
+    detector.warm_up()
+    return detector
+
+def get_detector():
+    """
+    Returns:
+        DetectorBackend: The active detector, created on first use
+    """
+    return resources.get("detector")
+
+def warm_up():
+    """
+    Load the labels, skin lookup table, OCR engine and object detector and
+    run one detector inference, so the first request does not pay for them.
+    
+    Returns:
+        dict: Milliseconds spent loading each resource
+    """
+    timings = resources.warm_up()
+    get_detector().warm_up()
+    return timings
+
+def detect_objects(frame, grid_size=GRID_SIZE):
+    """
+    Run the active detector on a frame, falling back to the heuristics on error.
+    A model-based detector's boxes are completed with the heuristic scene labels.
+    
+    Args:
+        frame (FrameFeatures): Decoded frame
+        grid_size (int): Rows/columns of the heuristic scene grid
         
-        return image_array, image
+    Returns:
+        list: Detection dicts (label, score, box)
+    """
+    detector = get_detector()
+    if detector is not heuristic_detector:
+        try:
+            if detector.name not in frame.detections:
+                frame.detections[detector.name] = detector.detect([frame], grid_size)[0]
+            return with_scene_labels(frame.detections[detector.name], frame, grid_size)
+        except Exception as e:
+            print(f"Object detector failed, using heuristic detection: {str(e)}")
+    return heuristic_detector.detect([frame], grid_size)[0]
+
+def configure_vision_cache(max_entries=128, ttl=5.0, max_distance=4, safety_mode=True):
+    """
+    Enable the near-duplicate frame cache for analyze_image and describe_surroundings.
+    
+    Args:
+        max_entries (int): Maximum number of cached results
+        ttl (float): Seconds a result stays valid
+        max_distance (int): Maximum Hamming distance between frame hashes
+        safety_mode (bool): Never cache results that describe hazards such as
+            obstacles, steps, people or vehicles
+        
+    Returns:
+        VisionResultCache: The active cache
+    """
+    global vision_cache
+    vision_cache = VisionResultCache(max_entries, ttl, max_distance, safety_mode)
+    return vision_cache
+
+def preprocess_image(image, max_pixels=None):
+    """
+    Preprocesses an image for analysis.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
+        max_pixels (int, optional): Pixel budget; defaults to analyze_image's
+        
+    Returns:
+        FrameFeatures: Decoded frame resized to the analysis resolution; the
+            upload is decoded at a model-based detector's input size
+    """
+    try:
+        frame = as_frame(image, decode_size=get_detector().input_size(),
+                         max_pixels=max_pixels or PIXEL_BUDGETS["analyze_image"])
+        # Force the decode and resize here so errors surface as preprocessing errors
+        frame.image
+        return frame
     except Exception as e:
         raise Exception(f"Error preprocessing image: {str(e)}")
 
-def analyze_image(base64_image, timestamp=None):
+def name_color(rgb):
+    """
+    Name an RGB colour using simple channel ranges.
+    
+    Args:
+        rgb (tuple): (r, g, b) values in 0-255
+        
+    Returns:
+        str: Colour name, or None if no range matches
+    """
+    r, g, b = rgb
+    
+    # Define color ranges
+    color_map = {
+        "red": r > 200 and g < 100 and b < 100,
+        "green": r < 100 and g > 200 and b < 100,
+        "blue": r < 100 and g < 100 and b > 200,
+        "yellow": r > 200 and g > 200 and b < 100,
+        "purple": r > 100 and g < 100 and b > 200,
+        "orange": r > 200 and g > 100 and b < 100,
+        "white": r > 200 and g > 200 and b > 200,
+        "black": r < 50 and g < 50 and b < 50,
+        "gray": abs(r - g) < 30 and abs(g - b) < 30 and r > 50 and r < 200
+    }
+    
+    # Find matching color
+    for name, condition in color_map.items():
+        if condition:
+            return name
+    return None
+
+def analyze_image(image, timestamp=None, grid_size=GRID_SIZE):
     """
     Analyze an image and return a detailed description suitable for blind users.
     Now with specific object detection including people recognition.
     
     Args:
-        base64_image (str): Base64 encoded image
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
         timestamp (str, optional): Timestamp to prevent caching
+        grid_size (int): Rows/columns of the scene classification grid (default 3)
         
     Returns:
         str: Description of the image with detected objects
     """
     try:
         # Preprocess image
-        image_array, original_image = preprocess_image(base64_image)
+        frame = preprocess_image(image)
+        
+        # Reuse the result for a near-identical recent frame if caching is enabled
+        cache_name = f"analyze_image:{grid_size}"
+        if vision_cache:
+            cached = vision_cache.get(cache_name, frame)
+            if cached:
+                return cached
         
         # Basic image analysis for brightness and blur
-        gray_image = original_image.convert('L')
-        gray_array = np.array(gray_image)
-        brightness = np.mean(gray_array) / 255
+        brightness = frame.brightness
         brightness_desc = "dark" if brightness < 0.4 else "well-lit" if brightness > 0.6 else "moderately lit"
         
         # Detect edges to estimate complexity/busyness
-        edge_image = original_image.filter(ImageFilter.FIND_EDGES)
-        edge_array = np.array(edge_image.convert('L'))
-        edge_strength = np.mean(edge_array)
+        edge_strength = frame.edge_strength
         complexity = "simple" if edge_strength < 10 else "complex" if edge_strength > 30 else "moderately detailed"
         
-        # Initialize detected objects list
-        detected_objects = []
-        
-        # Convert to RGB for analysis
-        rgb_image = np.array(original_image.convert('RGB'))
-        
-        # PERSON DETECTION
-        # Only run if image is large enough
-        if rgb_image.shape[0] > 10 and rgb_image.shape[1] > 10:
-            # Extract RGB channels
-            r = rgb_image[:,:,0]
-            g = rgb_image[:,:,1]
-            b = rgb_image[:,:,2]
-            
-            # Create skin masks for different skin tones
-            skin_mask1 = ((r > 95) & (g > 40) & (b > 20) & (r > g) & (r > b))
-            skin_mask2 = ((r > 190) & (g > 110) & (b > 70) & (r > g) & (r > b))
-            skin_mask3 = ((r > 80) & (r < 200) & (g > 30) & (g < 170) & (b > 15) & (b < 140))
-            
-            # Combine masks
-            skin_mask = skin_mask1 | skin_mask2 | skin_mask3
-            
-            # Calculate percentage
-            total_pixels = skin_mask.shape[0] * skin_mask.shape[1]
-            if total_pixels > 0:  # Avoid division by zero
-                skin_pixels = np.sum(skin_mask)
-                skin_percentage = float(skin_pixels) / float(total_pixels)
-                
-                # Check for person
-                if skin_percentage > 0.05:
-                    detected_objects.append("person")
-                    
-                    # Basic face detection
-                    if rgb_image.shape[0] >= 3:  # Make sure image has enough rows
-                        top_third = rgb_image[:rgb_image.shape[0]//3, :, :]
-                        top_gray = np.mean(top_third, axis=2)
-                        
-                        if top_gray.size > 0:  # Make sure we have data
-                            top_edges = np.array(Image.fromarray(top_gray.astype(np.uint8))
-                                              .filter(ImageFilter.FIND_EDGES))
-                            face_edge_strength = np.mean(top_edges)
-                            
-                            if face_edge_strength > 20:
-                                detected_objects.append("face")
-        
         # OBJECT DETECTION
-        # Safe division
-        grid_size = 3
-        height, width = rgb_image.shape[0], rgb_image.shape[1]
-        
-        # Only process if image is large enough for grid
-        if height > grid_size and width > grid_size:
-            cell_height = height // grid_size
-            cell_width = width // grid_size
-            
-            # Analyze grid cells
-            for i in range(grid_size):
-                for j in range(grid_size):
-                    # Define cell boundaries
-                    y_start = i * cell_height
-                    y_end = min((i + 1) * cell_height, height)
-                    x_start = j * cell_width
-                    x_end = min((j + 1) * cell_width, width)
-                    
-                    # Safe extraction (ensure indices are valid)
-                    if y_start < y_end and x_start < x_end:
-                        # Extract cell
-                        cell = rgb_image[y_start:y_end, x_start:x_end, :]
-                        
-                        if cell.size > 0:  # Only process non-empty cells
-                            # Compute cell features
-                            cell_mean = np.mean(cell, axis=(0, 1))
-                            cell_std = np.std(cell, axis=(0, 1))
-                            
-                            # Process grayscale for edge detection
-                            cell_gray = np.mean(cell, axis=2).astype(np.uint8)
-                            cell_edge_img = Image.fromarray(cell_gray).filter(ImageFilter.FIND_EDGES)
-                            cell_edge_array = np.array(cell_edge_img)
-                            cell_edge_strength = np.mean(cell_edge_array)
-                            
-                            # Extract color information
-                            if len(cell_mean) >= 3:  # Ensure we have RGB
-                                r_mean, g_mean, b_mean = cell_mean[0], cell_mean[1], cell_mean[2]
-                                
-                                # Blue (sky, water)
-                                if b_mean > r_mean + 20 and b_mean > g_mean + 20 and b_mean > 150:
-                                    if i == 0 and "sky" not in detected_objects:
-                                        detected_objects.append("sky")
-                                    elif cell_std.mean() < 30 and "water" not in detected_objects:
-                                        detected_objects.append("water")
-                                
-                                # Green (plants, grass, trees)
-                                if g_mean > r_mean + 10 and g_mean > b_mean + 10 and g_mean > 100:
-                                    if i >= grid_size//2:
-                                        if "grass" not in detected_objects and "plants" not in detected_objects:
-                                            detected_objects.append("plants")
-                                    else:
-                                        if "tree" not in detected_objects and "plants" not in detected_objects:
-                                            detected_objects.append("tree")
-                                
-                                # Furniture detection
-                                if cell_edge_strength > 30 and cell_std.mean() < 40 and i == 1:
-                                    if "furniture" not in detected_objects:
-                                        detected_objects.append("furniture")
-                                
-                                # Wall detection
-                                if cell_edge_strength < 20 and cell_std.mean() < 30:
-                                    if "wall" not in detected_objects and i < grid_size-1:
-                                        detected_objects.append("wall")
-                                
-                                # Path/Road detection
-                                if abs(r_mean - g_mean) < 20 and abs(g_mean - b_mean) < 20 and r_mean < 150:
-                                    if i >= grid_size-1 and "path" not in detected_objects:
-                                        detected_objects.append("path")
+        # The active backend: an ONNX model, or the skin-tone and grid heuristics
+        detected_objects = [detection["label"] for detection in detect_objects(frame, grid_size)]
         
         # Remove duplicates
         detected_objects = list(set(detected_objects))
         
-        # Dominant color detection
+        # Dominant color detection from the quantized colour histogram
         try:
-            colors = original_image.convert('RGB').getcolors(maxcolors=1024)
-            color_desc = "mixed colors"
-            
-            if colors:
-                colors.sort(reverse=True)
-                dominant_color_rgb = colors[0][1]
-                r, g, b = dominant_color_rgb
-                
-                # Define color ranges
-                color_map = {
-                    "red": r > 200 and g < 100 and b < 100,
-                    "green": r < 100 and g > 200 and b < 100,
-                    "blue": r < 100 and g < 100 and b > 200,
-                    "yellow": r > 200 and g > 200 and b < 100,
-                    "purple": r > 100 and g < 100 and b > 200,
-                    "orange": r > 200 and g > 100 and b < 100,
-                    "white": r > 200 and g > 200 and b > 200,
-                    "black": r < 50 and g < 50 and b < 50,
-                    "gray": abs(r - g) < 30 and abs(g - b) < 30 and r > 50 and r < 200
-                }
-                
-                # Find matching color
-                for name, condition in color_map.items():
-                    if condition:
-                        color_desc = name
-                        break
+            color_names = []
+            for rgb, share in frame.palette(top_k=3):
+                name = name_color(rgb)
+                # Secondary colours only count if they cover a real part of the frame
+                if name and name not in color_names and (not color_names or share >= 0.2):
+                    color_names.append(name)
+            color_desc = " and ".join(color_names[:2]) if color_names else "mixed colors"
         except:
             # Fallback if color analysis fails
             color_desc = "mixed colors"
         
         # Scene environment analysis
-        # Safely crop image for analysis
-        img_width, img_height = original_image.size
-        top = original_image.crop((0, 0, img_width, img_height//3))
-        bottom = original_image.crop((0, 2*img_height//3, img_width, img_height))
-        
-        # Analyze regions
-        top_array = np.array(top.convert('L'))
-        top_brightness = np.mean(top_array) / 255 if top_array.size > 0 else 0
+        # Region statistics come from the shared frame
+        img_width, img_height = frame.image.size
+        top_stats = frame.region_stats((0, 0, img_width, img_height//3))
+        bottom_stats = frame.region_stats((0, 2*img_height//3, img_width, img_height))
         
         # Check for sky
-        top_rgb = np.array(top.convert('RGB'))
         has_sky = False
-        if top_rgb.size > 0:
-            top_blue = np.mean(top_rgb[:,:,2]) / 255
+        if top_stats:
+            top_brightness = top_stats["mean"] / 255
+            top_blue = top_stats["rgb_mean"][2] / 255
             has_sky = top_brightness > 0.6 and top_blue > 0.5
         
         # Check for ground
-        bottom_array = np.array(bottom.convert('L'))
         has_ground = False
-        if bottom_array.size > 0:
-            bottom_variance = np.var(bottom_array)
-            has_ground = bottom_variance < 2000
+        if bottom_stats:
+            has_ground = bottom_stats["var"] < 2000
         
         # Determine scene type
         scene_type = "outdoor" if has_sky else "indoor" if brightness < 0.5 else "unknown"
@@ -332,88 +447,279 @@ def analyze_image(base64_image, timestamp=None):
                 else:
                     description += "The space appears to be relatively open. "
         
+        if vision_cache:
+            vision_cache.put(cache_name, frame, description,
+                             safety_relevant=any(obj in HAZARD_LABELS for obj in detected_objects))
+        
         return description
     except Exception as e:
         return f"I'm having trouble analyzing this image: {str(e)}. If you're trying to navigate, please proceed with caution and consider asking for assistance."
 
-def describe_surroundings(base64_image, context="", timestamp=None):
+def analyze_image_pyramid(image, timestamp=None, grid_size=GRID_SIZE):
+    """
+    Coarse-to-fine variant of analyze_image that stops as soon as the answer is clear.
+    
+    Brightness is checked on the smallest pyramid level, and uniformity on
+    the smallest level's contrast and the middle level's gradients. Strong blur is caught by comparing the two smallest levels, and milder
+    blur by comparing the analysis-size level with the middle one. Only frames
+    that pass every check run through the full analyze_image.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
+        timestamp (str, optional): Timestamp to prevent caching
+        grid_size (int): Rows/columns of the scene classification grid (default 3)
+        
+    Returns:
+        dict: description, level (side of the pyramid level the answer was
+            decided at, None on error) and reason ("dark", "uniform",
+            "blurry", "full" or "error")
+    """
+    try:
+        frame = as_frame(image, decode_size=get_detector().input_size(), max_pixels=PIXEL_BUDGETS["analyze_image"])
+        smallest, small, full = PYRAMID_LEVELS
+        
+        coarse = frame.pyramid_level(smallest)
+        if np.mean(coarse) / 255 < DARK_FRAME_BRIGHTNESS:
+            return {
+                "description": "The image is too dark for me to make out anything. Try turning on a light or pointing the camera toward a brighter area.",
+                "level": smallest,
+                "reason": "dark",
+            }
+        
+        middle = frame.pyramid_level(small)
+        if (np.std(coarse) < UNIFORM_FRAME_CONTRAST * np.mean(coarse)
+                and np.mean(gradient_magnitude(middle)) < UNIFORM_FRAME_GRADIENT):
+            return {
+                "description": "The camera seems to be covered or pointed at a plain surface, so I can't see any objects. Try moving the camera to take in more of the scene.",
+                "level": small,
+                "reason": "uniform",
+            }
+        
+        # Escalate one level at a time; the blur checks stop at the first level that decides
+        blurry_message = "The image is too blurry for me to analyze. Please hold the camera steady and try again."
+        if detail_ratio(middle, coarse) < BLURRY_COARSE_RATIO:
+            return {"description": blurry_message, "level": small, "reason": "blurry"}
+        
+        if detail_ratio(frame.pyramid_level(full), middle) < BLURRY_FINE_RATIO:
+            return {"description": blurry_message, "level": full, "reason": "blurry"}
+        
+        return {"description": analyze_image(frame, timestamp, grid_size), "level": full, "reason": "full"}
+    except Exception as e:
+        return {
+            "description": f"I'm having trouble analyzing this image: {str(e)}. If you're trying to navigate, please proceed with caution and consider asking for assistance.",
+            "level": None,
+            "reason": "error",
+        }
+
+def analyze_image_batch(images, timestamp=None, grid_size=GRID_SIZE):
+    """
+    Analyze several images at once and return one description per image.
+    
+    All frames are decoded at the analysis size and stacked into a single
+    (N, 224, 224, 3) array; brightness, skin mask, edges and grid statistics
+    are computed for the whole stack in one pass before each description is
+    composed.
+    
+    Args:
+        images (list): Encoded images (bytes, file-like or base64 str)
+        timestamp (str, optional): Timestamp to prevent caching
+        grid_size (int): Rows/columns of the scene classification grid (default 3)
+        
+    Returns:
+        list: Descriptions in the same order as the input images
+    """
+    descriptions = [None] * len(images)
+    decoded = []
+    for i, image in enumerate(images):
+        try:
+            decoded.append((i, preprocess_image(image)))
+        except Exception:
+            # Let analyze_image produce its usual error description for this frame
+            descriptions[i] = analyze_image(image, timestamp, grid_size)
+    
+    try:
+        precompute_batch([frame for _, frame in decoded], grid_size)
+    except Exception as e:
+        print(f"Batch feature extraction failed, analyzing frames individually: {str(e)}")
+    
+    # One batched inference for the model-based detector
+    detector = get_detector()
+    if detector is not heuristic_detector and decoded:
+        try:
+            frames = [frame for _, frame in decoded]
+            for frame, detections in zip(frames, detector.detect(frames, grid_size)):
+                frame.detections[detector.name] = detections
+        except Exception as e:
+            print(f"Batch object detection failed, detecting frames individually: {str(e)}")
+    
+    for i, frame in decoded:
+        descriptions[i] = analyze_image(frame, timestamp, grid_size)
+    
+    return descriptions
+
+def object_position(box):
+    """
+    Args:
+        box (list): (left, top, right, bottom) as fractions of the image, or None
+        
+    Returns:
+        str: "left", "center" or "right" from the box centre, or None without a box
+    """
+    if not box:
+        return None
+    centre = (box[0] + box[2]) / 2
+    return "left" if centre < 1/3 else "right" if centre > 2/3 else "center"
+
+def scene_observation(image, grid_size=GRID_SIZE, reference=None, max_distance=SIGNATURE_DISTANCE):
+    """
+    Full analysis of a frame in the form the per-session scene tracker consumes.
+    
+    The frame hash is computed from the same decode as the analysis, and a
+    frame whose hash is close to the reference is returned with its hash
+    only, without being analyzed.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
+        grid_size (int): Rows/columns of the scene classification grid (default 3)
+        reference (int, optional): Hash of the session's last analyzed frame, see SceneState.reference_signature
+        max_distance (int): Hamming distance from the reference still counted as the same scene
+        
+    Returns:
+        dict: signature (frame hash), objects ({label: position}), regions
+            (mean brightness 0-1 of the left, center and right thirds) and
+            the full analyze_image description; only the signature when
+            the frame matched the reference
+    """
+    frame = preprocess_image(image)
+    if reference is not None and bin(frame.dhash ^ reference).count("1") <= max_distance:
+        return {"signature": frame.dhash}
+    
+    objects = {}
+    best_scores = {}
+    for detection in detect_objects(frame, grid_size):
+        label, score = detection["label"], detection["score"] or 0
+        # Keep the position of the most confident detection of each label
+        if label not in objects or score > best_scores[label]:
+            objects[label] = object_position(detection["box"])
+            best_scores[label] = score
+    
+    width, height = frame.image.size
+    regions = {}
+    for i, name in enumerate(["left", "center", "right"]):
+        stats = frame.region_stats((i*width//3, 0, (i+1)*width//3, height))
+        regions[name] = stats["mean"] / 255 if stats else 0.0
+    
+    return {
+        "signature": frame.dhash,
+        "objects": objects,
+        "regions": regions,
+        "description": analyze_image(frame, None, grid_size),
+    }
+
+def describe_surroundings(image, context="", timestamp=None, layout=None):
     """
     Provide navigation assistance based on an image and context.
     
     Args:
-        base64_image (str): Base64 encoded image
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
         context (str): Additional context like user's goal or question
         timestamp (str, optional): Timestamp to prevent caching
+        layout (str, optional): Key of REGION_LAYOUTS to report on (default: DEFAULT_REGION_LAYOUT)
         
     Returns:
         str: Navigation guidance
     """
     try:
-        # Preprocess image
-        _, original_image = preprocess_image(base64_image)
+        layout = layout or DEFAULT_REGION_LAYOUT
+        if layout not in REGION_LAYOUTS:
+            return f"Unknown region layout: {layout}"
         
-        # Basic image analysis
-        width, height = original_image.size
+        # Preprocess image
+        frame = preprocess_image(image, PIXEL_BUDGETS["describe_surroundings"])
         
-        # Divide image into regions for spatial analysis
-        regions = []
-        region_names = ["top-left", "top-right", "center", "bottom-left", "bottom-right"]
+        # Reuse the guidance for a near-identical recent frame if caching is enabled
+        if vision_cache:
+            cached = vision_cache.get(f"describe_surroundings:{layout}", frame, context)
+            if cached:
+                return cached
         
-        # Split image into 5 regions
-        left = original_image.crop((0, 0, width//2, height//2))
-        right = original_image.crop((width//2, 0, width, height//2))
-        center = original_image.crop((width//4, height//4, 3*width//4, 3*height//4))
-        bottom_left = original_image.crop((0, height//2, width//2, height))
-        bottom_right = original_image.crop((width//2, height//2, width, height))
+        # Basic image analysis
+        width, height = frame.image.size
         
-        regions = [left, right, center, bottom_left, bottom_right]
+        # Region statistics come from the frame's summed-area tables, so every
+        # zone costs a few lookups regardless of its size or how many there are
+        regions = [
+            (name, (int(left * width), int(top * height), int(right * width), int(bottom * height)))
+            for name, (left, top, right, bottom) in REGION_LAYOUTS[layout]
+        ]
         
         # Analyze each region for contrast (potential obstacles)
+        # Anything that could be an obstacle keeps the guidance out of the cache
+        hazard = False
         region_descriptions = []
-        for i, region in enumerate(regions):
-            region_array = np.array(region.convert('L'))
-            std_dev = np.std(region_array)
-            mean_brightness = np.mean(region_array) / 255
+        for name, box in regions:
+            stats = frame.region_stats(box)
+            if not stats:
+                continue
+            std_dev = stats["std"]
+            mean_brightness = stats["mean"] / 255
             
             # Higher contrast might indicate objects or obstacles
             if std_dev > 50:
-                region_descriptions.append(f"potential objects in the {region_names[i]}")
+                region_descriptions.append(f"potential objects in the {name}")
+                hazard = True
             elif mean_brightness < 0.3:
-                region_descriptions.append(f"dark area in the {region_names[i]}")
+                region_descriptions.append(f"dark area in the {name}")
             elif mean_brightness > 0.8:
-                region_descriptions.append(f"bright area in the {region_names[i]}")
+                region_descriptions.append(f"bright area in the {name}")
         
         # Check for potential path (higher brightness in bottom center usually indicates path)
-        bottom_center = original_image.crop((width//3, 2*height//3, 2*width//3, height))
-        bottom_brightness = np.mean(np.array(bottom_center.convert('L'))) / 255
+        bottom_center = frame.region_stats((width//3, 2*height//3, 2*width//3, height))
+        bottom_brightness = bottom_center["mean"] / 255 if bottom_center else 0
         
         if bottom_brightness > 0.6:
             path_desc = "There may be a clear path directly ahead."
         elif bottom_brightness < 0.3:
             path_desc = "The path ahead appears dark or may have obstacles."
+            hazard = True
         else:
             path_desc = "The path ahead has moderate visibility."
         
         # Edge detection for obstacles
-        edges = original_image.filter(ImageFilter.FIND_EDGES)
-        edge_strength = np.mean(np.array(edges.convert('L')))
+        edge_strength = frame.edge_strength
         obstacle_desc = ""
         if edge_strength > 40:
             obstacle_desc = "I detect many potential objects or obstacles in your surroundings. "
+            hazard = True
         elif edge_strength > 20:
             obstacle_desc = "I detect some potential objects or obstacles. "
+            hazard = True
         
         # Analyze horizontal lines that might indicate pathways, corridors or sidewalks
-        horizontal_edges = original_image.filter(ImageFilter.FIND_EDGES)
-        horizontal_array = np.array(horizontal_edges.convert('L'))
         # Only analyze bottom half for pathways
-        lower_half = horizontal_array[height//2:, :]
-        horizontal_strength = np.mean(lower_half)
+        lower_half = frame.region_stats((0, height//2, width, height))
+        horizontal_strength = lower_half["horizontal_edge_mean"] if lower_half else 0
         
         path_guidance = ""
         if horizontal_strength > 30:
             path_guidance = "There appears to be a path or corridor ahead. "
         
+        # Strong, repeated horizontal structure near the feet with little vertical
+        # structure is typical of stairs and kerbs
+        lower_third = frame.region_stats((width//4, 2*height//3, 3*width//4, height))
+        if (lower_third and lower_third["horizontal_edge_mean"] > 25 and
+                lower_third["horizontal_edge_mean"] > 2 * lower_third["vertical_edge_mean"]):
+            path_guidance += "There may be steps or a kerb ahead, check the ground in front of you. "
+            hazard = True
+        
+        # Vertical structure on both sides suggests walls, a corridor or a doorway
+        left_side = frame.region_stats((0, 0, width//4, height))
+        right_side = frame.region_stats((3*width//4, 0, width, height))
+        if (left_side and right_side and
+                left_side["vertical_edge_mean"] > 25 and right_side["vertical_edge_mean"] > 25):
+            path_guidance += "There appear to be walls or edges on both sides, like a corridor or doorway. "
+            hazard = True
+        
         # Compose navigation guidance
         navigation = f"Based on my analysis: "
         
@@ -438,70 +744,218 @@ def describe_surroundings(base64_image, context="", timestamp=None):
         # Safety recommendation
         navigation += "Please proceed with caution and use your cane or other assistive device if available."
         
+        if vision_cache:
+            vision_cache.put(f"describe_surroundings:{layout}", frame, navigation, context,
+                             safety_relevant=hazard)
+        
         return navigation
     except Exception as e:
         return f"I'm having trouble analyzing this scene for navigation. Please proceed with extreme caution or seek assistance. Error: {str(e)}"
 
-def recognize_text(base64_image):
+def ocr_available():
+    """
+    Returns:
+        bool: True if pytesseract and the tesseract binary can be used
+    """
+    return resources.get("ocr") is not None
+
+def decode_text_frame(image):
+    """
+    Decode an upload for text reading, at a higher resolution than scene analysis.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
+        
+    Returns:
+        FrameFeatures: The decoded frame
+    """
+    return as_frame(image, decode_size=TEXT_DECODE_SIZE, max_pixels=PIXEL_BUDGETS["recognize_text"])
+
+def read_text_regions(image):
+    """
+    Locate text regions and read each one, yielding results as they are ready.
+    
+    OCR runs only on the located crops, one line-sized region at a time, in
+    reading order, so callers can pass on the first lines before the rest
+    have been read.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
+        
+    Yields:
+        dict: index, box (left, top, right, bottom) in uploaded-image pixels,
+            total number of regions and text (None when no OCR engine is available)
+    """
+    # Decode once; text analysis works at the uploaded resolution
+    gray_image = decode_text_frame(image).full_gray_image
+    
+    regions = find_text_regions(gray_image)
+    ocr = resources.get("ocr")
+    
+    for index, box in enumerate(regions):
+        text = None
+        if ocr is not None:
+            text = ocr.image_to_string(gray_image.crop(box), config=OCR_CONFIG).strip()
+        yield {"index": index, "box": list(box), "total": len(regions), "text": text}
+
+def describe_text_regions(frame, regions):
+    """
+    Turn the results of read_text_regions into the reply for the user.
+    
+    Args:
+        frame (FrameFeatures): The decoded frame the regions were found in
+        regions (list): Dicts yielded by read_text_regions
+        
+    Returns:
+        str: The text that was read, or a description of what was found
+    """
+    if not regions:
+        return "I don't detect clear text patterns in this image. The image may not contain readable text or the text may be too small, blurry, or low-contrast to detect. Please try again with a clearer image of the text."
+    
+    lines = [region["text"] for region in regions if region["text"]]
+    if lines:
+        return "\n".join(lines)
+    
+    # Contrast of the text regions themselves rather than the whole image
+    gray = np.asarray(frame.full_gray_image)
+    contrast = np.mean([np.std(gray[top:bottom, left:right]) for left, top, right, bottom in
+                        (region["box"] for region in regions)])
+    
+    # Create a helpful response for the user
+    response = "I detect what appears to be text in this image. "
+    
+    if contrast > 70:
+        response += "The text seems to have good contrast and should be readable with proper OCR. "
+    else:
+        response += "The text has low contrast which might make it difficult to read. "
+        
+    if len(regions) > 5:
+        response += f"I detect {len(regions)} lines or blocks of text. "
+    else:
+        response += "I detect what might be a few words or a short text passage. "
+    
+    if ocr_available():
+        response += "I could not make out the words themselves. "
+    else:
+        response += "Without full OCR capabilities, I can't read the specific text content. "
+    response += "For accurate text reading, you may need a dedicated OCR application or assistance."
+    
+    return response
+
+def recognize_text(image):
     """
     Extract and read text visible in an image.
-    Uses basic image processing as a placeholder for proper OCR.
+    Reads the detected text regions with a local OCR engine when one is
+    installed, otherwise describes what was found.
     
     Args:
-        base64_image (str): Base64 encoded image
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
         
     Returns:
         str: Extracted text
     """
     try:
-        # Decode base64 image
-        image_data = base64.b64decode(base64_image)
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Convert to grayscale
-        gray_image = image.convert('L')
+        frame = decode_text_frame(image)
+        return describe_text_regions(frame, list(read_text_regions(frame)))
+    except Exception as e:
+        return f"Error in text recognition: {str(e)}"
+
+def read_text(image):
+    """
+    Read every text region of an image in one call, for callers that cannot
+    consume read_text_regions as it runs, such as the vision workers.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
         
-        # Apply Gaussian blur to reduce noise
-        blurred = gray_image.filter(ImageFilter.GaussianBlur(radius=1))
+    Returns:
+        dict: regions (the dicts read_text_regions yields, in reading order)
+            and text (the reply from describe_text_regions)
+    """
+    frame = decode_text_frame(image)
+    regions = list(read_text_regions(frame))
+    return {"regions": regions, "text": describe_text_regions(frame, regions)}
+
+def decode_scene_frame(image, analyses=SCENE_ANALYSES):
+    """
+    Decode an upload once for all the requested scene analyses.
+    
+    Text needs the higher decode resolution of decode_text_frame; the scene
+    analyzers resize from whatever was decoded. Features every scene
+    analyzer reads are computed here, before the analyzers run in parallel.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
+        analyses (list): Names from SCENE_ANALYSES
         
-        # Manual thresholding to detect potential text areas
-        threshold = 128
-        binary_image = blurred.point(lambda x: 0 if x < threshold else 255)
+    Returns:
+        FrameFeatures: The shared frame
+    """
+    frame = decode_text_frame(image) if "read" in analyses else preprocess_image(image)
+    if "identify" in analyses or "navigate" in analyses:
+        frame.rgb
+        frame.gradients
+        frame.integral
+    return frame
+
+def run_scene_analysis(image, analysis, context="", timestamp=None, layout=None):
+    """
+    Run one named scene analysis.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
+        analysis (str): "identify", "navigate" or "read"
+        context (str): Navigation context for "navigate"
+        timestamp (str, optional): Timestamp to prevent caching
+        layout (str, optional): Region layout for "navigate"
         
-        # Calculate features that might indicate text presence
-        contrast = np.std(np.array(gray_image))
-        edges = gray_image.filter(ImageFilter.FIND_EDGES)
-        edge_density = np.mean(np.array(edges))
+    Returns:
+        str: The analysis result
+    """
+    if analysis == "identify":
+        return analyze_image(image, timestamp)
+    if analysis == "navigate":
+        return describe_surroundings(image, context, timestamp, layout)
+    if analysis == "read":
+        return recognize_text(image)
+    raise ValueError(f"Unknown scene analysis: {analysis}")
+
+def analyze_scene(image, analyses=SCENE_ANALYSES, context="", timestamp=None, layout=None, run=None):
+    """
+    Run several analyses on one upload concurrently, yielding each result as it finishes.
+    
+    The upload is decoded once and every analyzer works on the same frame,
+    so the fastest answer is available without waiting for the slowest.
+    
+    Args:
+        image (bytes, file-like, str or FrameFeatures): Encoded image (base64 str accepted) or an already decoded frame
+        analyses (list): Names from SCENE_ANALYSES
+        context (str): Navigation context for "navigate"
+        timestamp (str, optional): Timestamp to prevent caching
+        layout (str, optional): Region layout for "navigate"
+        run (callable, optional): Function (analysis) -> result replacing the
+            in-process analyzers, e.g. to send each one to a worker process
         
-        # Check for text-like patterns
-        has_text_patterns = contrast > 50 and edge_density > 10
+    Yields:
+        dict: analysis name, result (or error) and elapsed_ms, in completion order
+    """
+    if run is None:
+        frame = decode_scene_frame(image, analyses)
         
-        if has_text_patterns:
-            # Simulate text detection regions for feedback
-            regions_count = int(edge_density / 5)  # Approximate number of text regions
-            regions_count = min(max(1, regions_count), 10)  # Between 1 and 10
-            
-            # Create a helpful response for the user
-            response = "I detect what appears to be text in this image. "
-            
-            if contrast > 70:
-                response += "The text seems to have good contrast and should be readable with proper OCR. "
-            else:
-                response += "The text has low contrast which might make it difficult to read. "
-                
-            if regions_count > 5:
-                response += "I detect multiple text regions or paragraphs. "
-            else:
-                response += "I detect what might be a few words or a short text passage. "
-                
-            response += "Without full OCR capabilities, I can't read the specific text content. "
-            response += "For accurate text reading, you may need a dedicated OCR application or assistance."
-            
-            return response
-        else:
-            return "I don't detect clear text patterns in this image. The image may not contain readable text or the text may be too small, blurry, or low-contrast to detect. Please try again with a clearer image of the text."
-    except Exception as e:
-        return f"Error in text recognition: {str(e)}"
-
-# Initialize labels file
-load_or_create_labels()
\ No newline at end of file
+        def run(analysis):
+            return run_scene_analysis(frame, analysis, context, timestamp, layout)
+    
+    def timed(analysis):
+        start = time.perf_counter()
+        result = run(analysis)
+        return result, (time.perf_counter() - start) * 1000
+    
+    pool = resources.get("scene_threads")
+    futures = {pool.submit(timed, analysis): analysis for analysis in analyses}
+    for future in as_completed(futures):
+        analysis = futures[future]
+        try:
+            result, elapsed = future.result()
+            yield {"analysis": analysis, "result": result, "elapsed_ms": round(elapsed, 1)}
+        except Exception as e:
+            yield {"analysis": analysis, "error": str(e)}
\ No newline at end of file
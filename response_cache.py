@@ -0,0 +1,167 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Seconds a cached reply stays valid, per class:
+#   static   - stored answers and fixed replies, until the tables change
+#   dynamic  - clock readings and replies picked at random; only absorbs repeats
+#   external - web search results
+RESPONSE_CLASS_TTLS = {
+    "static": 600.0,
+    "dynamic": 5.0,
+    "external": 300.0,
+}
+
+# Seconds between checks of the stored answers' version, see ResponseCache
+VERSION_CHECK_INTERVAL = 5.0
+
+# Class of replies never cached: fallbacks given because a lookup failed,
+# which a retry a moment later may answer properly
+UNCACHED = "uncached"
+
+def normalize_query(query):
+    """
+    A query as it is both looked up and cached: lowercase with whitespace
+    collapsed. Nothing the lookups tell apart, such as punctuation, is
+    dropped, so two queries share an entry only if they get the same reply.
+    
+    Args:
+        query (str): User query
+    
+    Returns:
+        str: Normalized query, empty if nothing is left
+    """
+    return " ".join(query.lower().split())
+
+class ResponseCache:
+    """
+    Bounded LRU cache of chatbot replies keyed on the normalized query.
+    
+    Each entry carries a class that sets its TTL, and the time the reply
+    took to compute, so hits can report the latency they saved.
+    
+    invalidate() only clears this process's cache. Writes made by other
+    servers sharing the database are noticed through the version callable,
+    checked at most every version_interval seconds, so they can be served
+    stale replies for that long; without a version, for up to a class's TTL.
+    """
+    
+    def __init__(self, max_entries=512, ttls=RESPONSE_CLASS_TTLS, version=None,
+                 version_interval=VERSION_CHECK_INTERVAL):
+        """
+        Args:
+            max_entries (int): Maximum number of cached replies
+            ttls (dict): Seconds a reply stays valid per class; 0 disables the class
+            version (callable, optional): Returns a value that changes whenever
+                the stored answers change; the cache is dropped when it does
+            version_interval (float): Seconds between calls of version
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(ttls)
+        self.version = version
+        self.version_interval = version_interval
+        self._version = None
+        self._version_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_ms = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """
+        Args:
+            key (str): Normalized query
+        
+        Returns:
+            str: The cached reply, or None on a miss
+        """
+        self.check_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() > entry["expires_at"]:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_ms += entry["elapsed_ms"]
+            return entry["response"]
+    
+    def put(self, key, response, response_class, elapsed_ms):
+        """
+        Store a reply.
+        
+        Args:
+            key (str): Normalized query
+            response (str): The reply
+            response_class (str): "static", "dynamic" or "external"
+            elapsed_ms (float): Time the reply took to compute
+        """
+        ttl = self.ttls.get(response_class, 0)
+        if not key or not response or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = {
+                "response": response,
+                "class": response_class,
+                "elapsed_ms": elapsed_ms,
+                "expires_at": time.time() + ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def check_version(self):
+        """Drop every cached reply if the stored answers changed, at most every version_interval seconds."""
+        if self.version is None:
+            return
+        now = time.time()
+        with self._lock:
+            if now - self._version_checked < self.version_interval:
+                return
+            self._version_checked = now
+        
+        try:
+            current = self.version()
+        except Exception as e:
+            # Freshness cannot be confirmed, so nothing cached is trusted
+            print(f"Error checking response cache version: {str(e)}")
+            current = None
+        
+        with self._lock:
+            if current is None or current != self._version:
+                if self._entries:
+                    self._entries.clear()
+                    self.invalidations += 1
+                self._version = current
+    
+    def invalidate(self):
+        """Drop every cached reply, after the knowledge base or responses changed."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+    
+    def stats(self):
+        """
+        Returns:
+            dict: Entries per class, hit/miss counters, hit rate and latency saved
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            classes = {response_class: 0 for response_class in self.ttls}
+            for entry in self._entries.values():
+                classes[entry["class"]] = classes.get(entry["class"], 0) + 1
+            return {
+                "entries": len(self._entries),
+                "entries_by_class": classes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "latency_saved_ms": round(self.saved_ms, 1),
+                "ttls": dict(self.ttls),
+            }
\ No newline at end of file
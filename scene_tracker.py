@@ -0,0 +1,218 @@
+import time
+import threading
+
+# Scene states not updated for this many seconds are evicted
+SCENE_IDLE_TIMEOUT = 300
+
+# Upper bound on tracked sessions
+MAX_SCENE_SESSIONS = 256
+
+# Frames whose hash differs from the last analyzed frame by at most this many bits are skipped
+SIGNATURE_DISTANCE = 6
+
+# A frame is analyzed at least this often (seconds) even if it looks unchanged
+REFRESH_INTERVAL = 5.0
+
+# Change in a region's mean brightness (0-1) that is worth announcing
+BRIGHTNESS_CHANGE = 0.25
+
+def with_article(label):
+    """Prefix a label with "a" or "an"."""
+    return f"an {label}" if label[:1] in "aeiou" else f"a {label}"
+
+def position_phrase(position):
+    """Turn "left", "center" or "right" into a phrase such as " on the left"."""
+    if not position:
+        return ""
+    return " ahead" if position == "center" else f" on the {position}"
+
+class SceneState:
+    """
+    What one user's camera has shown so far.
+    
+    Keeps the detected objects with their positions, the brightness of the
+    left, centre and right of the frame and the hash of the last analyzed
+    frame. New observations are compared against it and only the changes
+    are reported, so a user scanning a room is not told the same scene again
+    and again.
+    """
+    
+    def __init__(self, session_id):
+        """
+        Args:
+            session_id (str): Session the state belongs to
+        """
+        self.session_id = session_id
+        self.signature = None
+        self.objects = {}
+        self.regions = {}
+        self.description = None
+        self.analyzed_at = 0
+        self.last_active = time.time()
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.lock = threading.Lock()
+    
+    def reference_signature(self, refresh_interval=REFRESH_INTERVAL):
+        """
+        Hash the next frame is compared against, handed to scene_observation
+        so a frame close to it is not analyzed.
+        
+        Args:
+            refresh_interval (float): Seconds after which a frame is analyzed anyway
+        
+        Returns:
+            int: Hash of the last analyzed frame, or None if there is none or it is due for a refresh
+        """
+        with self.lock:
+            if self.signature is None or time.time() - self.analyzed_at > refresh_interval:
+                return None
+            return self.signature
+    
+    def is_unchanged(self, signature, max_distance=SIGNATURE_DISTANCE, refresh_interval=REFRESH_INTERVAL):
+        """
+        Record a frame and decide whether it can be skipped.
+        
+        Args:
+            signature (int): 64-bit perceptual hash of the frame
+            max_distance (int): Hamming distance still counted as the same scene
+            refresh_interval (float): Seconds after which a frame is analyzed anyway
+        
+        Returns:
+            bool: True if the frame looks like the last analyzed one
+        """
+        with self.lock:
+            self.frames_seen += 1
+            self.last_active = time.time()
+            if (self.signature is None or
+                    self.last_active - self.analyzed_at > refresh_interval or
+                    bin(self.signature ^ signature).count("1") > max_distance):
+                return False
+            self.frames_skipped += 1
+            return True
+    
+    def update(self, observation):
+        """
+        Merge a full observation into the state and describe what changed.
+        
+        Args:
+            observation (dict): signature, objects ({label: "left", "center",
+                "right" or None}), regions ({"left"/"center"/"right": brightness
+                0-1}) and description, as returned by scene_observation
+        
+        Returns:
+            str: The announcement (the full description for the first frame),
+                or None if nothing worth saying changed
+        """
+        with self.lock:
+            first = self.signature is None
+            changes = [] if first else self.describe_changes(observation)
+            
+            self.signature = observation["signature"]
+            self.objects = dict(observation["objects"])
+            self.regions = dict(observation["regions"])
+            self.description = observation["description"]
+            self.analyzed_at = time.time()
+            
+            if first:
+                return self.description
+            return " ".join(changes) if changes else None
+    
+    def describe_changes(self, observation):
+        """
+        Args:
+            observation (dict): See update()
+        
+        Returns:
+            list: Sentences describing objects that appeared, moved or
+                disappeared and regions that got brighter or darker
+        """
+        changes = []
+        objects = observation["objects"]
+        
+        for label, position in objects.items():
+            if label not in self.objects:
+                changes.append(f"{with_article(label).capitalize()} appeared{position_phrase(position)}.")
+            elif position and self.objects[label] and position != self.objects[label]:
+                changes.append(f"The {label} moved{position_phrase(position)}.")
+        
+        for label, position in self.objects.items():
+            if label not in objects:
+                changes.append(f"The {label}{position_phrase(position)} is no longer visible.")
+        
+        for region, brightness in observation["regions"].items():
+            previous = self.regions.get(region)
+            if previous is None:
+                continue
+            where = "ahead" if region == "center" else f"on the {region}"
+            if brightness - previous > BRIGHTNESS_CHANGE:
+                changes.append(f"It is brighter {where}.")
+            elif previous - brightness > BRIGHTNESS_CHANGE:
+                changes.append(f"It is darker {where}.")
+        
+        return changes
+    
+    def stats(self):
+        """
+        Returns:
+            dict: Frame counters and the currently tracked objects
+        """
+        with self.lock:
+            return {
+                "frames_seen": self.frames_seen,
+                "frames_skipped": self.frames_skipped,
+                "objects": dict(self.objects),
+            }
+
+class SceneTrackerRegistry:
+    """Bounded registry of per-session scene states with idle eviction."""
+    
+    def __init__(self, max_sessions=MAX_SCENE_SESSIONS, idle_timeout=SCENE_IDLE_TIMEOUT):
+        """
+        Args:
+            max_sessions (int): Maximum number of tracked sessions
+            idle_timeout (float): Seconds of inactivity before a state is evicted
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._states = {}
+        self._lock = threading.Lock()
+    
+    def _evict_idle(self):
+        now = time.time()
+        for session_id, state in list(self._states.items()):
+            if now - state.last_active > self.idle_timeout:
+                del self._states[session_id]
+    
+    def get(self, session_id):
+        """
+        Return the state of a session, creating it if needed.
+        
+        When the registry is full the least recently active state is dropped.
+        
+        Args:
+            session_id (str): Session identifier
+        
+        Returns:
+            SceneState: The session's scene state
+        """
+        with self._lock:
+            self._evict_idle()
+            state = self._states.get(session_id)
+            if state is None:
+                if len(self._states) >= self.max_sessions:
+                    oldest = min(self._states, key=lambda key: self._states[key].last_active)
+                    del self._states[oldest]
+                state = SceneState(session_id)
+                self._states[session_id] = state
+            return state
+    
+    def reset(self, session_id):
+        """
+        Forget a session's scene so the next frame is described in full.
+        
+        Returns:
+            bool: True if the session was tracked
+        """
+        with self._lock:
+            return self._states.pop(session_id, None) is not None
\ No newline at end of file
@@ -0,0 +1,322 @@
+import numpy as np
+from PIL import Image
+
+# Longest side of the image text regions are searched in; boxes are scaled back afterwards
+DETECT_SIZE = 1000
+
+# Side of the window the adaptive threshold compares each pixel against
+THRESHOLD_WINDOW = 25
+
+# How much darker (or lighter) than its neighbourhood a pixel must be to count as ink
+THRESHOLD_OFFSET = 12
+
+# Gap in pixels between characters that is still merged into one word or line
+CHARACTER_GAP = 9
+
+# Filters applied to candidate boxes at detection resolution
+MIN_TEXT_HEIGHT = 8
+MAX_TEXT_HEIGHT_FRACTION = 0.25
+MAX_TEXT_WIDTH_FRACTION = 0.9
+MIN_ASPECT_RATIO = 1.2
+MIN_INK_DENSITY = 0.08
+MAX_INK_DENSITY = 0.85
+
+# Letter strokes crossed along a row of a text box: at least MIN_STROKE_TRANSITIONS
+# ink/background changes, and STROKE_TRANSITIONS_PER_HEIGHT per box height of
+# width, which rejects long edges such as the horizon or a table top
+MIN_STROKE_TRANSITIONS = 6
+STROKE_TRANSITIONS_PER_HEIGHT = 1.0
+
+# Letter-sized components (at least this fraction of the box height tall and
+# at most this multiple of it wide) a box must hold; an edge or an outline
+# is one long component
+MIN_LETTERS = 2
+LETTER_MIN_HEIGHT_FRACTION = 0.4
+LETTER_MAX_WIDTH_RATIO = 1.5
+
+# Where the opposite polarity marks more than this fraction of a box, the box
+# must hold less ink than it: around real strokes the opposite mask finds the
+# background halo, which outweighs the letters themselves
+OPPOSITE_INK_DENSITY = 0.05
+
+# Upper bound on the regions returned, which bounds the OCR work per image
+MAX_TEXT_REGIONS = 20
+
+def box_sums(values, window):
+    """
+    Sum of every window x window neighbourhood, read from a summed-area table.
+    
+    Args:
+        values (numpy.ndarray): 2D array
+        window (int): Side of the square neighbourhood
+    
+    Returns:
+        tuple: (sums, counts) arrays of the input's shape; neighbourhoods are
+            clipped at the border and counts holds their real size
+    """
+    height, width = values.shape
+    table = np.zeros((height + 1, width + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(values, axis=0), axis=1, out=table[1:, 1:])
+    
+    half = window // 2
+    top = np.clip(np.arange(height) - half, 0, height)
+    bottom = np.clip(np.arange(height) + half + 1, 0, height)
+    left = np.clip(np.arange(width) - half, 0, width)
+    right = np.clip(np.arange(width) + half + 1, 0, width)
+    
+    sums = (table[bottom][:, right] - table[top][:, right] -
+            table[bottom][:, left] + table[top][:, left])
+    counts = (bottom - top)[:, None] * (right - left)[None, :]
+    return sums, counts
+
+def adaptive_threshold(gray, window=THRESHOLD_WINDOW, offset=THRESHOLD_OFFSET):
+    """
+    Mark ink pixels by comparing each pixel with the mean of its neighbourhood.
+    
+    Unlike a single global threshold this copes with uneven lighting across
+    a sign or page. Both polarities are returned, since one frame can hold
+    dark text on a light sign and light text on a dark one, whatever its
+    overall brightness.
+    
+    Args:
+        gray (numpy.ndarray): uint8 grayscale image
+        window (int): Side of the neighbourhood
+        offset (int): Minimum difference from the local mean
+    
+    Returns:
+        tuple: Boolean ink masks (dark ink, light ink)
+    """
+    sums, counts = box_sums(gray.astype(np.int64), window)
+    local = gray.astype(np.int64) * counts
+    return local < sums - offset * counts, local > sums + offset * counts
+
+def merge_characters(mask, gap=CHARACTER_GAP):
+    """
+    Horizontally dilate the ink mask so letters of a word or line touch.
+    
+    Args:
+        mask (numpy.ndarray): Boolean ink mask
+        gap (int): Largest horizontal gap that is bridged
+    
+    Returns:
+        numpy.ndarray: Dilated boolean mask
+    """
+    height, width = mask.shape
+    half = gap // 2 + 1
+    table = np.zeros((height, width + 1), dtype=np.int32)
+    np.cumsum(mask, axis=1, out=table[:, 1:])
+    left = np.clip(np.arange(width) - half, 0, width)
+    right = np.clip(np.arange(width) + half + 1, 0, width)
+    return (table[:, right] - table[:, left]) > 0
+
+def label_components(mask):
+    """
+    Bounding boxes of the 4-connected components of a mask.
+    
+    Works on horizontal runs rather than pixels: the runs of every row are
+    found with one NumPy diff, and only runs that overlap a run in the row
+    above are joined, so the Python loop is proportional to the number of
+    runs, not the number of pixels.
+    
+    Args:
+        mask (numpy.ndarray): Boolean mask
+    
+    Returns:
+        numpy.ndarray: int array of shape (components, 4) with
+            (left, top, right, bottom) boxes, right and bottom exclusive
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    steps = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(steps == 1)
+    _, ends = np.nonzero(steps == -1)
+    if len(starts) == 0:
+        return np.zeros((0, 4), dtype=np.int64)
+    
+    parent = list(range(len(starts)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    row_first = np.searchsorted(rows, np.arange(height + 1)).tolist()
+    starts_list, ends_list = starts.tolist(), ends.tolist()
+    for row in range(1, height):
+        i, i_end = row_first[row - 1], row_first[row]
+        j, j_end = row_first[row], row_first[row + 1]
+        while i < i_end and j < j_end:
+            if starts_list[i] < ends_list[j] and starts_list[j] < ends_list[i]:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+            if ends_list[i] < ends_list[j]:
+                i += 1
+            else:
+                j += 1
+    
+    roots = np.array([find(i) for i in range(len(parent))])
+    labels, component = np.unique(roots, return_inverse=True)
+    boxes = np.empty((len(labels), 4), dtype=np.int64)
+    boxes[:, 0:2] = np.iinfo(np.int64).max
+    boxes[:, 2:4] = -1
+    np.minimum.at(boxes[:, 0], component, starts)
+    np.minimum.at(boxes[:, 1], component, rows)
+    np.maximum.at(boxes[:, 2], component, ends)
+    np.maximum.at(boxes[:, 3], component, rows + 1)
+    return boxes
+
+def reading_order(boxes):
+    """
+    Sort boxes into lines top to bottom and each line left to right.
+    
+    A box joins the current line when its vertical centre falls inside the
+    line's vertical extent.
+    
+    Args:
+        boxes (list): (left, top, right, bottom) tuples
+    
+    Returns:
+        list: The boxes in reading order
+    """
+    lines = []
+    for box in sorted(boxes, key=lambda b: (b[1] + b[3]) / 2):
+        center = (box[1] + box[3]) / 2
+        if lines and lines[-1]["top"] <= center <= lines[-1]["bottom"]:
+            lines[-1]["boxes"].append(box)
+            lines[-1]["bottom"] = max(lines[-1]["bottom"], box[3])
+        else:
+            lines.append({"top": box[1], "bottom": box[3], "boxes": [box]})
+    return [box for line in lines for box in sorted(line["boxes"], key=lambda b: b[0])]
+
+def box_totals(mask, boxes, shape):
+    """
+    Returns:
+        numpy.ndarray: Number of set pixels of the mask inside each box
+    """
+    table = np.zeros((shape[0] + 1, shape[1] + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(mask, axis=0), axis=1, out=table[1:, 1:])
+    return (table[boxes[:, 3], boxes[:, 2]] - table[boxes[:, 1], boxes[:, 2]] -
+            table[boxes[:, 3], boxes[:, 0]] + table[boxes[:, 1], boxes[:, 0]])
+
+def stroke_transitions(ink, boxes):
+    """
+    Ink/background changes along rows of each box.
+    
+    Rows at a quarter, half and three quarters of the box height are
+    sampled, and the busiest one counts: a line of letters crosses many
+    strokes, a long edge or a solid shape only a few.
+    
+    Args:
+        ink (numpy.ndarray): Boolean ink mask
+        boxes (numpy.ndarray): (left, top, right, bottom) boxes
+    
+    Returns:
+        numpy.ndarray: Transition count per box
+    """
+    table = np.zeros((ink.shape[0], ink.shape[1]), dtype=np.int32)
+    np.cumsum(ink[:, 1:] != ink[:, :-1], axis=1, out=table[:, 1:])
+    
+    left, top, right, bottom = boxes.T
+    counts = np.zeros(len(boxes), dtype=np.int64)
+    for fraction in (0.25, 0.5, 0.75):
+        rows = top + ((bottom - top) * fraction).astype(np.int64)
+        counts = np.maximum(counts, table[rows, right - 1] - table[rows, left])
+    return counts
+
+def letter_count(ink, box):
+    """
+    Returns:
+        int: Letter-sized components of the ink mask inside a box
+    """
+    left, top, right, bottom = box
+    height = bottom - top
+    components = label_components(ink[top:bottom, left:right])
+    component_height = components[:, 3] - components[:, 1]
+    component_width = components[:, 2] - components[:, 0]
+    return int(np.count_nonzero((component_height >= LETTER_MIN_HEIGHT_FRACTION * height) &
+                                (component_width <= LETTER_MAX_WIDTH_RATIO * height)))
+
+def text_candidates(ink, opposite, shape):
+    """
+    Boxes of the components of one ink mask that look like text.
+    
+    Args:
+        ink (numpy.ndarray): Boolean ink mask
+        opposite (numpy.ndarray): Ink mask of the other polarity
+        shape (tuple): (height, width) of the image
+    
+    Returns:
+        numpy.ndarray: (left, top, right, bottom) boxes
+    """
+    boxes = label_components(merge_characters(ink))
+    if len(boxes) == 0:
+        return boxes
+    
+    box_width = boxes[:, 2] - boxes[:, 0]
+    box_height = boxes[:, 3] - boxes[:, 1]
+    
+    # Ink of each box in both masks, from summed-area tables of the undilated masks
+    area = box_width * box_height
+    ink_count, opposite_count = (box_totals(mask, boxes, shape) for mask in (ink, opposite))
+    density = ink_count / area
+    
+    keep = ((box_height >= MIN_TEXT_HEIGHT) &
+            (box_height <= MAX_TEXT_HEIGHT_FRACTION * shape[0]) &
+            (box_width <= MAX_TEXT_WIDTH_FRACTION * shape[1]) &
+            (box_width >= MIN_ASPECT_RATIO * box_height) &
+            (density >= MIN_INK_DENSITY) & (density <= MAX_INK_DENSITY) &
+            ((opposite_count <= OPPOSITE_INK_DENSITY * area) | (ink_count < opposite_count)))
+    boxes = boxes[keep]
+    if len(boxes) == 0:
+        return boxes
+    
+    transitions = stroke_transitions(ink, boxes)
+    required = np.maximum(MIN_STROKE_TRANSITIONS,
+                          STROKE_TRANSITIONS_PER_HEIGHT * (boxes[:, 2] - boxes[:, 0]) / (boxes[:, 3] - boxes[:, 1]))
+    boxes = boxes[transitions >= required]
+    return boxes[[letter_count(ink, box) >= MIN_LETTERS for box in boxes.tolist()]].reshape(-1, 4)
+
+def find_text_regions(image, max_regions=MAX_TEXT_REGIONS):
+    """
+    Locate likely text in a grayscale image.
+    
+    The image is scaled to DETECT_SIZE and thresholded against local means
+    in both polarities; in each mask letters are merged into words/lines
+    and the connected components are kept if their size, aspect ratio, ink
+    density, stroke and letter counts look like text.
+    
+    Args:
+        image (PIL.Image.Image): Grayscale image at any resolution
+        max_regions (int): Maximum number of boxes returned
+    
+    Returns:
+        list: (left, top, right, bottom) boxes in the input's pixel
+            coordinates, in reading order
+    """
+    width, height = image.size
+    scale = min(1.0, DETECT_SIZE / max(width, height))
+    if scale < 1.0:
+        image = image.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.BILINEAR)
+    gray = np.asarray(image)
+    
+    dark, light = adaptive_threshold(gray)
+    candidates = np.concatenate([text_candidates(dark, light, gray.shape), text_candidates(light, dark, gray.shape)])
+    if len(candidates) == 0:
+        return []
+    
+    # Largest candidates first when there are more than we will read
+    if len(candidates) > max_regions:
+        area = (candidates[:, 2] - candidates[:, 0]) * (candidates[:, 3] - candidates[:, 1])
+        candidates = candidates[np.argsort(area)[::-1][:max_regions]]
+    
+    # Back to input coordinates with a small margin for the OCR engine
+    margin = 2
+    regions = [
+        (max(0, int(left / scale) - margin), max(0, int(top / scale) - margin),
+         min(width, int(np.ceil(right / scale)) + margin), min(height, int(np.ceil(bottom / scale)) + margin))
+        for left, top, right, bottom in candidates.tolist()
+    ]
+    return reading_order(regions)
\ No newline at end of file
@@ -0,0 +1,153 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+# Results mentioning any of these (singular or plural, whole words) are never
+# cached in safety mode; covers the phrases the analyzers and detectors produce
+SAFETY_TERMS = (
+    "obstacle", "potential object", "hazard", "step", "stair", "kerb", "curb",
+    "person", "people", "face", "vehicle", "car", "bus", "truck", "bicycle",
+    "motorcycle", "train", "wall", "door", "doorway", "fence", "furniture",
+)
+SAFETY_PATTERN = re.compile(r"\b(?:" + "|".join(SAFETY_TERMS) + r")(?:s|es)?\b")
+
+# Detector labels that make a result safety-relevant regardless of its wording
+HAZARD_LABELS = frozenset((
+    "person", "face", "bicycle", "car", "motorcycle", "bus", "truck", "train",
+    "traffic light", "stop sign", "fire hydrant", "bench", "chair", "couch",
+    "dining table", "furniture", "wall", "door", "stairs", "fence", "street light",
+    "trash can", "road", "dog", "horse", "cow",
+))
+
+def mentions_hazard(result):
+    """
+    Whether a result's text mentions any of the SAFETY_TERMS.
+    
+    Args:
+        result (str): The analyzer's result
+    
+    Returns:
+        bool: True if the result describes a potential hazard
+    """
+    return bool(SAFETY_PATTERN.search(result.lower()))
+
+class VisionResultCache:
+    """
+    Bounded LRU + TTL cache for vision results keyed on a perceptual hash.
+    
+    Camera frames from a stationary user are nearly identical, so instead of
+    an exact key the cache compares the 64-bit dHash of the frame and accepts
+    any entry for the same analyzer and context whose hash is within
+    max_distance bits.
+    """
+    
+    def __init__(self, max_entries=128, ttl=5.0, max_distance=4, safety_mode=True):
+        """
+        Args:
+            max_entries (int): Maximum number of cached results
+            ttl (float): Seconds a result stays valid
+            max_distance (int): Maximum Hamming distance between frame hashes
+            safety_mode (bool): Never cache results that are safety-relevant:
+                flagged by the analyzer or mentioning a hazard term
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.safety_mode = safety_mode
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+    
+    def _find(self, name, context, frame_hash, now):
+        """Return the id of the newest live entry matching the frame, dropping expired ones."""
+        for entry_id in reversed(list(self._entries)):
+            entry = self._entries[entry_id]
+            if now - entry["stored_at"] > self.ttl:
+                del self._entries[entry_id]
+                continue
+            if (entry["name"] == name and entry["context"] == context and
+                    bin(entry["hash"] ^ frame_hash).count("1") <= self.max_distance):
+                return entry_id
+        return None
+    
+    def get(self, name, frame, context=""):
+        """
+        Look up a cached result for a frame.
+        
+        Args:
+            name (str): Analyzer name, e.g. "analyze_image"
+            frame (FrameFeatures): The decoded frame
+            context (str): Context string the result depends on
+        
+        Returns:
+            str: The cached result, or None on a miss
+        """
+        with self._lock:
+            entry_id = self._find(name, context, frame.dhash, time.time())
+            if entry_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id]["result"]
+    
+    def put(self, name, frame, result, context="", safety_relevant=False):
+        """
+        Store the result computed for a frame.
+        
+        In safety mode a result that the analyzer flags as safety-relevant, or
+        that mentions a hazard term, is not stored, and any similar entry is
+        dropped so the next frame is analyzed afresh.
+        
+        Args:
+            name (str): Analyzer name, e.g. "analyze_image"
+            frame (FrameFeatures): The decoded frame
+            result (str): The analyzer's result
+            context (str): Context string the result depends on
+            safety_relevant (bool): Set by the analyzer when the result is
+                based on a detected hazard
+        """
+        with self._lock:
+            now = time.time()
+            if self.safety_mode and (safety_relevant or mentions_hazard(result)):
+                self.skipped += 1
+                entry_id = self._find(name, context, frame.dhash, now)
+                while entry_id is not None:
+                    del self._entries[entry_id]
+                    entry_id = self._find(name, context, frame.dhash, now)
+                return
+            
+            self._entries[self._next_id] = {
+                "name": name,
+                "context": context,
+                "hash": frame.dhash,
+                "result": result,
+                "stored_at": now,
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """
+        Returns:
+            dict: Entry count, hit/miss/skip counters and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped_unsafe": self.skipped,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
\ No newline at end of file
@@ -0,0 +1,268 @@
+import os
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory, resource_tracker
+
+# Vision functions a worker is allowed to run
+VISION_TASKS = ("analyze_image", "analyze_image_pyramid", "describe_surroundings", "recognize_text", "scene_observation",
+                "run_scene_analysis", "read_text", "analyze_image_batch")
+
+# Vision functions taking a list of images rather than one
+BATCH_TASKS = ("analyze_image_batch",)
+
+# Vision cache counters summed over the workers
+CACHE_COUNTERS = ("entries", "hits", "misses", "skipped_unsafe")
+
+class VisionQueueFull(Exception):
+    """Raised when the executor's submit queue is full."""
+    
+    def __init__(self, retry_after):
+        super().__init__("Vision workers are busy, please retry shortly")
+        self.retry_after = retry_after
+
+class VisionTaskTimeout(Exception):
+    """Raised when a vision task does not finish within its timeout."""
+
+def init_worker(module):
+    """
+    Import the vision code and load its resources once per worker so the first request does not pay for them.
+    
+    Args:
+        module (str): Name of the vision module; forked workers find the
+            app's already configured copy in sys.modules
+    """
+    importlib.import_module(module).warm_up()
+
+def warm_up_task():
+    """No-op task used to make sure every worker process is running."""
+    return True
+
+def run_task(module, task, shm_name, sizes, args):
+    """
+    Run a vision function in a worker on images held in shared memory.
+    
+    The function decodes straight from memoryviews of the block, so the
+    uploads are not copied into the worker; the views are released once
+    it has returned.
+    
+    Args:
+        module (str): Name of the vision module
+        task (str): Name of the function in the module
+        shm_name (str): Name of the shared memory block holding the uploads back to back
+        sizes (list): Number of bytes of each upload
+        args (tuple): Extra positional arguments for the function
+    
+    Returns:
+        tuple: (the function's result, worker pid, the worker's vision cache
+            stats or None when the cache is off)
+    """
+    if task not in VISION_TASKS:
+        raise ValueError(f"Unknown vision task: {task}")
+    
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = []
+    try:
+        offset = 0
+        for size in sizes:
+            views.append(shm.buf[offset:offset + size])
+            offset += size
+        images = views if task in BATCH_TASKS else views[0]
+        vision = importlib.import_module(module)
+        result = getattr(vision, task)(images, *args)
+        cache = getattr(vision, "vision_cache", None)
+        return result, os.getpid(), cache.stats() if cache else None
+    finally:
+        for view in views:
+            view.release()
+        shm.close()
+
+class VisionExecutor:
+    """
+    Pre-warmed process pool for CPU-bound vision work.
+    
+    NumPy/PIL work in Flask request threads contends on the GIL; running it
+    in worker processes lets throughput scale with cores. Uploads reach the
+    workers through shared memory instead of being pickled, the number of
+    queued tasks is bounded, and each task has a timeout.
+    
+    A task that times out or a worker that dies takes the pool down with
+    it: its processes are killed, which fails and frees every task still
+    holding a queue slot, and a new pool is forked.
+    """
+    
+    def __init__(self, workers=None, max_pending=None, timeout=10.0, retry_after=1, module="openai_services"):
+        """
+        Args:
+            workers (int, optional): Worker processes (default: CPU count)
+            max_pending (int, optional): Tasks queued or running before new
+                ones are refused (default: 4 per worker)
+            timeout (float): Seconds to wait for a task's result
+            retry_after (int): Seconds suggested to clients when the queue is full
+            module (str): Name of the module holding the vision functions, the
+                one the app configured before the workers are forked
+        """
+        self.module = module
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool_lock = threading.Lock()
+        self._worker_stats = {}
+        self.restarts = 0
+        
+        # Start the resource tracker before forking so workers share it; otherwise
+        # each worker tracks the blocks it attaches to and "cleans up" on exit
+        resource_tracker.ensure_running()
+        
+        self._pool = self._new_pool()
+    
+    def _new_pool(self):
+        # Fork where available: spawn would re-run the Flask app module in every
+        # worker. Replacement pools are forked from the running app too, so
+        # workers keep its vision configuration
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(self.module,)
+        )
+    
+    def _restart(self, pool):
+        """Kill a hung or broken pool and replace it, unless another thread already did."""
+        with self._pool_lock:
+            if pool is not self._pool:
+                return
+            self._pool = self._new_pool()
+            self._worker_stats = {}
+            self.restarts += 1
+        
+        # Killing the workers fails their pending futures, whose callbacks
+        # free the shared memory and queue slots
+        processes = getattr(pool, '_processes', None) or {}
+        for process in list(processes.values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    def warm_up(self):
+        """Start every worker now rather than on the first request."""
+        futures = [self._pool.submit(warm_up_task) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+    
+    def run(self, task, image_data, *args):
+        """
+        Run a vision function in the pool and wait for its result.
+        
+        Args:
+            task (str): One of VISION_TASKS
+            image_data (bytes): Encoded image upload
+            *args: Extra positional arguments for the function
+        
+        Returns:
+            str or dict: The function's result
+        
+        Raises:
+            VisionQueueFull: If max_pending tasks are already in flight
+            VisionTaskTimeout: If the result is not ready within the timeout
+        """
+        return self._run(task, [image_data], args)
+    
+    def run_batch(self, task, images, *args):
+        """
+        Run a vision function on several images in one task, holding one queue slot.
+        
+        Args:
+            task (str): One of BATCH_TASKS
+            images (list): Encoded image uploads (bytes)
+            *args: Extra positional arguments for the function
+        
+        Returns:
+            list: The function's result
+        
+        Raises:
+            VisionQueueFull: If max_pending tasks are already in flight
+            VisionTaskTimeout: If the result is not ready within the timeout
+        """
+        return self._run(task, images, args)
+    
+    def _run(self, task, images, args):
+        if not self._slots.acquire(blocking=False):
+            raise VisionQueueFull(self.retry_after)
+        
+        sizes = [len(image_data) for image_data in images]
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=max(sum(sizes), 1))
+        except Exception:
+            self._slots.release()
+            raise
+        
+        pool = self._pool
+        try:
+            offset = 0
+            for image_data, size in zip(images, sizes):
+                shm.buf[offset:offset + size] = image_data
+                offset += size
+            future = pool.submit(run_task, self.module, task, shm.name, sizes, args)
+        except Exception as e:
+            shm.close()
+            shm.unlink()
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self._restart(pool)
+                raise VisionQueueFull(self.retry_after)
+            raise
+        
+        def release(_):
+            # The worker may still be reading after a timeout, so free the
+            # block and the queue slot only once the task is really done
+            shm.close()
+            shm.unlink()
+            self._slots.release()
+        
+        future.add_done_callback(release)
+        
+        try:
+            result, pid, cache_stats = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._restart(pool)
+            raise VisionTaskTimeout(f"Vision task {task} did not finish within {self.timeout} seconds")
+        except BrokenProcessPool:
+            # A worker died, or the pool was killed because of another task;
+            # the retry runs on the new pool
+            self._restart(pool)
+            raise VisionQueueFull(self.retry_after)
+        
+        with self._pool_lock:
+            if pool is self._pool:
+                self._worker_stats[pid] = cache_stats
+        return result
+    
+    def vision_cache_stats(self):
+        """
+        Vision cache counters of the workers, which each hold their own cache.
+        
+        Returns:
+            dict: Counters summed over the workers of the current pool, as of
+                each one's last task, the hit rate, the number of workers
+                reporting and how often the pool was restarted
+        """
+        with self._pool_lock:
+            reports = [stats for stats in self._worker_stats.values() if stats is not None]
+        totals = {counter: sum(stats[counter] for stats in reports) for counter in CACHE_COUNTERS}
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            **totals,
+            "hit_rate": totals["hits"] / lookups if lookups else 0.0,
+            "workers_reporting": len(reports),
+            "pool_restarts": self.restarts,
+        }
+    
+    def shutdown(self):
+        """Stop the worker processes."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
@@ -0,0 +1,118 @@
+import os
+import time
+import threading
+
+class LazyResource:
+    """
+    A value built by a factory the first time it is needed.
+    
+    The factory runs at most once even when several request threads ask for
+    the value at the same moment; later calls return the stored value without
+    taking the lock.
+    """
+    
+    def __init__(self, name, factory):
+        """
+        Args:
+            name (str): Name the resource is registered under
+            factory (callable): Function without arguments returning the value
+        """
+        self.name = name
+        self.factory = factory
+        self.value = None
+        self.loaded = False
+        self.load_ms = None
+        self.lock = threading.Lock()
+    
+    def get(self):
+        """
+        Returns:
+            object: The value, built now if this is the first use
+        """
+        if self.loaded:
+            return self.value
+        with self.lock:
+            if not self.loaded:
+                start = time.perf_counter()
+                self.value = self.factory()
+                self.load_ms = round((time.perf_counter() - start) * 1000, 3)
+                self.loaded = True
+        return self.value
+
+class ResourceRegistry:
+    """
+    Named lazy resources shared by the vision code.
+    
+    Label lists, lookup tables and detector models are registered at import
+    time without being built, so importing the vision modules has no side
+    effects. They are built on first use or all at once by warm_up().
+    """
+    
+    def __init__(self):
+        self._resources = {}
+        self._lock = threading.Lock()
+        # A fork while another thread holds a lock would leave it locked in the child
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_locks)
+    
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+        for resource in self._resources.values():
+            resource.lock = threading.Lock()
+    
+    def register(self, name, factory):
+        """
+        Register (or replace) a resource. A replaced value is dropped and the
+        new factory runs on next use.
+        
+        Args:
+            name (str): Resource name
+            factory (callable): Function without arguments returning the value
+        """
+        with self._lock:
+            self._resources[name] = LazyResource(name, factory)
+    
+    def get(self, name):
+        """
+        Args:
+            name (str): Resource name
+        
+        Returns:
+            object: The resource's value, built on first use
+        
+        Raises:
+            KeyError: If no resource has that name
+        """
+        return self._resources[name].get()
+    
+    def warm_up(self, names=None):
+        """
+        Build resources now so the first request does not pay for them.
+        
+        Args:
+            names (list, optional): Resources to build (default: all, in registration order)
+        
+        Returns:
+            dict: Milliseconds each resource took to build (0 if it was already built)
+        """
+        with self._lock:
+            resources = [self._resources[name] for name in names] if names else list(self._resources.values())
+        
+        timings = {}
+        for resource in resources:
+            was_loaded = resource.loaded
+            resource.get()
+            timings[resource.name] = 0.0 if was_loaded else resource.load_ms
+        return timings
+    
+    def stats(self):
+        """
+        Returns:
+            dict: Per resource, whether it is loaded and how long building it took
+        """
+        with self._lock:
+            return {name: {"loaded": resource.loaded, "load_ms": resource.load_ms}
+                    for name, resource in self._resources.items()}
+
+# Process-wide registry used by frame_features and openai_services
+resources = ResourceRegistry()
\ No newline at end of file
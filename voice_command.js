@@ -311,12 +311,27 @@ function processVoiceCommand(command) {
     }
     
     // Handle specific commands
+    if (lowerCommand.includes('describe everything') || lowerCommand.includes('full scene')) {
+        captureImageAndProcess('scene');
+        return;
+    }
+    
     if (lowerCommand.includes('what is this') || lowerCommand.includes('identify') || 
         lowerCommand.includes('what do you see') || lowerCommand.includes('describe this')) {
         captureImageAndProcess('identify');
         return;
     }
     
+    if (lowerCommand.includes('stop navigation') || lowerCommand.includes('stop walking guidance')) {
+        stopContinuousNavigation();
+        return;
+    }
+    
+    if (lowerCommand.includes('continuous navigation') || lowerCommand.includes('walking guidance')) {
+        startContinuousNavigation();
+        return;
+    }
+    
     if (lowerCommand.includes('guide me') || lowerCommand.includes('navigate') || 
         lowerCommand.includes('help me find') || lowerCommand.includes('which way')) {
         captureImageAndProcess('navigate');
@@ -3,6 +3,7 @@ import tempfile
 import base64
 from gtts import gTTS
 import speech_recognition as sr
+from intent_router import IntentRouter
 
 def text_to_speech(text, lang='en'):
     """
@@ -77,6 +78,71 @@ def recognize_speech(audio_data):
     except Exception as e:
         return f"Error recognizing speech: {str(e)}"
 
+# Command phrases with expanded vocabulary
+NAVIGATION_PHRASES = [
+    "navigate", "guide", "take me", "find", "where is", "how do i get to", 
+    "directions to", "way to", "path to", "route to", "lead me to",
+    "help me find", "locate", "show me the way", "get me to"
+]
+
+RECOGNITION_PHRASES = [
+    "what is", "describe", "identify", "recognize", "what's in front", 
+    "what do you see", "tell me what you see", "what's that", "what are these",
+    "analyze", "examine", "check", "detect", "scan", "what's around me",
+    "what objects", "what things", "show me"
+]
+
+CHATBOT_PHRASES = [
+    "ask", "question", "tell me about", "explain", "how does", "why is", "when was",
+    "what's the meaning of", "can you explain", "I want to know", "do you know",
+    "what do you think", "give me information"
+]
+
+READING_PHRASES = [
+    "read", "text", "what does it say", "read aloud", "read this", 
+    "what's written", "scan text", "read document", "read sign",
+    "interpret text", "translate", "read label", "what is written"
+]
+
+HELP_PHRASES = [
+    "help", "assist", "instructions", "commands", "what can you do",
+    "how to use", "tutorial", "guide me", "options", "features",
+    "functions", "capabilities", "how do you work", "instructions"
+]
+
+EMERGENCY_PHRASES = [
+    "emergency", "help me", "danger", "unsafe", "call for help",
+    "sos", "medical", "accident", "fell", "hurt", "injured", "stuck"
+]
+
+# Command rules, highest priority first: emergencies always win. The
+# *_hint rules only suggest possible intents for unrecognized commands.
+COMMAND_RULES = [
+    ("emergency", EMERGENCY_PHRASES),
+    ("navigation", NAVIGATION_PHRASES),
+    ("recognition", RECOGNITION_PHRASES),
+    ("read_text", READING_PHRASES),
+    ("chatbot", CHATBOT_PHRASES),
+    ("help", HELP_PHRASES),
+    ("stop", ["stop", "cancel"]),
+    ("pause", ["pause"]),
+    ("resume", ["resume", "continue"]),
+    ("repeat", ["repeat", "say again"]),
+    ("navigation_hint", ["go", "move", "walk", "turn", "right", "left", "straight", "forward", "backward", "back"]),
+    ("recognition_hint", ["what", "see", "look", "object", "thing", "front", "around"]),
+    ("reading_hint", ["text", "sign", "label", "screen", "document", "paper"]),
+]
+
+# Possible intent reported for each hint rule that fires
+HINT_INTENTS = {
+    "navigation_hint": "navigation",
+    "recognition_hint": "recognition",
+    "reading_hint": "reading",
+}
+
+# All command phrases compiled once into a single automaton
+command_router = IntentRouter(COMMAND_RULES)
+
 def get_command_intent(text):
     """
     Process a voice command and determine the intent.
@@ -92,57 +158,26 @@ def get_command_intent(text):
         
     text = text.lower().strip()
     
-    # Define common command patterns with expanded vocabulary
-    navigation_phrases = [
-        "navigate", "guide", "take me", "find", "where is", "how do i get to", 
-        "directions to", "way to", "path to", "route to", "lead me to",
-        "help me find", "locate", "show me the way", "get me to"
-    ]
-    
-    recognition_phrases = [
-        "what is", "describe", "identify", "recognize", "what's in front", 
-        "what do you see", "tell me what you see", "what's that", "what are these",
-        "analyze", "examine", "check", "detect", "scan", "what's around me",
-        "what objects", "what things", "show me"
-    ]
-    
-    chatbot_phrases = [
-        "ask", "question", "tell me about", "explain", "how does", "why is", "when was",
-        "what's the meaning of", "can you explain", "I want to know", "do you know",
-        "what do you think", "give me information"
-    ]
-    
-    reading_phrases = [
-        "read", "text", "what does it say", "read aloud", "read this", 
-        "what's written", "scan text", "read document", "read sign",
-        "interpret text", "translate", "read label", "what is written"
-    ]
-    
-    help_phrases = [
-        "help", "assist", "instructions", "commands", "what can you do",
-        "how to use", "tutorial", "guide me", "options", "features",
-        "functions", "capabilities", "how do you work", "instructions"
-    ]
-    
-    emergency_phrases = [
-        "emergency", "help me", "danger", "unsafe", "call for help",
-        "sos", "medical", "accident", "fell", "hurt", "injured", "stuck"
-    ]
+    # One pass over the text finds every rule that fires; the rule field
+    # tells which one decided the intent
+    route = command_router.route(text)
+    rule = route["rule"]
     
     # Check for emergency situations first (highest priority)
-    if any(phrase in text for phrase in emergency_phrases):
+    if rule == "emergency":
         return {
             "type": "emergency",
             "priority": "high",
             "situation": text,
+            "rule": rule,
             "original": text
         }
     
     # Check for navigation commands
-    elif any(phrase in text for phrase in navigation_phrases):
+    elif rule == "navigation":
         # Try to extract destination with different patterns
         destination = ""
-        for phrase in navigation_phrases:
+        for phrase in NAVIGATION_PHRASES:
             if phrase in text and phrase + " to " in text:
                 destination = text.split(phrase + " to ")[-1].strip()
                 break
@@ -159,14 +194,15 @@ def get_command_intent(text):
         return {
             "type": "navigation",
             "destination": destination,
+            "rule": rule,
             "original": text
         }
     
     # Check for object recognition commands
-    elif any(phrase in text for phrase in recognition_phrases):
+    elif rule == "recognition":
         # Try to extract specific object interest
         object_of_interest = ""
-        for phrase in recognition_phrases:
+        for phrase in RECOGNITION_PHRASES:
             if phrase in text and text.startswith(phrase):
                 object_of_interest = text[len(phrase):].strip()
                 break
@@ -174,21 +210,23 @@ def get_command_intent(text):
         return {
             "type": "recognition",
             "object": object_of_interest,
+            "rule": rule,
             "original": text
         }
     
     # Check for text reading commands
-    elif any(phrase in text for phrase in reading_phrases):
+    elif rule == "read_text":
         return {
             "type": "read_text",
+            "rule": rule,
             "original": text
         }
     
     # Check for chatbot queries
-    elif any(phrase in text for phrase in chatbot_phrases):
+    elif rule == "chatbot":
         # Extract the query content
         query_content = text
-        for phrase in chatbot_phrases:
+        for phrase in CHATBOT_PHRASES:
             if phrase in text and text.startswith(phrase):
                 query_content = text[len(phrase):].strip()
                 break
@@ -196,11 +234,12 @@ def get_command_intent(text):
         return {
             "type": "chatbot",
             "query": query_content,
+            "rule": rule,
             "original": text
         }
         
     # Check for help commands
-    elif any(phrase in text for phrase in help_phrases):
+    elif rule == "help":
         # Check for specific help topics
         help_topic = "general"
         if "navigation" in text:
@@ -215,56 +254,29 @@ def get_command_intent(text):
         return {
             "type": "help",
             "topic": help_topic,
+            "rule": rule,
             "original": text
         }
     
     # Simple commands
-    elif "stop" in text or "cancel" in text:
+    elif rule in ("stop", "pause", "resume", "repeat"):
         return {
             "type": "control",
-            "action": "stop",
-            "original": text
-        }
-    elif "pause" in text:
-        return {
-            "type": "control",
-            "action": "pause",
-            "original": text
-        }
-    elif "resume" in text or "continue" in text:
-        return {
-            "type": "control",
-            "action": "resume",
-            "original": text
-        }
-    elif "repeat" in text or "say again" in text:
-        return {
-            "type": "control",
-            "action": "repeat",
+            "action": rule,
+            "rule": rule,
             "original": text
         }
     
     # Default response for unrecognized commands
     else:
-        # Try to detect if this might be a partial command
-        possible_intents = []
-        
-        # Check partial matches for common actions
-        navigation_indicators = ["go", "move", "walk", "turn", "right", "left", "straight", "forward", "backward", "back"]
-        recognition_indicators = ["what", "see", "look", "object", "thing", "front", "around"]
-        reading_indicators = ["text", "sign", "label", "screen", "document", "paper"]
-        
-        if any(word in text for word in navigation_indicators):
-            possible_intents.append("navigation")
-        if any(word in text for word in recognition_indicators):
-            possible_intents.append("recognition")
-        if any(word in text for word in reading_indicators):
-            possible_intents.append("reading")
+        # Partial matches for common actions hint at what the command might be
+        possible_intents = [HINT_INTENTS[name] for name in route["rules"] if name in HINT_INTENTS]
             
         if possible_intents:
             return {
                 "type": "ambiguous",
                 "possible_intents": possible_intents,
+                "rule": rule,
                 "original": text
             }
         